@@ -0,0 +1,18 @@
+"""
+Núcleo del sistema del Albergue Belén, independiente de Streamlit.
+
+La app (app.py), los benchmarks y cualquier worker o CLI usan estas funciones
+directamente, sin el costo de arrancar la interfaz.
+"""
+from .almacen import (
+    COLUMNAS_PERSONAS, COLUMNAS_ENCUESTAS,
+    configurar, cargar_datos, cargar_encuestas, filtrar_activos, historial_cambios,
+)
+from .folios import normalize_id, generar_folio
+from .registro import calcular_edad, guardar_persona, registrar_ingreso, actualizar_persona, obtener_persona
+from .encuestas import obtener_encuesta, guardar_encuesta
+from .bajas import procesar_baja, baja_grupo_familiar
+from .residentes import Residente, obtener_activos
+from .eventos import feed
+from .bitacora import Delta
+from .reportes import calcular_movimientos, generar_pdf_reporte, generar_pdf_reglamento, enviar_correo
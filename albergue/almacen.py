@@ -0,0 +1,509 @@
+"""
+Capa de almacenamiento: "base de datos" en un libro de Excel con las hojas
+Usuarios, Personas y Encuestas.
+
+Las hojas leídas se guardan en una caché compartida por proceso (sesiones de
+Streamlit, hilos del API), válida mientras el archivo no cambie en disco.
+Las operaciones de lectura-modificación-escritura deben hacerse dentro de
+`with bloqueo:` para no perder escrituras concurrentes, también de otros
+procesos (el candado bloquea `<base>.lock`).
+
+Toda modificación se anota primero en el diario de escritura (ver `diario`)
+y el libro se reescribe de forma atómica. Las ediciones de Personas no
+reescriben el libro: quedan solo en el diario y se aplican en sitio a la hoja
+en caché; al parsear una hoja se vuelven a aplicar las entradas pendientes.
+
+Con una clave configurada (ver `cifrado`) el libro y el diario se guardan
+cifrados. El libro se descifra una vez por versión, en memoria; tras
+ALBERGUE_TTL_DESCIFRADO segundos sin lecturas (900 por defecto) se olvidan
+las hojas descifradas y las cachés derivadas de ellas (`al_olvidar`).
+"""
+import io
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+
+from . import bitacora, candado, cifrado, diario, eventos
+from .folios import normalize_id
+
+# --- CONFIGURACIÓN DE "BASE DE DATOS" (EXCEL) ---
+DB_FILE = 'datos_albergue.xlsx'
+
+COLUMNAS_USUARIOS = ['usuario', 'pass', 'rol']
+COLUMNAS_PERSONAS = [
+    'folio', 'nombre', 'identificacion', 'edad', 'fecha_nacimiento',
+    'nacionalidad', 'genero', 'tipo', 'tutor_folio', 'fecha_ingreso', 'num_acompanantes',
+    'fecha_salida', 'motivo_salida'
+]
+COLUMNAS_ENCUESTAS = [
+    'folio_persona', 'estado_civil', 'escolaridad', 'ocupacion',
+    'enfermedad_cronica', 'estado_migratorio', 'motivo_salida', 'destino', 'redes_apoyo', 'observaciones'
+]
+
+
+# Serializa lecturas-modificación-escrituras y protege la caché (entre hilos y
+# entre procesos que abren el mismo libro: app, API, workers)
+bloqueo = candado.CandadoCompartido(lambda: os.path.splitext(DB_FILE)[0] + '.lock')
+
+_cache = {}  # hoja -> (firma del archivo, DataFrame)
+_version = 0
+_firma_conocida = None  # firma del archivo tras nuestra última lectura o escritura
+_diario = None
+_indice_folios = None  # (hoja Personas en caché, {folio normalizado: etiqueta de fila})
+
+# Vida de los datos descifrados en memoria (solo con cifrado)
+TTL_DESCIFRADO = float(os.environ.get('ALBERGUE_TTL_DESCIFRADO', '900'))
+_descifrado = None  # ((mtime, tamaño) del libro, contenido en claro)
+_ultimo_acceso = 0.0
+_en_memoria = False  # hubo lecturas (libro, hojas o cachés derivadas) desde el último olvido
+_vigilante = None
+_al_olvidar = []  # funciones que descartan cachés derivadas de los datos
+
+# Ediciones pendientes (solo en el diario) tras las cuales la hoja Personas se reescribe completa
+MAX_DELTAS_PENDIENTES = 200
+_deltas_pendientes = 0
+
+
+def configurar(db_file):
+    """Cambia el archivo de datos (p.ej. una copia temporal para benchmarks o workers)."""
+    global DB_FILE, _diario, _descifrado
+    # La ruta cambia antes de tomar `bloqueo`: el candado es `<base>.lock` del
+    # libro nuevo, y así no se crea el del libro por omisión en el directorio actual
+    DB_FILE = db_file
+    with bloqueo:
+        if _diario is not None:
+            _diario.cerrar()
+            _diario = None
+        _descifrado = None
+        invalidar_cache()
+
+
+def invalidar_cache():
+    global _version, _firma_conocida, _indice_folios
+    with bloqueo:
+        _cache.clear()
+        _indice_folios = None
+        _firma_conocida = None
+        _version += 1
+
+
+def al_olvidar(funcion):
+    """Registra `funcion()` para descartar una caché derivada cuando se olvidan los datos descifrados."""
+    _al_olvidar.append(funcion)
+    return funcion
+
+
+def olvidar_descifrados():
+    """Descarta de memoria el libro descifrado, las hojas y las cachés derivadas de ellas."""
+    global _descifrado, _en_memoria
+    with bloqueo:
+        _descifrado = None
+        _en_memoria = False
+        invalidar_cache()
+        for funcion in _al_olvidar:
+            funcion()
+
+
+def _vigilar_inactividad():
+    # Tras una escritura `_cache` queda vacía, pero el libro descifrado y las
+    # cachés derivadas siguen en memoria: se decide solo por el último acceso
+    while True:
+        time.sleep(min(5.0, max(0.25, TTL_DESCIFRADO / 4)))
+        with bloqueo:
+            if _en_memoria and time.monotonic() - _ultimo_acceso > TTL_DESCIFRADO:
+                olvidar_descifrados()
+
+
+def _tocar():
+    """Marca un acceso a los datos; con cifrado, arranca el hilo que los olvida tras la inactividad."""
+    global _ultimo_acceso, _en_memoria, _vigilante
+    _ultimo_acceso = time.monotonic()
+    _en_memoria = True
+    if _vigilante is None and cifrado.activo():
+        _vigilante = threading.Thread(target=_vigilar_inactividad, name='albergue-olvido', daemon=True)
+        _vigilante.start()
+
+
+def _libro():
+    """Origen para pd.read_excel: la ruta si el libro está en claro, o su contenido descifrado (uno por versión)."""
+    global _descifrado
+    if not cifrado.esta_cifrado(DB_FILE):
+        return DB_FILE
+    st = os.stat(DB_FILE)
+    firma = (st.st_mtime_ns, st.st_size)
+    if _descifrado is None or _descifrado[0] != firma:
+        _descifrado = (firma, cifrado.leer_en_memoria(DB_FILE).getvalue())
+    return io.BytesIO(_descifrado[1])
+
+
+def version():
+    """Contador que cambia con cada escritura (o cambio externo del archivo)."""
+    _firma_actual()
+    return _version
+
+
+def hay_cambios_externos():
+    """
+    Sin tomar `bloqueo` (un solo os.stat): si el libro o el diario cambiaron
+    desde nuestra última lectura o escritura. `version()` lo confirma y publica el evento.
+    """
+    return _firma_conocida is not None and _leer_firma() != _firma_conocida
+
+
+def ruta_diario():
+    return os.path.splitext(DB_FILE)[0] + '.diario.jsonl'
+
+
+def _leer_firma():
+    try:
+        st = os.stat(DB_FILE)
+    except FileNotFoundError:
+        return None
+    try:
+        sd = os.stat(ruta_diario())
+        return (st.st_mtime_ns, st.st_size, sd.st_mtime_ns, sd.st_size)
+    except FileNotFoundError:
+        return (st.st_mtime_ns, st.st_size)
+
+
+def _firma_actual():
+    """
+    (mtime, tamaño) del archivo y del diario. Si otro proceso lo modificó desde nuestra
+    última lectura/escritura, invalida la caché y publica un evento EXTERNO.
+    """
+    global _firma_conocida
+    firma = _leer_firma()
+    with bloqueo:
+        if _firma_conocida is not None and firma != _firma_conocida:
+            invalidar_cache()
+            eventos.feed.publicar(eventos.EXTERNO)
+        _firma_conocida = firma
+    return firma
+
+
+# --- DIARIO DE ESCRITURA ---
+def obtener_diario():
+    """Diario del libro actual. Si está vacío y el libro ya existe, empieza con una instantánea."""
+    global _diario
+    with bloqueo:
+        if _diario is None:
+            _diario = diario.Diario(DB_FILE)
+        if _diario.vacio() and os.path.exists(DB_FILE):
+            _tomar_instantanea(_diario)
+        return _diario
+
+
+def _tomar_instantanea(d):
+    contenido = {}
+    for hoja in diario.HOJAS:
+        try:
+            df = pd.read_excel(_libro(), sheet_name=hoja)
+        except ValueError:
+            continue
+        contenido[hoja] = {'columnas': [str(c) for c in df.columns],
+                           'filas': [list(f.values()) for f in diario.registros(df)]}
+    seq = d.registrar(diario.INSTANTANEA, contenido)
+    d.confirmar(seq)
+    _escribir_libro({'Control': _tabla_control({hoja: seq for hoja in contenido})})
+    _marcar_escritura()
+
+
+def anotar(op, datos):
+    """
+    Agrega la operación al diario antes de aplicarla al libro (llamar dentro
+    de `bloqueo`). Las hojas en caché siguen siendo válidas. Devuelve su secuencia.
+    """
+    global _firma_conocida
+    with bloqueo:
+        firma_previa = _firma_actual()
+        seq = obtener_diario().registrar(op, datos)
+        firma = _leer_firma()
+        for hoja, (firma_hoja, df) in list(_cache.items()):
+            if firma_hoja == firma_previa:
+                _cache[hoja] = (firma, df)
+            else:
+                _cache.pop(hoja)
+        _firma_conocida = firma
+        return seq
+
+
+def confirmar(seq):
+    """Espera a que la entrada `seq` del diario esté en disco (fsync por lotes). Llamar fuera de `bloqueo`."""
+    obtener_diario().confirmar(seq)
+
+
+def _tabla_control(control):
+    return pd.DataFrame(sorted(control.items()), columns=['hoja', 'secuencia'])
+
+
+def _leer_control():
+    """{hoja: última secuencia del diario incluida en el libro}."""
+    df = vista_hoja('Control')
+    return {str(h): int(s) for h, s in zip(df['hoja'], df['secuencia'])}
+
+
+def _escribir_libro(hojas, nuevo=False, ruta=None):
+    """
+    Escribe las hojas en una copia temporal del libro y la pone en su lugar
+    con un reemplazo atómico: una caída a medio escribir deja el libro anterior intacto.
+    Con cifrado, el libro se arma en memoria y a disco solo llega cifrado.
+    """
+    ruta = ruta or DB_FILE
+    base, extension = os.path.splitext(ruta)
+    temporal = f"{base}.tmp{extension}"
+    opciones = {} if nuevo else {'mode': 'a', 'if_sheet_exists': 'replace'}
+    if cifrado.activo():
+        if nuevo:
+            destino = io.BytesIO()
+        elif ruta == DB_FILE:
+            destino = _libro()
+            destino = destino if isinstance(destino, io.BytesIO) else cifrado.leer_en_memoria(ruta)
+        else:
+            destino = cifrado.leer_en_memoria(ruta)
+    else:
+        if not nuevo:
+            shutil.copyfile(ruta, temporal)
+        destino = temporal
+    with pd.ExcelWriter(destino, **opciones) as writer:
+        for hoja, df in hojas.items():
+            df.to_excel(writer, sheet_name=hoja, index=False)
+    if cifrado.activo():
+        destino.seek(0)
+        with open(temporal, 'wb') as f:
+            cifrado.cifrar_flujo(destino, f)
+            f.flush()
+            os.fsync(f.fileno())
+    else:
+        with open(temporal, 'rb+') as f:
+            os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+    diario.fsync_directorio(ruta)
+
+
+def inicializar_base():
+    """Crea el libro con las hojas vacías si no existe (o lo rehace desde el diario si se perdió)."""
+    if os.path.exists(DB_FILE):
+        return
+    with bloqueo:
+        if os.path.exists(DB_FILE):
+            return
+        if not obtener_diario().vacio():
+            recuperar()
+            return
+        _escribir_libro({
+            'Usuarios': pd.DataFrame(columns=COLUMNAS_USUARIOS),
+            'Personas': pd.DataFrame(columns=COLUMNAS_PERSONAS),
+            'Encuestas': pd.DataFrame(columns=COLUMNAS_ENCUESTAS),
+            'Control': _tabla_control({}),
+        }, nuevo=True)
+        _marcar_escritura()
+
+
+def leer_hoja(hoja):
+    """
+    Devuelve una copia de la hoja (los llamadores pueden modificarla).
+    Solo se vuelve a parsear el Excel si el archivo cambió.
+    """
+    with bloqueo:
+        return vista_hoja(hoja).copy()
+
+
+def vista_hoja(hoja):
+    """La hoja en caché, sin copiar: solo lectura y dentro de `bloqueo`."""
+    firma = _firma_actual()
+    with bloqueo:
+        _tocar()
+        entrada = _cache.get(hoja)
+        if entrada is None or entrada[0] != firma:
+            df = _parsear_hoja(hoja)
+            _cache[hoja] = (firma, df)
+            return df
+        return entrada[1]
+
+
+def indice_folios():
+    """
+    {folio normalizado: etiqueta de fila} de la hoja Personas en caché. Se
+    arma una vez por hoja leída; los deltas no cambian folios, así que sigue
+    valiendo tras `registrar_deltas`. Solo lectura y dentro de `bloqueo`.
+    """
+    global _indice_folios
+    with bloqueo:
+        df = vista_hoja('Personas')
+        if _indice_folios is None or _indice_folios[0] is not df:
+            _indice_folios = (df, {normalize_id(f): i for i, f in zip(df.index, df['folio'])})
+        return _indice_folios[1]
+
+
+def _parsear_hoja(hoja):
+    """Lee la hoja del libro y le aplica las entradas del diario que aún no incluye."""
+    global _deltas_pendientes
+    if hoja == 'Control':
+        try:
+            return pd.read_excel(_libro(), sheet_name='Control')
+        except ValueError:
+            return _tabla_control({})
+    if hoja not in diario.HOJAS:
+        return pd.read_excel(_libro(), sheet_name=hoja)
+
+    d = obtener_diario()
+    control = _leer_control()
+    d.avanzar(max(control.values(), default=0))
+    df = pd.read_excel(_libro(), sheet_name=hoja)
+    pendientes = [e for e in d.entradas(control.get(hoja, 0)) if e.afecta(hoja)]
+    if hoja == 'Personas':
+        _deltas_pendientes = len(pendientes)
+    return diario.reconstruir(df, hoja, pendientes)
+
+
+def escribir_hoja(df, hoja):
+    """
+    Reemplaza una hoja completa del libro. `df` debe incluir todas las
+    entradas del diario que afectan a la hoja (como las devuelve leer_hoja
+    más la operación ya anotada).
+    """
+    global _deltas_pendientes
+    with bloqueo:
+        d = obtener_diario()
+        d.confirmar(d.secuencia)  # el diario llega a disco antes que el libro
+        hojas = {hoja: df}
+        if hoja in diario.HOJAS:
+            control = _leer_control()
+            control[hoja] = d.secuencia
+            hojas['Control'] = _tabla_control(control)
+        _escribir_libro(hojas)
+        if hoja == 'Personas':
+            _deltas_pendientes = 0
+        d.rotar()
+        _marcar_escritura()
+
+
+def registrar_deltas(deltas):
+    """
+    Guarda deltas de Personas sin reescribir el libro: se anotan en el
+    diario y se aplican en sitio a la hoja en caché. Nueva versión de datos,
+    pero las hojas en caché siguen siendo válidas. Llamar dentro de `bloqueo`.
+    Devuelve la secuencia de la entrada (para `confirmar`).
+    """
+    global _version, _deltas_pendientes
+    if not deltas:
+        return None
+    with bloqueo:
+        df = vista_hoja('Personas')
+        indice = indice_folios()
+        seq = anotar(diario.EDICION, {
+            'folio': deltas[0].folio,
+            'cambios': [{'campo': d.campo, 'anterior': d.anterior, 'nuevo': d.nuevo} for d in deltas],
+        })
+        bitacora.aplicar(df, deltas, indice=indice)
+        _version += 1
+        _deltas_pendientes += 1
+        if _deltas_pendientes > MAX_DELTAS_PENDIENTES:
+            escribir_hoja(leer_hoja('Personas'), 'Personas')
+        return seq
+
+
+def historial_cambios(folio=None):
+    """Deltas registrados en el diario, opcionalmente de un folio."""
+    folio = normalize_id(folio) if folio is not None else None
+    cambios = []
+    for e in obtener_diario().entradas():
+        if e.op != diario.EDICION or (folio is not None and normalize_id(e.datos['folio']) != folio):
+            continue
+        cambios.extend(bitacora.Delta(e.datos['folio'], c['campo'], c.get('anterior'), c.get('nuevo'), e.marca)
+                       for c in e.datos['cambios'])
+    return cambios
+
+
+def _reconstruir_desde_diario(hasta=None):
+    """Hojas reproducidas desde el inicio del diario, y la última secuencia aplicada."""
+    entradas = list(obtener_diario().entradas(0, hasta))
+    hojas = {
+        'Usuarios': pd.DataFrame(columns=COLUMNAS_USUARIOS),
+        'Personas': diario.reconstruir(pd.DataFrame(columns=COLUMNAS_PERSONAS), 'Personas', entradas),
+        'Encuestas': diario.reconstruir(pd.DataFrame(columns=COLUMNAS_ENCUESTAS), 'Encuestas', entradas),
+    }
+    seq = entradas[-1].seq if entradas else 0
+    hojas['Control'] = _tabla_control({hoja: seq for hoja in diario.HOJAS})
+    return hojas, seq
+
+
+def recuperar():
+    """
+    Deja el libro al día con el diario: aplica las entradas pendientes y lo
+    reescribe. Si el libro falta o está dañado, lo rehace completo desde el diario.
+    Devuelve la última secuencia incluida.
+    """
+    with bloqueo:
+        d = obtener_diario()
+        d.confirmar(d.secuencia)
+        invalidar_cache()
+        try:
+            hojas = {hoja: vista_hoja(hoja).copy() for hoja in diario.HOJAS}
+            hojas['Control'] = _tabla_control({hoja: d.secuencia for hoja in diario.HOJAS})
+            _escribir_libro(hojas)
+        except Exception:
+            hojas, _ = _reconstruir_desde_diario()
+            _escribir_libro(hojas, nuevo=True)
+        _marcar_escritura()
+        return d.secuencia
+
+
+def restaurar(destino, hasta=None):
+    """
+    Escribe en `destino` el estado de los datos a la fecha `hasta`
+    ('YYYY-MM-DD HH:MM:SS', o un prefijo) reproduciendo el diario. Devuelve
+    la última secuencia aplicada. No modifica el libro actual.
+    """
+    with bloqueo:
+        hojas, seq = _reconstruir_desde_diario(hasta)
+        _escribir_libro(hojas, nuevo=True, ruta=destino)
+        return seq
+
+
+def cifrar_en_reposo():
+    """Cifra con la clave activa el libro y los segmentos del diario que sigan en claro. Devuelve cuántos cambió."""
+    with bloqueo:
+        cambiados = obtener_diario().cifrar_segmentos()
+        if os.path.exists(DB_FILE) and not cifrado.esta_cifrado(DB_FILE):
+            _escribir_libro({})
+            cambiados += 1
+        _marcar_escritura()
+        return cambiados
+
+
+def _marcar_escritura():
+    """Tras una escritura propia: nueva versión y firma conocida (no es un cambio externo)."""
+    global _firma_conocida
+    invalidar_cache()
+    _firma_conocida = _leer_firma()
+
+
+def cargar_datos():
+    """Devuelve la hoja Personas (creando el libro si no existe)."""
+    inicializar_base()
+    return leer_hoja('Personas')
+
+
+def cargar_encuestas():
+    """
+    Devuelve la hoja Encuestas, o un DataFrame vacío si el libro no la tiene.
+    Un diario dañado o una clave incorrecta se propagan: escribir sobre una
+    hoja vacía borraría las encuestas existentes.
+    """
+    inicializar_base()
+    try:
+        return leer_hoja('Encuestas')
+    except ValueError:  # hoja ausente (libros anteriores a las encuestas)
+        return pd.DataFrame()
+
+
+def filtrar_activos(df):
+    """Personas sin fecha de salida (vacío o NaN)."""
+    if 'fecha_salida' not in df.columns:
+        df['fecha_salida'] = ''
+    return df[df['fecha_salida'].isna() | (df['fecha_salida'] == '')]
+
@@ -0,0 +1,173 @@
+"""
+Analítica por cohortes sobre Personas + Encuestas.
+
+Se arma una sola vez por versión de datos (y por día, por las edades) una tabla base (una fila por
+persona, con su encuesta) cuyas dimensiones son categóricas. Cada consulta
+es una máscara de filtros y un único groupby sobre esa tabla; el resultado
+se guarda en la caché de artefactos hasta que cambie la versión de los datos.
+"""
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from . import almacen, artefactos, catalogos, edades
+from .folios import normalize_id
+from .reportes import calcular_movimientos
+
+SIN_REGISTRO = 'Sin Registro'
+
+# Dimensión -> etiqueta para la interfaz
+DIMENSIONES = {
+    'nacionalidad': 'Nacionalidad',
+    'genero': 'Género',
+    'rango_edad': 'Rango de edad',
+    'menor': 'Menor de edad',
+    'estado_migratorio': 'Estado migratorio',
+    'mes_ingreso': 'Mes de ingreso',
+    'mes_salida': 'Mes de salida',
+    'tipo': 'Tipo',
+    'estado_civil': 'Estado civil',
+    'escolaridad': 'Escolaridad',
+    'encuesta': 'Con encuesta',
+}
+
+# Población
+TODOS = 'todos'
+ACTIVOS = 'activos'
+SALIDAS = 'salidas'
+
+_lock = threading.Lock()
+_version_base = None
+_base = None
+
+
+def _categoria(serie):
+    texto = serie.astype(object).where(serie.notna(), '').astype(str).str.strip()
+    return texto.mask(texto.isin(['', 'nan', 'None']), SIN_REGISTRO).astype('category')
+
+
+def _mes(serie):
+    fechas = pd.to_datetime(serie.astype(str).str.strip().str[:10], errors='coerce')
+    return fechas.dt.strftime('%Y-%m').fillna(SIN_REGISTRO).astype('category')
+
+
+def construir_base(df_personas, df_encuestas):
+    """Tabla base: una fila por persona con dimensiones categóricas y su encuesta (si existe)."""
+    base = pd.DataFrame(index=df_personas.index)
+    base['folio'] = df_personas['folio'].apply(normalize_id)
+    for campo in ('nacionalidad', 'genero', 'tipo'):
+        serie = df_personas.get(campo, pd.Series(index=df_personas.index, dtype=object))
+        if campo in ('nacionalidad', 'genero'):
+            # Variantes de escritura ("hondurena", "HONDUREÑA ") cuentan como un solo valor
+            serie = catalogos.canonizar_serie(campo, serie)
+        base[campo] = _categoria(serie)
+    # Edad al día de hoy desde la fecha de nacimiento (no la capturada al ingreso)
+    derivadas = edades.derivar(df_personas)
+    base['edad'] = derivadas['edad']
+    base['rango_edad'] = derivadas['rango_edad']
+    base['menor'] = derivadas['menor'].map({True: 'Sí', False: 'No'}).astype('category')
+    base['mes_ingreso'] = _mes(df_personas.get('fecha_ingreso', pd.Series('', index=df_personas.index)))
+    salida = df_personas.get('fecha_salida', pd.Series('', index=df_personas.index))
+    base['mes_salida'] = _mes(salida)
+    base['activo'] = (salida.isna() | (salida.astype(str).str.strip() == '')).to_numpy()
+
+    campos_encuesta = ('estado_migratorio', 'estado_civil', 'escolaridad')
+    if df_encuestas is not None and not df_encuestas.empty and 'folio_persona' in df_encuestas.columns:
+        enc = df_encuestas.assign(folio=df_encuestas['folio_persona'].apply(normalize_id))
+        enc = enc.drop_duplicates('folio', keep='last').set_index('folio')
+        for campo in campos_encuesta:
+            valores = enc[campo] if campo in enc.columns else pd.Series(dtype=object)
+            base[campo] = _categoria(base['folio'].map(valores))
+        con_encuesta = base['folio'].isin(enc.index)
+    else:
+        con_encuesta = pd.Series(False, index=base.index)
+        for campo in campos_encuesta:
+            base[campo] = _categoria(pd.Series(np.nan, index=base.index, dtype=object))
+    base['encuesta'] = con_encuesta.map({True: 'Sí', False: 'No'}).astype('category')
+    return base.reset_index(drop=True)
+
+
+def tabla_base():
+    """Tabla base de la versión actual de los datos (se reconstruye solo si cambió)."""
+    global _version_base, _base
+    with almacen.bloqueo:
+        version = (almacen.version(), date.today())
+        with _lock:
+            if _version_base == version:
+                return _base
+        base = construir_base(almacen.cargar_datos(), almacen.cargar_encuestas())
+        with _lock:
+            _base = base
+            _version_base = version
+        return base
+
+
+@almacen.al_olvidar
+def _olvidar_base():
+    global _version_base, _base
+    with _lock:
+        _version_base = _base = None
+
+
+def _congelar(filtros):
+    if not filtros:
+        return ()
+    return tuple(sorted((dim, tuple(sorted(map(str, valores)))) for dim, valores in filtros.items() if valores))
+
+
+def conteos(dimensiones, filtros=None, poblacion=TODOS):
+    """
+    Personas por combinación de `dimensiones` (lista de claves de DIMENSIONES).
+    `filtros` = {dimension: [valores permitidos]}; `poblacion` = TODOS, ACTIVOS o SALIDAS.
+    Devuelve un DataFrame con las dimensiones y la columna 'personas'.
+    """
+    dimensiones = tuple(dimensiones)
+    for dim in dimensiones + tuple((filtros or {}).keys()):
+        if dim not in DIMENSIONES:
+            raise ValueError(f"Dimensión desconocida: '{dim}'.")
+    clave = ('conteos', dimensiones, _congelar(filtros), poblacion, date.today())
+    return artefactos.cache.obtener(clave, lambda: _contar(dimensiones, filtros, poblacion)).copy()
+
+
+def _contar(dimensiones, filtros, poblacion):
+    base = tabla_base()
+    mascara = np.ones(len(base), dtype=bool)
+    if poblacion == ACTIVOS:
+        mascara &= base['activo'].to_numpy()
+    elif poblacion == SALIDAS:
+        mascara &= ~base['activo'].to_numpy()
+    for dim, valores in (filtros or {}).items():
+        if valores:
+            mascara &= base[dim].isin(valores).to_numpy()
+    seleccion = base[mascara]
+
+    if dimensiones:
+        resultado = (seleccion.groupby(list(dimensiones), observed=True).size()
+                     .rename('personas').reset_index()
+                     .sort_values('personas', ascending=False, kind='stable', ignore_index=True))
+        for dim in dimensiones:
+            resultado[dim] = resultado[dim].astype(str)
+    else:
+        resultado = pd.DataFrame({'personas': [len(seleccion)]})
+    return resultado
+
+
+def pivote(filas, columna, filtros=None, poblacion=TODOS):
+    """Tabla cruzada: `filas` (lista de dimensiones) contra los valores de `columna`, con totales."""
+    tabla = conteos(list(filas) + [columna], filtros, poblacion)
+    cruzada = tabla.set_index(list(filas) + [columna])['personas'].unstack(columna, fill_value=0)
+    cruzada['Total'] = cruzada.sum(axis=1)
+    return cruzada.sort_values('Total', ascending=False)
+
+
+def valores(dimension):
+    """Valores presentes de una dimensión (para los filtros de la interfaz)."""
+    serie = tabla_base()[dimension]
+    return sorted(serie.astype(str).unique().tolist())
+
+
+def movimientos():
+    """(mov_diario, mov_mensual) de la versión actual de los datos; solo lectura."""
+    return artefactos.cache.obtener(('movimientos',), lambda: calcular_movimientos(almacen.cargar_datos()))
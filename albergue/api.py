@@ -0,0 +1,286 @@
+"""
+API HTTP/JSON local sobre las operaciones del registro.
+
+Uso:
+    ALBERGUE_API_TOKEN=... python -m albergue.api --host 127.0.0.1 --puerto 8502 --db datos_albergue.xlsx
+
+Toda petición debe llevar `Authorization: Bearer <token>` con el token de
+ALBERGUE_API_TOKEN; sin él se responde 401. El servidor no arranca sin token.
+
+Cada petición se atiende en su propio hilo (ThreadingHTTPServer). Todas las
+peticiones comparten la caché de hojas de `almacen`, por lo que las consultas
+no vuelven a parsear el Excel mientras nadie escriba; las escrituras se
+serializan con `almacen.bloqueo`.
+
+Rutas:
+    GET  /ocupacion                    resumen de personas activas
+    GET  /personas[?activos=1]         lista de personas
+    GET  /personas/<folio>             una persona (+ encuesta si existe)
+    POST /personas                     registra ingreso {datos..., es_acompanante, folio_tutor}
+    POST /folios                       folio que se asignaría {es_acompanante, folio_tutor}
+    POST /bajas                        baja (del grupo familiar) {folio, motivo}
+    PUT  /encuestas/<folio>            inserta o reemplaza la encuesta
+    GET  /movimientos[?periodo=mensual] altas y bajas por día o por mes
+    GET  /cambios?desde=N[&espera=S]   eventos posteriores a la versión N (espera hasta S s)
+"""
+import argparse
+import hmac
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+import pandas as pd
+
+from . import almacen, analitica
+from .diario import a_json, registros
+from .eventos import feed
+from .folios import normalize_id, generar_folio
+from .registro import registrar_ingreso
+from .encuestas import obtener_encuesta, guardar_encuesta
+from .bajas import baja_grupo_familiar
+from .residentes import registro_activos
+
+
+VARIABLE_TOKEN = 'ALBERGUE_API_TOKEN'
+
+# Campos que el cliente puede enviar; folio, tipo, tutor, fecha de ingreso y
+# salida los asigna el registro
+CAMPOS_INGRESO = [c for c in almacen.COLUMNAS_PERSONAS
+                  if c not in ('folio', 'tipo', 'tutor_folio', 'fecha_ingreso', 'fecha_salida', 'motivo_salida')]
+CAMPOS_ENCUESTA = [c for c in almacen.COLUMNAS_ENCUESTAS if c != 'folio_persona']
+
+# Cada cuánto revisa una espera de /cambios si otro proceso escribió (s)
+INTERVALO_EXTERNO = 0.25
+
+
+class ErrorAPI(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _fila(serie):
+    return {k: (None if pd.isna(v) else v) for k, v in serie.items()}
+
+
+def _campos(cuerpo, permitidos):
+    desconocidos = sorted(set(cuerpo) - set(permitidos))
+    if desconocidos:
+        raise ErrorAPI(400, f"Campos no permitidos: {', '.join(desconocidos)}.")
+    return dict(cuerpo)
+
+
+# --- OPERACIONES ---
+def ocupacion(_params, _cuerpo):
+    activos = almacen.filtrar_activos(almacen.cargar_datos())
+    return {
+        'activos': len(activos),
+        'titulares': int((activos['tipo'] == 'Titular').sum()),
+        'acompanantes': int((activos['tipo'] == 'Acompañante').sum()),
+        'version': almacen.version(),
+    }
+
+
+def listar_personas(params, _cuerpo):
+    df = almacen.cargar_datos()
+    if params.get('activos', ['0'])[0] in ('1', 'true', 'si'):
+        df = almacen.filtrar_activos(df)
+    return registros(df)
+
+
+def _persona(folio):
+    """Fila de Personas del folio por el índice de folios (sin recorrer la tabla); 404 si no existe."""
+    almacen.inicializar_base()
+    with almacen.bloqueo:
+        fila = almacen.indice_folios().get(normalize_id(folio))
+        if fila is None:
+            raise ErrorAPI(404, f"No existe el folio '{folio}'.")
+        return _fila(almacen.vista_hoja('Personas').loc[fila])
+
+
+def consultar_persona(_params, _cuerpo, folio):
+    respuesta = _persona(folio)
+    encuesta = obtener_encuesta(normalize_id(folio))
+    respuesta['encuesta'] = _fila(encuesta) if encuesta is not None else None
+    return respuesta
+
+
+def crear_persona(_params, cuerpo):
+    if not cuerpo.get('nombre'):
+        raise ErrorAPI(400, "El nombre es obligatorio.")
+    es_acompanante = bool(cuerpo.pop('es_acompanante', False))
+    folio_tutor = cuerpo.pop('folio_tutor', None)
+    if es_acompanante and not folio_tutor:
+        raise ErrorAPI(400, "El Folio del Titular es obligatorio para acompañantes.")
+    return registrar_ingreso(_campos(cuerpo, CAMPOS_INGRESO), es_acompanante, folio_tutor)
+
+
+def asignar_folio(_params, cuerpo):
+    # Solo consulta: el folio se reserva de verdad al registrar el ingreso
+    es_acompanante = bool(cuerpo.get('es_acompanante', False))
+    return {'folio': generar_folio(es_acompanante, cuerpo.get('folio_tutor'))}
+
+
+def dar_baja(_params, cuerpo):
+    folio, motivo = cuerpo.get('folio'), cuerpo.get('motivo')
+    if not folio or not motivo:
+        raise ErrorAPI(400, "Se requieren 'folio' y 'motivo'.")
+    with almacen.bloqueo:
+        if registro_activos.sincronizar().obtener(folio) is None:
+            raise ErrorAPI(404, f"No hay una persona activa con folio '{folio}'.")
+        return {'folios': baja_grupo_familiar(str(folio), motivo)}
+
+
+def guardar_encuesta_folio(_params, cuerpo, folio):
+    encuesta = _campos(cuerpo, CAMPOS_ENCUESTA)
+    folio = normalize_id(folio)
+    with almacen.bloqueo:
+        _persona(folio)
+        encuesta['folio_persona'] = folio
+        guardar_encuesta(encuesta)
+    return encuesta
+
+
+def movimientos(params, _cuerpo):
+    mov_diario, mov_mensual = analitica.movimientos()
+    tabla = mov_mensual if params.get('periodo', ['diario'])[0] == 'mensual' else mov_diario
+    return [{'periodo': str(k), 'altas': int(v['Altas']), 'bajas': int(v['Bajas'])} for k, v in tabla.iterrows()]
+
+
+def cambios(params, _cuerpo):
+    desde = int(params.get('desde', ['0'])[0])
+    espera = min(float(params.get('espera', ['0'])[0]), 30.0)
+    limite = time.monotonic() + espera
+    almacen.version()  # detecta cambios hechos por otros procesos
+    # Las escrituras de otro proceso (la app) no despiertan al feed: mientras
+    # se espera se revisa la firma del libro cada INTERVALO_EXTERNO
+    while feed.version <= desde:
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            break
+        feed.esperar(desde, timeout=min(restante, INTERVALO_EXTERNO))
+        if almacen.hay_cambios_externos():
+            almacen.version()
+    nuevos = feed.desde(desde)
+    return {
+        'version': feed.version,
+        'completo': nuevos is not None,  # False: se perdieron eventos, refrescar todo
+        'eventos': [e.a_dict() for e in (nuevos or [])],
+    }
+
+
+RUTAS = {
+    ('GET', 'ocupacion'): ocupacion,
+    ('GET', 'personas'): listar_personas,
+    ('POST', 'personas'): crear_persona,
+    ('POST', 'folios'): asignar_folio,
+    ('POST', 'bajas'): dar_baja,
+    ('GET', 'movimientos'): movimientos,
+    ('GET', 'cambios'): cambios,
+}
+RUTAS_CON_FOLIO = {
+    ('GET', 'personas'): consultar_persona,
+    ('PUT', 'encuestas'): guardar_encuesta_folio,
+}
+
+
+class ManejadorAPI(BaseHTTPRequestHandler):
+    server_version = "AlbergueAPI/1.0"
+
+    def _responder(self, estado, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False, default=a_json).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _leer_cuerpo(self):
+        largo = int(self.headers.get('Content-Length') or 0)
+        if not largo:
+            return {}
+        try:
+            datos = json.loads(self.rfile.read(largo).decode('utf-8'))
+        except ValueError:
+            raise ErrorAPI(400, "El cuerpo no es JSON válido.")
+        if not isinstance(datos, dict):
+            raise ErrorAPI(400, "El cuerpo debe ser un objeto JSON.")
+        return datos
+
+    def _autorizado(self):
+        esperado = f"Bearer {self.server.token}".encode('utf-8')
+        return hmac.compare_digest(self.headers.get('Authorization', '').encode('utf-8'), esperado)
+
+    def _despachar(self, metodo):
+        if not self._autorizado():
+            self._responder(401, {'error': "Token ausente o incorrecto."})
+            return
+        url = urlparse(self.path)
+        partes = [unquote(p) for p in url.path.strip('/').split('/') if p]
+        params = parse_qs(url.query)
+        try:
+            if len(partes) == 1 and (metodo, partes[0]) in RUTAS:
+                datos = RUTAS[(metodo, partes[0])](params, self._leer_cuerpo())
+            elif len(partes) == 2 and (metodo, partes[0]) in RUTAS_CON_FOLIO:
+                datos = RUTAS_CON_FOLIO[(metodo, partes[0])](params, self._leer_cuerpo(), partes[1])
+            else:
+                raise ErrorAPI(404, "Ruta no encontrada.")
+            self._responder(201 if metodo == 'POST' else 200, datos)
+        except ErrorAPI as e:
+            self._responder(e.estado, {'error': str(e)})
+        except ValueError as e:
+            # Validaciones de negocio (folio de titular inexistente, límite de acompañantes...)
+            self._responder(400, {'error': str(e)})
+        except Exception as e:
+            self._responder(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        self._despachar('GET')
+
+    def do_POST(self):
+        self._despachar('POST')
+
+    def do_PUT(self):
+        self._despachar('PUT')
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def crear_servidor(host='127.0.0.1', puerto=8502, token=None):
+    """Servidor que exige `token` (por omisión el de ALBERGUE_API_TOKEN) en cada petición."""
+    token = token or os.environ.get(VARIABLE_TOKEN)
+    if not token:
+        raise ValueError(f"Configure {VARIABLE_TOKEN}: la API no atiende sin token.")
+    servidor = ThreadingHTTPServer((host, puerto), ManejadorAPI)
+    servidor.daemon_threads = True
+    servidor.token = token
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP/JSON del registro del albergue.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8502)
+    parser.add_argument('--db', default=almacen.DB_FILE, help="Archivo Excel de datos.")
+    args = parser.parse_args(argv)
+
+    try:
+        servidor = crear_servidor(args.host, args.puerto)
+    except ValueError as e:
+        parser.error(str(e))
+    almacen.configurar(args.db)
+    almacen.inicializar_base()
+    print(f"API del albergue escuchando en http://{args.host}:{args.puerto} (datos: {args.db})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+Caché compartida (por proceso) de artefactos generados: PDF, imágenes de
+gráficas y tablas agregadas.
+
+Límite por tamaño en bytes con desalojo LRU, vencimiento por TTL e
+invalidación por versión de datos: los artefactos que dependen de los datos
+se descartan en cuanto cambia `almacen.version()`. Cuenta aciertos, fallos,
+desalojos, vencidos e invalidados (en total y por tipo = primer elemento de
+la clave) para dimensionar el límite.
+
+Configuración: ALBERGUE_CACHE_MB (64 por defecto) y ALBERGUE_CACHE_TTL en
+segundos (1800 por defecto).
+"""
+import io
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import pandas as pd
+
+from . import almacen
+from .reportes import generar_pdf_reglamento
+
+MAX_BYTES = int(float(os.environ.get('ALBERGUE_CACHE_MB', '64')) * 1024 * 1024)
+TTL_SEGUNDOS = float(os.environ.get('ALBERGUE_CACHE_TTL', '1800'))
+
+CONTADORES = ('aciertos', 'fallos', 'desalojos', 'vencidos', 'invalidados')
+
+
+def tamano(valor):
+    """Bytes aproximados que ocupa `valor` (bytes, texto, DataFrame/Series o tuplas de ellos)."""
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return len(valor)
+    if isinstance(valor, str):
+        return len(valor.encode('utf-8'))
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, (tuple, list)):
+        return sum(tamano(v) for v in valor) + sys.getsizeof(valor)
+    return sys.getsizeof(valor)
+
+
+class _Entrada:
+    __slots__ = ('valor', 'bytes', 'expira', 'version')
+
+    def __init__(self, valor, bytes_, expira, version):
+        self.valor = valor
+        self.bytes = bytes_
+        self.expira = expira
+        self.version = version
+
+
+class CacheArtefactos:
+    """LRU limitada por bytes, con TTL y entradas ligadas (o no) a la versión de datos."""
+
+    def __init__(self, max_bytes=MAX_BYTES, ttl=TTL_SEGUNDOS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # clave -> _Entrada (la más reciente al final)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self._contadores = Counter()
+        self._por_tipo = {}  # tipo -> Counter
+
+    # --- Internos (con _lock tomado) ---
+    def _contar(self, evento, clave):
+        self._contadores[evento] += 1
+        self._por_tipo.setdefault(clave[0], Counter())[evento] += 1
+
+    def _quitar(self, clave, evento=None):
+        entrada = self._entradas.pop(clave)
+        self._bytes -= entrada.bytes
+        if evento:
+            self._contar(evento, clave)
+
+    def _purgar_version(self, version):
+        """Al cambiar la versión de datos se descartan de una vez los artefactos que dependen de ella."""
+        if self._version == version:
+            return
+        self._version = version
+        for clave in [c for c, e in self._entradas.items() if e.version is not None and e.version != version]:
+            self._quitar(clave, 'invalidados')
+
+    # --- API ---
+    def obtener(self, clave, generar, por_version=True, ttl=None):
+        """
+        Valor guardado bajo `clave` (tupla cuyo primer elemento es el tipo), o
+        el resultado de `generar()`, que se guarda. Con `por_version` el
+        artefacto vale solo mientras no cambien los datos.
+        """
+        version = almacen.version()
+        ahora = time.monotonic()
+        with self._lock:
+            self._purgar_version(version)
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada.expira <= ahora:
+                self._quitar(clave, 'vencidos')
+                entrada = None
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self._contar('aciertos', clave)
+                return entrada.valor
+            self._contar('fallos', clave)
+
+        # Se genera sin el candado: otras consultas no esperan a un PDF lento
+        valor = generar()
+        self.guardar(clave, valor, version if por_version else None, ttl)
+        return valor
+
+    def guardar(self, clave, valor, version=None, ttl=None):
+        """Guarda `valor`; desaloja los menos usados hasta caber. Lo que excede el límite no se guarda."""
+        bytes_ = tamano(valor)
+        if bytes_ > self.max_bytes:
+            return
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if version is not None and version != self._version:
+                return  # los datos cambiaron mientras se generaba
+            if clave in self._entradas:
+                self._quitar(clave)
+            while self._entradas and self._bytes + bytes_ > self.max_bytes:
+                self._quitar(next(iter(self._entradas)), 'desalojos')
+            self._entradas[clave] = _Entrada(valor, bytes_, expira, version)
+            self._bytes += bytes_
+
+    def invalidar(self, tipo=None):
+        """Descarta todo (o solo las entradas de `tipo`)."""
+        with self._lock:
+            for clave in [c for c in self._entradas if tipo is None or c[0] == tipo]:
+                self._quitar(clave, 'invalidados')
+
+    def limpiar(self):
+        """Vacía la caché y reinicia los contadores."""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+            self._contadores.clear()
+            self._por_tipo.clear()
+
+    def configurar(self, max_bytes=None, ttl=None):
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+                while self._entradas and self._bytes > self.max_bytes:
+                    self._quitar(next(iter(self._entradas)), 'desalojos')
+
+    def estadisticas(self):
+        """Totales: entradas, bytes, límite, contadores y tasa de aciertos."""
+        with self._lock:
+            consultas = self._contadores['aciertos'] + self._contadores['fallos']
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                **{c: self._contadores[c] for c in CONTADORES},
+                'tasa_aciertos': round(self._contadores['aciertos'] / consultas, 4) if consultas else 0.0,
+            }
+
+    def estadisticas_por_tipo(self):
+        """Una fila por tipo de artefacto: entradas y bytes actuales más sus contadores."""
+        with self._lock:
+            actuales = {}
+            for clave, entrada in self._entradas.items():
+                n, b = actuales.get(clave[0], (0, 0))
+                actuales[clave[0]] = (n + 1, b + entrada.bytes)
+            filas = []
+            for tipo in sorted(set(self._por_tipo) | set(actuales)):
+                contadores = self._por_tipo.get(tipo, Counter())
+                consultas = contadores['aciertos'] + contadores['fallos']
+                n, b = actuales.get(tipo, (0, 0))
+                filas.append({
+                    'tipo': tipo, 'entradas': n, 'bytes': b,
+                    **{c: contadores[c] for c in CONTADORES},
+                    'tasa_aciertos': round(contadores['aciertos'] / consultas, 4) if consultas else 0.0,
+                })
+            return filas
+
+
+# Instancia compartida por todas las sesiones del proceso
+cache = CacheArtefactos()
+almacen.al_olvidar(cache.invalidar)
+
+
+# --- ARTEFACTOS COMUNES ---
+def pdf_reglamento(nombre, fecha_ingreso):
+    """Reglamento firmado de una persona (no depende de la versión de datos)."""
+    return cache.obtener(('reglamento', nombre, fecha_ingreso),
+                         lambda: generar_pdf_reglamento(nombre, fecha_ingreso), por_version=False)
+
+
+def imagen(clave, dibujar, figsize=(6, 3)):
+    """
+    PNG de una gráfica de matplotlib: `dibujar(ax)` se llama solo si no está
+    en caché. `clave` identifica la gráfica y sus datos (sin el tipo).
+    """
+    def generar():
+        import matplotlib.pyplot as plt
+
+        fig, ax = plt.subplots(figsize=figsize)
+        try:
+            dibujar(ax)
+            salida = io.BytesIO()
+            fig.savefig(salida, format='png', bbox_inches='tight')
+            return salida.getvalue()
+        finally:
+            plt.close(fig)
+    return cache.obtener(('grafica',) + tuple(clave), generar)
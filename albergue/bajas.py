@@ -0,0 +1,48 @@
+"""Salidas del albergue (bajas individuales y del grupo familiar)."""
+from datetime import datetime
+
+from . import almacen, diario, eventos
+from .familias import grafo_familiar
+from .folios import normalize_id
+from .residentes import registro_activos
+
+
+def procesar_baja(lista_baja, motivo_baja):
+    """Registra fecha y motivo de salida para todos los folios de lista_baja."""
+    with almacen.bloqueo:
+        version_previa = almacen.version()
+        df_update = almacen.leer_hoja('Personas')
+        # Asegurar columnas
+        if 'fecha_salida' not in df_update.columns: df_update['fecha_salida'] = ''
+        if 'motivo_salida' not in df_update.columns: df_update['motivo_salida'] = ''
+        # Columnas vacías se leen como float (NaN); pasarlas a object para admitir texto
+        df_update[['fecha_salida', 'motivo_salida']] = df_update[['fecha_salida', 'motivo_salida']].astype(object)
+    
+        ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        almacen.anotar(diario.BAJA, {'folios': [str(x) for x in lista_baja], 'fecha_salida': ahora, 'motivo': motivo_baja})
+    
+        # Actualizar registros
+        # Folios normalizados, como al reproducir el diario
+        mask = df_update['folio'].apply(normalize_id).isin({normalize_id(x) for x in lista_baja})
+        df_update.loc[mask, 'fecha_salida'] = ahora
+        df_update.loc[mask, 'motivo_salida'] = motivo_baja
+    
+        # Guardar
+        almacen.escribir_hoja(df_update, 'Personas')
+        registro_activos.baja(version_previa, lista_baja)
+        grafo_familiar.baja(version_previa, lista_baja)
+        eventos.feed.publicar(eventos.BAJA, [normalize_id(f) for f in lista_baja])
+
+
+def baja_grupo_familiar(folio, motivo_baja):
+    """
+    Da de baja a la persona y, si es Titular, a sus acompañantes activos.
+    Devuelve la lista de folios dados de baja.
+    """
+    with almacen.bloqueo:
+        grafo = grafo_familiar.sincronizar()
+        lista_baja = [folio]
+        if grafo.es_titular_activo(folio):
+            lista_baja.extend(grafo.acompanantes_activos(folio))
+        procesar_baja(lista_baja, motivo_baja)
+        return lista_baja
@@ -0,0 +1,74 @@
+"""
+Cambios por campo de la hoja Personas.
+
+Editar a una persona no reescribe el libro: cada campo modificado es un Delta
+(folio, campo, anterior, nuevo, marca) que se anota en el diario de escritura
+y se aplica en sitio a la hoja en caché. El diario queda como registro de
+auditoría de las ediciones (`almacen.historial_cambios`).
+"""
+from datetime import datetime
+
+import pandas as pd
+
+from .folios import normalize_id
+
+
+class Delta:
+    __slots__ = ('folio', 'campo', 'anterior', 'nuevo', 'marca')
+
+    def __init__(self, folio, campo, anterior, nuevo, marca=None):
+        self.folio = folio
+        self.campo = campo
+        self.anterior = anterior
+        self.nuevo = nuevo
+        self.marca = marca or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def a_dict(self):
+        return {'folio': self.folio, 'campo': self.campo, 'anterior': self.anterior,
+                'nuevo': self.nuevo, 'marca': self.marca}
+
+    def __repr__(self):
+        return f"Delta({self.folio!r}, {self.campo!r}, {self.anterior!r} -> {self.nuevo!r})"
+
+
+def valor_simple(valor):
+    """Valor serializable en JSON (NaN -> None, escalares numpy -> nativos)."""
+    if valor is None:
+        return None
+    if not isinstance(valor, str) and pd.isna(valor):
+        return None
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return valor
+
+
+def calcular_deltas(fila, folio, nuevos):
+    """Deltas entre la fila actual (Series) y los valores nuevos (solo campos existentes que cambian)."""
+    deltas = []
+    for campo, nuevo in nuevos.items():
+        if campo == 'folio' or campo not in fila.index:
+            continue
+        anterior = valor_simple(fila[campo])
+        nuevo = valor_simple(nuevo)
+        if anterior == nuevo or str('' if anterior is None else anterior) == str('' if nuevo is None else nuevo):
+            continue
+        deltas.append(Delta(folio, campo, anterior, nuevo))
+    return deltas
+
+
+def aplicar(df, deltas, indice=None):
+    """Aplica los deltas en sitio sobre df. `indice` (folio normalizado -> etiqueta) evita recalcularlo."""
+    if not deltas:
+        return df
+    if indice is None:
+        indice = {normalize_id(f): i for i, f in zip(df.index, df['folio'])}
+    for d in deltas:
+        idx = indice.get(normalize_id(d.folio))
+        if idx is None:
+            continue
+        if d.campo not in df.columns:
+            df[d.campo] = None
+        if df[d.campo].dtype != object:
+            df[d.campo] = df[d.campo].astype(object)
+        df.at[idx, d.campo] = d.nuevo
+    return df
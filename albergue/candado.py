@@ -0,0 +1,84 @@
+"""
+Candado entre hilos y procesos para el libro de datos.
+
+Un RLock para los hilos del proceso más un bloqueo del sistema operativo
+(flock en POSIX, msvcrt.locking en Windows) sobre `<base>.lock`, tomado solo
+en la adquisición más externa. Así la app de Streamlit, el API y cualquier
+worker que abran el mismo libro serializan sus lecturas-modificación-escrituras.
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+
+def _bloquear(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue  # LK_LOCK se rinde tras ~10 s; seguimos esperando
+
+
+def _desbloquear(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class CandadoCompartido:
+    """RLock cuya adquisición más externa también bloquea el archivo `ruta()` entre procesos."""
+
+    def __init__(self, ruta):
+        self._ruta = ruta  # función: la ruta sigue al libro configurado
+        self._rlock = threading.RLock()
+        self._profundidad = 0
+        self._fd = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        if not self._rlock.acquire(blocking, timeout):
+            return False
+        self._profundidad += 1
+        if self._profundidad == 1:
+            try:
+                fd = os.open(self._ruta(), os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError:
+                return True  # sin permiso para el archivo: solo entre hilos
+            try:
+                _bloquear(fd)
+            except BaseException:
+                os.close(fd)
+                self._profundidad -= 1
+                self._rlock.release()
+                raise
+            self._fd = fd
+        return True
+
+    def release(self):
+        if self._profundidad == 1 and self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                _desbloquear(fd)
+            finally:
+                os.close(fd)
+        self._profundidad -= 1
+        self._rlock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,163 @@
+"""
+Catálogos de valores canónicos para los campos de texto libre con opciones
+comunes (nacionalidad, género).
+
+Cada valor se reduce a una clave sin acentos, sin mayúsculas y sin espacios
+extra ("HONDUREÑA ", "hondurena" -> "hondurena") que apunta a su forma
+canónica. Los valores que no están en la lista base se aprenden de los datos
+guardados (se elige la escritura más frecuente): de la hoja completa al
+arrancar, al cambiar de libro o cuando otro proceso cambió los datos (evento
+EXTERNO), y de cada registro que pasa por `canonizar_registro` en las
+escrituras propias, sin volver a recorrer la tabla.
+"""
+import re
+import unicodedata
+from collections import Counter
+
+import pandas as pd
+
+from . import almacen, eventos
+
+OTROS = "--- OTROS ---"
+
+NACIONALIDADES_COMUNES = ["Mexicana", "Guatemalteca", "Hondureña", "Salvadoreña", "Nicaragüense", "Venezolana", "Cubana", "Haitiana", "Colombiana", "Ecuatoriana"]
+GENEROS_COMUNES = ["Masculino", "Femenino"]
+
+_ESPACIOS = re.compile(r"\s+")
+
+
+def clave_normalizada(valor):
+    """Clave de comparación: sin acentos, minúsculas y espacios colapsados."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ''
+    texto = unicodedata.normalize('NFKD', str(valor))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _ESPACIOS.sub(' ', texto).strip().casefold()
+
+
+def formatear(valor):
+    """Forma de captura por defecto: espacios colapsados y primera letra en mayúscula."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ''
+    return _ESPACIOS.sub(' ', str(valor)).strip().capitalize()
+
+
+class Catalogo:
+    def __init__(self, campo, base):
+        self.campo = campo
+        self.base = tuple(base)
+        self._escrituras = {}  # clave -> Counter(escritura -> veces)
+        self._origen = None  # libro del que se aprendió; None: volver a aprender
+        self._construir()
+
+    def _construir(self):
+        por_clave = {clave: c.most_common(1)[0][0] for clave, c in self._escrituras.items()}
+        por_clave.update((clave_normalizada(v), v) for v in self.base)
+        opciones = sorted(self.base) + [OTROS]
+        # Se reemplazan juntos: los lectores nunca ven un estado a medias
+        self._por_clave = por_clave
+        self._opciones = opciones
+        self._indice = {v: i for i, v in enumerate(opciones)}
+
+    def aprender(self, valores):
+        """Aprende de cero los canónicos para las claves fuera de la lista base (la escritura más frecuente)."""
+        escrituras = {}
+        for valor, veces in Counter(formatear(v) for v in valores).items():
+            clave = clave_normalizada(valor)
+            if clave:
+                escrituras.setdefault(clave, Counter())[valor] += veces
+        self._escrituras = escrituras
+        self._construir()
+
+    def anotar(self, valor):
+        """Cuenta un valor canónico que se va a guardar; solo se rearma el catálogo si su clave es nueva."""
+        clave = clave_normalizada(valor)
+        if not clave:
+            return
+        with almacen.bloqueo:
+            conteo = self._escrituras.get(clave)
+            if conteo is None:
+                self._escrituras[clave] = Counter({valor: 1})
+                self._construir()
+            else:
+                conteo[valor] += 1
+
+    def sincronizar(self):
+        """Aprende de la hoja Personas al arrancar, al cambiar de libro o si otro proceso cambió los datos."""
+        almacen.version()  # publica EXTERNO (y olvida lo aprendido) si el libro cambió por fuera
+        if self._origen == almacen.DB_FILE:
+            return self
+        almacen.inicializar_base()
+        with almacen.bloqueo:
+            if self._origen != almacen.DB_FILE:
+                df = almacen.vista_hoja('Personas')
+                self.aprender(df[self.campo].dropna() if self.campo in df.columns else [])
+                self._origen = almacen.DB_FILE
+        return self
+
+    def olvidar(self):
+        self._origen = None
+
+    # --- Consultas O(1) ---
+    def canonico(self, valor):
+        """Forma canónica de `valor` ('' si está vacío); los desconocidos se formatean."""
+        return self._por_clave.get(clave_normalizada(valor)) or formatear(valor)
+
+    def opciones(self):
+        return self._opciones
+
+    def indice(self, valor):
+        """Posición de `valor` en opciones(), la de OTROS si no es común, o None si está vacío."""
+        canonico = self.canonico(valor)
+        if not canonico:
+            return None
+        return self._indice.get(canonico, self._indice[OTROS])
+
+    def canonizar_serie(self, serie):
+        """Serie categórica con los valores canónicos (se normaliza cada valor distinto una sola vez)."""
+        unicos = serie.dropna().unique()
+        mapa = {v: self.canonico(v) for v in unicos}
+        return serie.map(mapa).replace('', None).astype('category')
+
+
+_catalogos = {
+    'nacionalidad': Catalogo('nacionalidad', NACIONALIDADES_COMUNES),
+    'genero': Catalogo('genero', GENEROS_COMUNES),
+}
+
+
+@almacen.al_olvidar
+def _olvidar():
+    for catalogo in _catalogos.values():
+        catalogo.olvidar()
+
+
+def _al_publicar(evento):
+    if evento.tipo == eventos.EXTERNO:
+        _olvidar()
+
+
+eventos.feed.suscribir(_al_publicar)
+
+
+def obtener(campo):
+    """Catálogo del campo, al día con los datos guardados."""
+    return _catalogos[campo].sincronizar()
+
+
+def canonizar_registro(datos):
+    """
+    Copia de `datos` con los campos catalogados en su forma canónica. Se
+    llama antes de guardar: los valores nuevos quedan aprendidos.
+    """
+    datos = dict(datos)
+    for campo in _catalogos:
+        if datos.get(campo):
+            catalogo = obtener(campo)
+            datos[campo] = catalogo.canonico(datos[campo])
+            catalogo.anotar(datos[campo])
+    return datos
+
+
+def canonizar_serie(campo, serie):
+    return obtener(campo).canonizar_serie(serie)
@@ -0,0 +1,213 @@
+"""
+Cifrado en reposo del libro de datos y del diario.
+
+El libro se cifra como un flujo de bloques (AES-256-GCM con la construcción
+STREAM: cada bloque lleva su propio nonce = prefijo aleatorio + contador +
+marca de último bloque), así que se cifra y descifra por bloques sin copias
+extra y un archivo truncado o con bloques reordenados no se acepta. Cada
+entrada del diario se cifra por separado, ligada a su secuencia y operación,
+de modo que agregar una entrada sigue costando una sola línea.
+
+La clave (32 bytes en base64 urlsafe) se toma de ALBERGUE_CLAVE o se pasa con
+`configurar` (p.ej. desde st.secrets); no se copia al entorno, así que los
+procesos hijos solo la tienen si se les pasa. Sin clave los datos se guardan en
+claro, como antes; un libro en claro se sigue leyendo con la clave activa y
+queda cifrado en su siguiente escritura.
+
+Uso:
+    python -m albergue.cifrado --generar-clave
+    ALBERGUE_CLAVE=... python -m albergue.cifrado --db datos_albergue.xlsx --cifrar
+    ALBERGUE_CLAVE=... python -m albergue.cifrado --db datos_albergue.xlsx --descifrar --salida plano.xlsx
+"""
+import argparse
+import base64
+import binascii
+import io
+import os
+import struct
+
+VARIABLE_CLAVE = 'ALBERGUE_CLAVE'
+
+MAGIA = b"ALBC\x01"
+BLOQUE = 256 * 1024
+_PREFIJO = 7  # bytes aleatorios del nonce; + 4 del contador + 1 de último bloque = 12
+_ETIQUETA = 16
+_CABECERA = struct.Struct(f">{len(MAGIA)}s{_PREFIJO}sI")
+
+_aes = None  # AESGCM con la clave activa, o None si los datos van en claro
+
+
+class ErrorCifrado(Exception):
+    """Clave ausente o incorrecta, o datos cifrados dañados."""
+
+
+def generar_clave():
+    return base64.urlsafe_b64encode(os.urandom(32)).decode('ascii')
+
+
+def configurar(clave=None):
+    """Activa el cifrado con `clave` (base64 de 32 bytes); None o '' lo desactiva."""
+    global _aes
+    if not clave:
+        _aes = None
+        return
+    try:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    except ImportError as e:
+        raise ErrorCifrado(f"{VARIABLE_CLAVE} está configurada pero falta el paquete 'cryptography'.") from e
+    try:
+        crudo = base64.urlsafe_b64decode(clave)
+    except (binascii.Error, ValueError) as e:
+        raise ErrorCifrado(f"{VARIABLE_CLAVE} no es base64 válido.") from e
+    if len(crudo) != 32:
+        raise ErrorCifrado(f"{VARIABLE_CLAVE} debe ser de 32 bytes (use --generar-clave).")
+    _aes = AESGCM(crudo)
+
+
+def activo():
+    return _aes is not None
+
+
+def _requerir():
+    if _aes is None:
+        raise ErrorCifrado(f"Los datos están cifrados: configure {VARIABLE_CLAVE}.")
+    return _aes
+
+
+def esta_cifrado(ruta):
+    try:
+        with open(ruta, 'rb') as f:
+            return f.read(len(MAGIA)) == MAGIA
+    except FileNotFoundError:
+        return False
+
+
+# --- FLUJOS (libro) ---
+def _nonce(prefijo, i, ultimo):
+    return prefijo + struct.pack(">IB", i, 1 if ultimo else 0)
+
+
+def cifrar_flujo(origen, destino, bloque=BLOQUE):
+    """Cifra `origen` (archivo binario) en `destino` bloque a bloque."""
+    aes = _requerir()
+    prefijo = os.urandom(_PREFIJO)
+    cabecera = _CABECERA.pack(MAGIA, prefijo, bloque)
+    destino.write(cabecera)
+    actual = origen.read(bloque)
+    i = 0
+    while True:
+        siguiente = origen.read(bloque)
+        ultimo = not siguiente
+        destino.write(aes.encrypt(_nonce(prefijo, i, ultimo), actual, cabecera))
+        if ultimo:
+            return
+        actual = siguiente
+        i += 1
+
+
+def bloques_descifrados(origen):
+    """Genera los bloques en claro de un flujo cifrado (verifica cada uno y que no falte el final)."""
+    from cryptography.exceptions import InvalidTag
+
+    aes = _requerir()
+    cabecera = origen.read(_CABECERA.size)
+    if len(cabecera) != _CABECERA.size or not cabecera.startswith(MAGIA):
+        raise ErrorCifrado("El archivo no tiene el formato cifrado esperado.")
+    _, prefijo, bloque = _CABECERA.unpack(cabecera)
+    tamano = bloque + _ETIQUETA
+    actual = origen.read(tamano)
+    i = 0
+    while True:
+        siguiente = origen.read(tamano)
+        ultimo = not siguiente
+        try:
+            yield aes.decrypt(_nonce(prefijo, i, ultimo), actual, cabecera)
+        except InvalidTag:
+            raise ErrorCifrado("Clave incorrecta o archivo cifrado dañado/truncado.") from None
+        if ultimo:
+            return
+        actual = siguiente
+        i += 1
+
+
+def descifrar_flujo(origen, destino):
+    for parte in bloques_descifrados(origen):
+        destino.write(parte)
+
+
+def abrir(ruta):
+    """
+    Origen para leer el libro: la propia ruta si está en claro, o un BytesIO
+    con su contenido descifrado (una sola pasada por bloques).
+    """
+    with open(ruta, 'rb') as f:
+        if f.read(len(MAGIA)) != MAGIA:
+            return ruta
+        f.seek(0)
+        buffer = io.BytesIO()
+        descifrar_flujo(f, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def leer_en_memoria(ruta):
+    """Contenido en claro del libro en un BytesIO (para modificarlo antes de cifrarlo de nuevo)."""
+    origen = abrir(ruta)
+    if isinstance(origen, io.BytesIO):
+        return origen
+    with open(origen, 'rb') as f:
+        return io.BytesIO(f.read())
+
+
+# --- REGISTROS (diario) ---
+def cifrar_registro(texto, contexto):
+    """Texto -> token base64 (nonce + cifrado) ligado a `contexto` (bytes)."""
+    aes = _requerir()
+    nonce = os.urandom(12)
+    return base64.b64encode(nonce + aes.encrypt(nonce, texto.encode('utf-8'), contexto)).decode('ascii')
+
+
+def descifrar_registro(token, contexto):
+    from cryptography.exceptions import InvalidTag
+
+    aes = _requerir()
+    crudo = base64.b64decode(token)
+    try:
+        return aes.decrypt(crudo[:12], crudo[12:], contexto).decode('utf-8')
+    except InvalidTag:
+        raise ErrorCifrado("Clave incorrecta o entrada del diario dañada.") from None
+
+
+configurar(os.environ.get(VARIABLE_CLAVE))
+
+
+def main(argv=None):
+    from . import almacen
+
+    parser = argparse.ArgumentParser(description="Cifrado en reposo del libro de datos y su diario.")
+    parser.add_argument('--generar-clave', action='store_true', help="Imprime una clave nueva para ALBERGUE_CLAVE.")
+    parser.add_argument('--db', default=almacen.DB_FILE, help="Archivo Excel de datos.")
+    parser.add_argument('--cifrar', action='store_true', help="Cifra en sitio el libro y el diario existentes.")
+    parser.add_argument('--descifrar', action='store_true', help="Escribe una copia en claro del libro (ver --salida).")
+    parser.add_argument('--salida', default=None, help="Destino de --descifrar.")
+    args = parser.parse_args(argv)
+
+    if args.generar_clave:
+        print(generar_clave())
+    if not (args.cifrar or args.descifrar):
+        return
+    _requerir()
+    almacen.configurar(args.db)
+    if args.cifrar:
+        print(f"Cifrados: {almacen.cifrar_en_reposo()} archivo(s).")
+    if args.descifrar:
+        salida = args.salida or f"{os.path.splitext(args.db)[0]}_descifrado.xlsx"
+        with almacen.bloqueo:
+            almacen.recuperar()  # el libro incluye todo el diario
+            with open(salida, 'wb') as f:
+                f.write(leer_en_memoria(args.db).getvalue())
+        print(f"Copia en claro escrita en {salida}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,448 @@
+"""
+Diario de escritura (write-ahead) de todas las modificaciones del registro.
+
+Cada alta, edición, encuesta y baja se agrega primero al diario (JSON Lines,
+solo se agrega al final) con un número de secuencia, y después se aplica al
+libro de Excel. El libro guarda en la hoja Control hasta qué secuencia
+incluye cada hoja, así que al leerlo se vuelven a aplicar las entradas
+posteriores (recuperación tras una caída). Como el diario empieza con el
+libro vacío (o con una instantánea del libro que ya existía), reproducirlo
+hasta una fecha reconstruye el estado de ese momento.
+
+El fsync se hace por lotes: quien espera a que su entrada sea durable hace un
+solo fsync que cubre también las entradas que llegaron mientras tanto.
+Varios procesos pueden escribir el mismo diario (siempre bajo
+`almacen.bloqueo`, que es un candado entre procesos): antes de cada entrada se
+retoma la secuencia y el segmento activo que dejó el último escritor.
+Modo con la variable ALBERGUE_FSYNC: 'lote' (por defecto), 'siempre', 'nunca'.
+Con una clave activa (ver `cifrado`) los datos de cada entrada se guardan
+cifrados; secuencia, fecha y operación quedan legibles para la reproducción.
+
+Uso:
+    python -m albergue.diario --db datos_albergue.xlsx --recuperar
+    python -m albergue.diario --db datos_albergue.xlsx --hasta "2026-10-01 18:00" --salida al_1_oct.xlsx
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from . import cifrado
+from .bitacora import Delta, aplicar
+from .folios import normalize_id
+
+# Operaciones
+ALTA = 'alta'
+EDICION = 'edicion'
+ENCUESTA = 'encuesta'
+BAJA = 'baja'
+INSTANTANEA = 'instantanea'  # contenido completo de las hojas al empezar el diario
+
+HOJA_DE = {ALTA: 'Personas', EDICION: 'Personas', BAJA: 'Personas', ENCUESTA: 'Encuestas'}
+HOJAS = ('Personas', 'Encuestas')
+
+MODO_FSYNC = os.environ.get('ALBERGUE_FSYNC', 'lote')
+VENTANA_FSYNC = 0.002  # segundos que espera el fsync de un lote a que lleguen más entradas
+MAX_BYTES_SEGMENTO = 4 * 1024 * 1024
+
+_SEGMENTO = re.compile(r"\.diario\.(\d+)\.jsonl$")
+
+
+class DiarioDanado(Exception):
+    """Una entrada del diario (que no es la última, incompleta) no se puede leer."""
+
+
+class Entrada:
+    __slots__ = ('seq', 'marca', 'op', 'datos')
+
+    def __init__(self, seq, marca, op, datos):
+        self.seq = seq
+        self.marca = marca
+        self.op = op
+        self.datos = datos
+
+    def afecta(self, hoja):
+        return HOJA_DE.get(self.op) == hoja or (self.op == INSTANTANEA and hoja in self.datos)
+
+    def _contexto(self):
+        # Liga el cifrado a la posición y tipo de la entrada: no se pueden intercambiar
+        return f"{self.seq}|{self.op}".encode('utf-8')
+
+    def a_linea(self):
+        linea = {'seq': self.seq, 'marca': self.marca, 'op': self.op}
+        if cifrado.activo():
+            linea['cifrado'] = cifrado.cifrar_registro(
+                json.dumps(self.datos, ensure_ascii=False, default=a_json), self._contexto())
+        else:
+            linea['datos'] = self.datos
+        return json.dumps(linea, ensure_ascii=False, default=a_json) + "\n"
+
+    @classmethod
+    def desde_dict(cls, d):
+        entrada = cls(d['seq'], d['marca'], d['op'], d.get('datos'))
+        if 'datos' not in d:
+            entrada.datos = json.loads(cifrado.descifrar_registro(d['cifrado'], entrada._contexto()))
+        return entrada
+
+    @classmethod
+    def desde_linea(cls, linea):
+        return cls.desde_dict(json.loads(linea))
+
+    def __repr__(self):
+        return f"Entrada({self.seq}, {self.op!r}, {self.marca!r})"
+
+
+def a_json(valor):
+    """Escalares de numpy/pandas a tipos nativos; el resto como texto."""
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return str(valor)
+
+
+def registros(df):
+    """DataFrame -> lista de dicts serializable (NaN -> None)."""
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def fsync_directorio(ruta):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(ruta)), os.O_RDONLY)
+    except OSError:
+        return  # (Windows no permite abrir directorios)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Diario:
+    """Diario de un libro: segmento activo `<base>.diario.jsonl` y archivados `<base>.diario.<seq>.jsonl`."""
+
+    def __init__(self, db_file):
+        self.base = os.path.splitext(db_file)[0]
+        self.ruta = self.base + '.diario.jsonl'
+        self._cond = threading.Condition()
+        self._archivo = None
+        self._sincronizando = False
+        self._firma = None  # (inodo, tamaño) del segmento activo tras nuestra última lectura/escritura
+        self._reparar_cola()
+        self._secuencia = self._ultima_secuencia()
+        self._durable = self._secuencia
+        self._firma = self._firma_activo()
+
+    # --- Segmentos ---
+    def segmentos(self):
+        """[(primera secuencia o None para el activo, ruta)] en orden."""
+        archivados = []
+        for ruta in glob.glob(glob.escape(self.base) + '.diario.*.jsonl'):
+            m = _SEGMENTO.search(ruta)
+            if m:
+                archivados.append((int(m.group(1)), ruta))
+        archivados.sort()
+        return archivados + [(None, self.ruta)]
+
+    def _reparar_cola(self):
+        """Descarta una última línea incompleta (escritura interrumpida por una caída)."""
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, 'rb+') as f:
+            datos = f.read()
+            if datos and not datos.endswith(b"\n"):
+                f.truncate(datos.rfind(b"\n") + 1)
+
+    def _ultima_secuencia(self):
+        for _, ruta in reversed(self.segmentos()):
+            ultima = self._ultima_en(ruta)
+            if ultima is not None:
+                return ultima
+        return 0
+
+    @staticmethod
+    def _ultima_en(ruta, bloque=64 * 1024):
+        """Secuencia de la última entrada completa del segmento (lee solo el final del archivo)."""
+        if not os.path.exists(ruta):
+            return None
+        with open(ruta, 'rb') as f:
+            tamano = f.seek(0, os.SEEK_END)
+            while True:
+                inicio = max(0, tamano - bloque)
+                f.seek(inicio)
+                lineas = f.read(tamano - inicio).split(b"\n")
+                if inicio > 0:
+                    lineas = lineas[1:]  # la primera puede estar cortada
+                for linea in reversed(lineas):
+                    try:
+                        return json.loads(linea)['seq']  # sin descifrar los datos
+                    except (ValueError, KeyError):
+                        continue
+                if inicio == 0:
+                    return None
+                bloque *= 4
+
+    @staticmethod
+    def _primera_en(ruta):
+        with open(ruta, encoding='utf-8') as f:
+            try:
+                return json.loads(f.readline())['seq']
+            except (ValueError, KeyError):
+                return None
+
+    def _firma_activo(self):
+        try:
+            st = os.stat(self.ruta)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size)
+
+    def _sincronizar(self):
+        """
+        Si otro proceso agregó entradas o rotó el segmento activo desde nuestra
+        última escritura, retoma su secuencia y reabre el segmento. Llamar con
+        `_cond` tomado y dentro del candado entre procesos.
+        """
+        firma = self._firma_activo()
+        if firma == self._firma:
+            return
+        if self._archivo is not None and (firma is None or os.fstat(self._archivo.fileno()).st_ino != firma[0]):
+            self._archivo.close()
+            self._archivo = None
+        self._reparar_cola()
+        ultima = self._ultima_secuencia()
+        if ultima > self._secuencia:
+            self._secuencia = ultima
+        self._firma = self._firma_activo()
+
+    def _abrir(self):
+        if self._archivo is None:
+            self._archivo = open(self.ruta, 'a', encoding='utf-8')
+        return self._archivo
+
+    @staticmethod
+    def _leer_segmento(ruta, desde=0):
+        """
+        Entradas del segmento con secuencia > desde (las anteriores no se
+        descifran). Solo se tolera una última línea incompleta (escritura
+        interrumpida); cualquier otra línea ilegible lanza DiarioDanado.
+        """
+        if not os.path.exists(ruta):
+            return
+        with open(ruta, encoding='utf-8') as f:
+            for numero, linea in enumerate(f, 1):
+                try:
+                    d = json.loads(linea)
+                    if d['seq'] <= desde:
+                        continue
+                    entrada = Entrada.desde_dict(d)
+                except (ValueError, KeyError) as e:
+                    if not linea.endswith("\n") and not f.read(1):
+                        return
+                    raise DiarioDanado(f"Entrada ilegible en {ruta}, línea {numero}: {e}") from e
+                yield entrada
+
+    @property
+    def secuencia(self):
+        with self._cond:
+            self._sincronizar()
+            return self._secuencia
+
+    def vacio(self):
+        return self.secuencia == 0
+
+    def avanzar(self, seq):
+        """Nunca reutilizar una secuencia que el libro ya dice incluir."""
+        with self._cond:
+            if seq > self._secuencia:
+                self._secuencia = self._durable = seq
+
+    # --- Escritura ---
+    def registrar(self, op, datos):
+        """Agrega una entrada (queda en el buffer del sistema operativo) y devuelve su secuencia."""
+        with self._cond:
+            self._sincronizar()
+            archivo = self._abrir()
+            self._secuencia += 1
+            entrada = Entrada(self._secuencia, datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"), op, datos)
+            archivo.write(entrada.a_linea())
+            archivo.flush()
+            st = os.fstat(archivo.fileno())
+            self._firma = (st.st_ino, st.st_size)
+            if MODO_FSYNC == 'siempre':
+                os.fsync(self._archivo.fileno())
+                self._durable = entrada.seq
+            elif MODO_FSYNC == 'nunca':
+                self._durable = entrada.seq
+            return entrada.seq
+
+    def confirmar(self, seq):
+        """Espera a que la entrada `seq` esté en disco (un fsync por lote de entradas)."""
+        with self._cond:
+            while self._durable < seq:
+                if self._sincronizando:
+                    self._cond.wait()
+                    continue
+                self._sincronizando = True
+                self._cond.release()
+                try:
+                    time.sleep(VENTANA_FSYNC)
+                    with self._cond:
+                        hasta = self._secuencia
+                        fd = self._abrir().fileno()
+                    try:
+                        os.fsync(fd)
+                    except OSError:
+                        # Otro proceso rotó el segmento (y lo sincronizó al archivarlo)
+                        # y otro hilo ya cerró nuestro descriptor
+                        pass
+                finally:
+                    self._cond.acquire()
+                    self._sincronizando = False
+                self._durable = max(self._durable, hasta)
+                self._cond.notify_all()
+
+    def rotar(self):
+        """Archiva el segmento activo si ya es grande (la reproducción sigue leyendo los archivados)."""
+        with self._cond:
+            if not os.path.exists(self.ruta) or os.path.getsize(self.ruta) < MAX_BYTES_SEGMENTO:
+                return
+            primera = self._primera_en(self.ruta)
+            if primera is None:
+                return
+            if self._archivo is not None:
+                os.fsync(self._archivo.fileno())
+                self._archivo.close()
+                self._archivo = None
+            self._durable = self._secuencia
+            os.replace(self.ruta, f"{self.base}.diario.{primera:010d}.jsonl")
+            fsync_directorio(self.ruta)
+            self._firma = None
+
+    def cerrar(self):
+        with self._cond:
+            if self._archivo is not None:
+                self._archivo.flush()
+                os.fsync(self._archivo.fileno())
+                self._archivo.close()
+                self._archivo = None
+            self._durable = self._secuencia
+
+    def cifrar_segmentos(self):
+        """
+        Reescribe cifradas las entradas en claro de todos los segmentos (con la
+        clave activa). Llamar dentro de `almacen.bloqueo`. Devuelve cuántos segmentos cambió.
+        """
+        cambiados = 0
+        with self._cond:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+            for _, ruta in self.segmentos():
+                if not os.path.exists(ruta):
+                    continue
+                with open(ruta, encoding='utf-8') as f:
+                    lineas = f.readlines()
+                if all('cifrado' in json.loads(linea) for linea in lineas):
+                    continue
+                temporal = ruta + '.tmp'
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    for linea in lineas:
+                        f.write(Entrada.desde_linea(linea).a_linea())
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporal, ruta)
+                cambiados += 1
+            fsync_directorio(self.ruta)
+            self._durable = self._secuencia
+            self._firma = self._firma_activo()
+        return cambiados
+
+    # --- Lectura ---
+    def entradas(self, desde=0, hasta=None):
+        """Entradas con secuencia > desde (y marca <= hasta si se indica: texto 'YYYY-MM-DD HH:MM...')."""
+        segmentos = self.segmentos()
+        for i, (_, ruta) in enumerate(segmentos):
+            siguiente = segmentos[i + 1][0] if i + 1 < len(segmentos) else None
+            if siguiente is not None and siguiente <= desde + 1:
+                continue
+            for entrada in self._leer_segmento(ruta, desde):
+                if hasta is not None and entrada.marca[:len(hasta)] > hasta:
+                    return
+                yield entrada
+
+
+# --- REPRODUCCIÓN ---
+def reconstruir(df, hoja, entradas):
+    """Aplica a la hoja las entradas que la afectan, en orden. Devuelve el DataFrame resultante."""
+    altas = []
+    folios = None
+
+    def aplicar_altas(df):
+        if not altas:
+            return df
+        nuevo = pd.concat([df, pd.DataFrame(altas)], ignore_index=True)
+        altas.clear()
+        return nuevo
+
+    for entrada in entradas:
+        if not entrada.afecta(hoja):
+            continue
+        op, datos = entrada.op, entrada.datos
+        if op == INSTANTANEA:
+            altas.clear()
+            df = pd.DataFrame(datos[hoja]['filas'], columns=datos[hoja]['columnas'])
+            folios = None
+        elif op == ALTA:
+            if folios is None:
+                folios = set(df['folio'].apply(normalize_id)) if 'folio' in df.columns else set()
+            folio = normalize_id(datos['registro']['folio'])
+            if folio not in folios:
+                folios.add(folio)
+                altas.append(datos['registro'])
+        else:
+            df = aplicar_altas(df)
+            if op == EDICION:
+                aplicar(df, [Delta(datos['folio'], c['campo'], c.get('anterior'), c.get('nuevo'), entrada.marca)
+                             for c in datos['cambios']])
+            elif op == BAJA:
+                for campo in ('fecha_salida', 'motivo_salida'):
+                    if campo not in df.columns:
+                        df[campo] = ''
+                    df[campo] = df[campo].astype(object)
+                mascara = df['folio'].apply(normalize_id).isin({normalize_id(f) for f in datos['folios']})
+                df.loc[mascara, 'fecha_salida'] = datos['fecha_salida']
+                df.loc[mascara, 'motivo_salida'] = datos['motivo']
+            elif op == ENCUESTA:
+                encuesta = datos['encuesta']
+                if not df.empty and 'folio_persona' in df.columns:
+                    df = df[df['folio_persona'].astype(str) != str(encuesta['folio_persona'])]
+                df = pd.concat([df, pd.DataFrame([encuesta])], ignore_index=True)
+    return aplicar_altas(df)
+
+
+def main(argv=None):
+    from . import almacen
+
+    parser = argparse.ArgumentParser(description="Recuperación y restauración desde el diario de escritura.")
+    parser.add_argument('--db', default=almacen.DB_FILE, help="Archivo Excel de datos.")
+    parser.add_argument('--recuperar', action='store_true',
+                        help="Aplica al libro las entradas pendientes (o lo rehace completo si está dañado).")
+    parser.add_argument('--hasta', default=None, help="Restaura el estado a esta fecha/hora ('YYYY-MM-DD HH:MM:SS').")
+    parser.add_argument('--salida', default=None, help="Libro donde escribir la restauración.")
+    args = parser.parse_args(argv)
+
+    almacen.configurar(args.db)
+    if args.recuperar:
+        print(f"Libro recuperado hasta la secuencia {almacen.recuperar()}.")
+    if args.hasta:
+        salida = args.salida or f"{os.path.splitext(args.db)[0]}_restaurado.xlsx"
+        seq = almacen.restaurar(salida, hasta=args.hasta)
+        print(f"Estado al {args.hasta} (secuencia {seq}) escrito en {salida}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Edades derivadas de `fecha_nacimiento` para toda la hoja Personas.
+
+La columna `edad` se captura una sola vez al ingreso y envejece; aquí se
+calculan edad en años cumplidos, si es menor de edad y su rango de edad para
+todas las filas en una sola pasada vectorizada. El resultado se guarda por
+(versión de datos, día): se recalcula solo si cambian los datos o la fecha.
+Si la fecha de nacimiento falta o no es válida se usa la edad capturada.
+"""
+from datetime import date
+
+import pandas as pd
+
+from . import almacen
+from .folios import normalize_id
+
+MAYORIA_EDAD = 18
+
+# Rangos de edad: límite superior incluido -> etiqueta
+RANGOS_EDAD = [(11, '0-11'), (17, '12-17'), (29, '18-29'), (44, '30-44'), (59, '45-59'), (200, '60+')]
+SIN_REGISTRO = 'Sin Registro'
+
+_clave = None
+_tabla = None
+_por_folio = {}
+
+
+def _fechas(serie):
+    return pd.to_datetime(serie.astype(str).str.strip().str[:10], format='%Y-%m-%d', errors='coerce')
+
+
+def edades_cumplidas(fechas_nacimiento, hoy=None):
+    """Años cumplidos a `hoy` para una serie de fechas (texto o fecha); NaN si no es válida."""
+    hoy = hoy or date.today()
+    nac = _fechas(fechas_nacimiento)
+    antes_del_cumple = (nac.dt.month > hoy.month) | ((nac.dt.month == hoy.month) & (nac.dt.day > hoy.day))
+    edades = hoy.year - nac.dt.year - antes_del_cumple.astype(int)
+    return edades.where(nac.notna() & (nac <= pd.Timestamp(hoy)))
+
+
+def desde_nacimiento(fecha_nacimiento, hoy=None):
+    """Años cumplidos desde una fecha de nacimiento válida, o None (entonces vale la edad capturada)."""
+    edad = edades_cumplidas(pd.Series([fecha_nacimiento]), hoy).iloc[0]
+    return None if pd.isna(edad) else int(edad)
+
+
+def rango_edad(edades):
+    """Rango de edad (categórico) de una serie de edades numéricas."""
+    limites = [-1] + [limite for limite, _ in RANGOS_EDAD]
+    rangos = pd.cut(edades, bins=limites, labels=[etiqueta for _, etiqueta in RANGOS_EDAD])
+    return rangos.cat.add_categories([SIN_REGISTRO]).fillna(SIN_REGISTRO)
+
+
+def derivar(df, hoy=None):
+    """DataFrame con el mismo índice que `df` y columnas edad, menor y rango_edad."""
+    capturada = pd.to_numeric(df['edad'], errors='coerce') if 'edad' in df.columns else pd.Series(float('nan'), index=df.index)
+    if 'fecha_nacimiento' in df.columns:
+        edad = edades_cumplidas(df['fecha_nacimiento'], hoy).fillna(capturada)
+    else:
+        edad = capturada
+    return pd.DataFrame({
+        'edad': edad.astype('Int64'),
+        'menor': (edad < MAYORIA_EDAD).fillna(False).astype(bool),
+        'rango_edad': rango_edad(edad),
+    }, index=df.index)
+
+
+def tabla_edades():
+    """Edades de todas las personas, indexadas por folio normalizado (al día de hoy)."""
+    global _clave, _tabla, _por_folio
+    almacen.inicializar_base()
+    with almacen.bloqueo:
+        clave = (almacen.version(), date.today())
+        if _clave == clave:
+            return _tabla
+        df = almacen.vista_hoja('Personas')
+        tabla = derivar(df)
+        tabla.index = df['folio'].apply(normalize_id)
+        _por_folio = {folio: (None if pd.isna(e) else int(e)) for folio, e in zip(tabla.index, tabla['edad'])}
+        _tabla, _clave = tabla, clave
+        return tabla
+
+
+@almacen.al_olvidar
+def _olvidar():
+    global _clave, _tabla, _por_folio
+    _clave, _tabla, _por_folio = None, None, {}
+
+
+def edad_de(folio, defecto=None):
+    """Edad actual de la persona (O(1) tras el primer cálculo del día), o `defecto`."""
+    tabla_edades()
+    edad = _por_folio.get(normalize_id(folio))
+    return defecto if edad is None else edad
@@ -0,0 +1,62 @@
+"""Cuestionario social (hoja Encuestas)."""
+import pandas as pd
+
+from . import almacen, diario, eventos
+from .folios import normalize_id
+
+# Índice folio (texto) -> posición de su primera encuesta, por versión de datos
+_version_indice = None
+_indice = {}
+
+
+def _buscar(df_encuestas, folio):
+    if df_encuestas.empty or 'folio_persona' not in df_encuestas.columns:
+        return None
+    match = df_encuestas[df_encuestas['folio_persona'].astype(str) == str(folio)]
+    if match.empty:
+        return None
+    return match.iloc[0]
+
+
+@almacen.al_olvidar
+def _olvidar_indice():
+    global _version_indice, _indice
+    _version_indice, _indice = None, {}
+
+
+def obtener_encuesta(folio, df_encuestas=None):
+    """Encuesta registrada para el folio, o None."""
+    if df_encuestas is not None:
+        return _buscar(df_encuestas, folio)
+    global _version_indice, _indice
+    almacen.inicializar_base()
+    with almacen.bloqueo:
+        try:
+            df = almacen.vista_hoja('Encuestas')
+        except ValueError:  # hoja ausente; un diario dañado o una clave incorrecta se propagan
+            return None
+        if _version_indice != almacen.version():
+            indice = {}
+            if 'folio_persona' in df.columns:
+                for pos, f in enumerate(df['folio_persona'].astype(str)):
+                    indice.setdefault(f, pos)
+            _indice, _version_indice = indice, almacen.version()
+        pos = _indice.get(str(folio))
+        return None if pos is None else df.iloc[pos].copy()
+
+
+def guardar_encuesta(nueva_encuesta):
+    """Inserta o reemplaza la encuesta de nueva_encuesta['folio_persona']."""
+    with almacen.bloqueo:
+        df_actual = almacen.cargar_encuestas()
+        almacen.anotar(diario.ENCUESTA, {'encuesta': nueva_encuesta})
+        
+        # Eliminar registro previo si existe (Actualizar/Editar)
+        folio = nueva_encuesta['folio_persona']
+        if not df_actual.empty and 'folio_persona' in df_actual.columns:
+            # Convertir a string ambos lados para asegurar match
+            df_actual = df_actual[df_actual['folio_persona'].astype(str) != str(folio)]
+        
+        df_nuevo = pd.concat([df_actual, pd.DataFrame([nueva_encuesta])], ignore_index=True)
+        almacen.escribir_hoja(df_nuevo, 'Encuestas')
+        eventos.feed.publicar(eventos.ENCUESTA, [normalize_id(folio)])
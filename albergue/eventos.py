@@ -0,0 +1,97 @@
+"""
+Feed de cambios en proceso: registro versionado de las escrituras (altas,
+ediciones, encuestas, bajas) para que las sesiones se enteren de lo que
+cambió sin volver a leer el libro de Excel.
+
+Cada escritura publica un Evento con un número de versión creciente. Un
+consumidor guarda la última versión que vio y pide `feed.desde(version)`;
+si el historial ya no alcanza (se descartaron eventos viejos) recibe None y
+debe refrescar todo.
+"""
+import threading
+import time
+from collections import deque
+
+# Tipos de evento
+ALTA = 'alta'
+EDICION = 'edicion'
+ENCUESTA = 'encuesta'
+BAJA = 'baja'
+EXTERNO = 'externo'  # el archivo cambió fuera de este proceso: afecta a todo
+
+
+class Evento:
+    __slots__ = ('version', 'tipo', 'folios', 'marca')
+
+    def __init__(self, version, tipo, folios, marca):
+        self.version = version
+        self.tipo = tipo
+        self.folios = folios
+        self.marca = marca
+
+    def afecta(self, folio):
+        return self.tipo == EXTERNO or folio in self.folios
+
+    def a_dict(self):
+        return {'version': self.version, 'tipo': self.tipo, 'folios': list(self.folios), 'marca': self.marca}
+
+    def __repr__(self):
+        return f"Evento({self.version}, {self.tipo!r}, {self.folios!r})"
+
+
+class FeedCambios:
+    def __init__(self, max_eventos=2000):
+        self._eventos = deque(maxlen=max_eventos)
+        self._version = 0
+        self._condicion = threading.Condition()
+        self._suscriptores = []
+
+    @property
+    def version(self):
+        return self._version
+
+    def publicar(self, tipo, folios=()):
+        """Registra un evento y avisa a suscriptores y a quienes esperan. Devuelve su versión."""
+        with self._condicion:
+            self._version += 1
+            evento = Evento(self._version, tipo, tuple(str(f) for f in folios), time.time())
+            self._eventos.append(evento)
+            self._condicion.notify_all()
+            suscriptores = list(self._suscriptores)
+        for funcion in suscriptores:
+            try:
+                funcion(evento)
+            except Exception:
+                # Un suscriptor con fallas no debe impedir la escritura
+                pass
+        return evento.version
+
+    def desde(self, version):
+        """Eventos posteriores a `version`, o None si ya no están todos en memoria."""
+        with self._condicion:
+            if version >= self._version:
+                return []
+            if not self._eventos or self._eventos[0].version > version + 1:
+                return None
+            return [e for e in self._eventos if e.version > version]
+
+    def esperar(self, version, timeout=None):
+        """Bloquea hasta que haya eventos posteriores a `version` (o venza timeout) y los devuelve."""
+        with self._condicion:
+            self._condicion.wait_for(lambda: self._version > version, timeout=timeout)
+        return self.desde(version)
+
+    def suscribir(self, funcion):
+        """Llama funcion(evento) en cada publicación. Devuelve una función para cancelar."""
+        with self._condicion:
+            self._suscriptores.append(funcion)
+
+        def cancelar():
+            with self._condicion:
+                if funcion in self._suscriptores:
+                    self._suscriptores.remove(funcion)
+        return cancelar
+
+
+# Feed compartido por todas las sesiones del proceso
+feed = FeedCambios()
@@ -0,0 +1,216 @@
+"""
+Paquete de reportes de fin de mes: varios PDF y un Excel en un solo ZIP.
+
+Las tablas se calculan una vez en el proceso principal (reutilizando la
+caché de `analitica`) y cada documento se genera en un pool de procesos;
+los documentos se escriben en el ZIP conforme terminan.
+
+Uso:
+    python -m albergue.exportacion --mes 2026-09 --salida reportes_2026-09.zip
+"""
+import argparse
+import atexit
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+from fpdf import FPDF
+
+from . import almacen, analitica, cifrado, edades
+from .folios import normalize_id
+from .reportes import generar_pdf_reporte
+
+MAX_PROCESOS = int(os.environ.get('ALBERGUE_PROCESOS_EXPORTACION') or min(4, os.cpu_count() or 1))
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def _obtener_pool():
+    """Pool de procesos compartido (se crea al primer uso; 'spawn' es seguro con los hilos de Streamlit)."""
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_PROCESOS, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_sin_clave)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _sin_clave():
+    """Los workers solo reciben tablas ya leídas: no necesitan la clave aunque esté en el entorno."""
+    os.environ.pop(cifrado.VARIABLE_CLAVE, None)
+    cifrado.configurar(None)
+
+
+# --- DOCUMENTOS (se ejecutan en los procesos del pool: solo reciben datos) ---
+def _latin1(texto):
+    return str(texto).encode('latin-1', 'replace').decode('latin-1')
+
+
+def _pdf_tablas(titulo, secciones, mes):
+    """PDF con una tabla por sección. `secciones` = [(subtítulo, DataFrame)]."""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, _latin1(f"{titulo} - Albergue Belén"), ln=True, align='C')
+    pdf.set_font("Arial", size=10)
+    pdf.cell(0, 8, _latin1(f"Periodo: {mes}    Generado el: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"), ln=True, align='R')
+    pdf.ln(5)
+
+    for subtitulo, tabla in secciones:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 10, _latin1(subtitulo), ln=True)
+        if tabla.empty:
+            pdf.set_font("Arial", size=10)
+            pdf.cell(0, 8, "Sin registros.", border=1, ln=True)
+            pdf.ln(5)
+            continue
+        tabla = tabla.reset_index()
+        columnas = [str(c) for c in tabla.columns][:10]
+        ancho = 190 / len(columnas)
+        caracteres = max(4, int(ancho / 2.2))
+        pdf.set_font("Courier", 'B', 9)
+        for columna in columnas:
+            pdf.cell(ancho, 7, _latin1(columna[:caracteres]), border=1)
+        pdf.ln()
+        pdf.set_font("Courier", size=9)
+        for fila in tabla.iloc[:, :len(columnas)].itertuples(index=False, name=None):
+            for valor in fila:
+                pdf.cell(ancho, 7, _latin1('' if pd.isna(valor) else valor)[:caracteres], border=1)
+            pdf.ln()
+        pdf.ln(5)
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def _pdf_firmas_reglamento(firmantes, mes):
+    """Lista de firmas del reglamento: una fila por adulto con espacio para firmar."""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, _latin1("Firmas del Reglamento - Albergue Belén"), ln=True, align='C')
+    pdf.set_font("Arial", size=10)
+    pdf.cell(0, 8, _latin1(f"Adultos con ingreso en {mes}: {len(firmantes)}"), ln=True, align='R')
+    pdf.ln(5)
+    encabezados = [("Folio", 22), ("Nombre", 70), ("Ingreso", 38), ("Firma", 60)]
+    pdf.set_font("Arial", 'B', 10)
+    for texto, ancho in encabezados:
+        pdf.cell(ancho, 8, texto, border=1)
+    pdf.ln()
+    pdf.set_font("Arial", size=10)
+    for folio, nombre, ingreso in firmantes.itertuples(index=False, name=None):
+        pdf.cell(22, 12, _latin1(folio), border=1)
+        pdf.cell(70, 12, _latin1(nombre)[:34], border=1)
+        pdf.cell(38, 12, _latin1(ingreso)[:16], border=1)
+        pdf.cell(60, 12, "", border=1)
+        pdf.ln()
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def _generar_excel(hojas):
+    """Un libro con una hoja por tabla. `hojas` = {nombre: DataFrame}."""
+    salida = io.BytesIO()
+    with pd.ExcelWriter(salida) as writer:
+        for nombre, tabla in hojas.items():
+            tabla.to_excel(writer, sheet_name=nombre)
+    return salida.getvalue()
+
+
+# --- PREPARACIÓN (proceso principal) ---
+def firmantes_reglamento(mes):
+    """Adultos que ingresaron en `mes` (YYYY-MM), hayan salido o no: folio, nombre y fecha de ingreso."""
+    personas = almacen.cargar_datos()
+    ingreso = personas['fecha_ingreso'].fillna('').astype(str).str.strip()
+    elegidos = ingreso.str.startswith(mes) & ~edades.derivar(personas)['menor']
+    return pd.DataFrame({
+        'folio': personas.loc[elegidos, 'folio'].apply(normalize_id),
+        'nombre': personas.loc[elegidos, 'nombre'].fillna('').astype(str),
+        'fecha_ingreso': ingreso[elegidos],
+    }).reset_index(drop=True)
+
+
+def preparar_documentos(mes=None):
+    """Calcula las tablas una sola vez y devuelve [(archivo, función, argumentos)] para el pool."""
+    mes = mes or datetime.now().strftime('%Y-%m')
+    mov_diario, mov_mensual = analitica.movimientos()
+    mov_diario_mes = mov_diario[[str(d).startswith(mes) for d in mov_diario.index]]
+
+    activos = analitica.ACTIVOS
+    ocupacion = [
+        ("Personas activas por tipo", analitica.conteos(['tipo'], poblacion=activos).set_index('tipo')),
+        ("Personas activas por género", analitica.conteos(['genero'], poblacion=activos).set_index('genero')),
+        ("Personas activas por rango de edad", analitica.pivote(['rango_edad'], 'genero', poblacion=activos)),
+    ]
+    del_mes = {'mes_ingreso': [mes]}
+    demografia = [
+        ("Activos: nacionalidad por género", analitica.pivote(['nacionalidad'], 'genero', poblacion=activos)),
+        ("Activos: nacionalidad por rango de edad", analitica.pivote(['nacionalidad'], 'rango_edad', poblacion=activos)),
+        (f"Ingresos de {mes}: nacionalidad por género", analitica.pivote(['nacionalidad'], 'genero', del_mes)),
+        (f"Ingresos de {mes}: nacionalidad y estado migratorio",
+         analitica.conteos(['nacionalidad', 'estado_migratorio'], del_mes).set_index(['nacionalidad', 'estado_migratorio'])),
+    ]
+    firmantes = firmantes_reglamento(mes)
+
+    hojas = dict(zip(
+        ['Mov. diarios', 'Mov. mensuales', 'Ocup. tipo', 'Ocup. género', 'Ocup. edad',
+         'Activos nac-género', 'Activos nac-edad', 'Ingresos nac-género', 'Ingresos nac-migratorio',
+         'Firmas reglamento'],
+        [mov_diario_mes, mov_mensual] + [tabla for _, tabla in ocupacion + demografia] + [firmantes.set_index('folio')],
+    ))
+
+    return [
+        (f"movimientos_{mes}.pdf", generar_pdf_reporte, (mov_diario_mes, mov_mensual)),
+        (f"ocupacion_{mes}.pdf", _pdf_tablas, ("Ocupación", ocupacion, mes)),
+        (f"demografia_nacionalidad_{mes}.pdf", _pdf_tablas, ("Demografía por Nacionalidad", demografia, mes)),
+        (f"firmas_reglamento_{mes}.pdf", _pdf_firmas_reglamento, (firmantes, mes)),
+        (f"reportes_{mes}.xlsx", _generar_excel, (hojas,)),
+    ]
+
+
+def exportar_paquete(destino, mes=None, progreso=None, en_paralelo=True):
+    """
+    Genera el paquete del mes y lo escribe como ZIP en `destino` (ruta o
+    archivo binario). `progreso(hechos, total, archivo)` se llama al terminar
+    cada documento. Devuelve la lista de archivos incluidos.
+    """
+    documentos = preparar_documentos(mes)
+    total = len(documentos)
+    incluidos = []
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as paquete:
+        if en_paralelo:
+            pool = _obtener_pool()
+            futuros = {pool.submit(funcion, *args): archivo for archivo, funcion, args in documentos}
+            resultados = ((futuros[f], f.result()) for f in as_completed(futuros))
+        else:
+            resultados = ((archivo, funcion(*args)) for archivo, funcion, args in documentos)
+        for archivo, contenido in resultados:
+            paquete.writestr(archivo, contenido)
+            incluidos.append(archivo)
+            if progreso is not None:
+                progreso(len(incluidos), total, archivo)
+    return incluidos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paquete ZIP de reportes del mes.")
+    parser.add_argument('--mes', default=None, help="Periodo YYYY-MM (por defecto el mes actual).")
+    parser.add_argument('--salida', default=None, help="Archivo ZIP de salida.")
+    parser.add_argument('--db', default=almacen.DB_FILE, help="Archivo Excel de datos.")
+    parser.add_argument('--serial', action='store_true', help="Generar sin pool de procesos.")
+    args = parser.parse_args(argv)
+
+    almacen.configurar(args.db)
+    mes = args.mes or datetime.now().strftime('%Y-%m')
+    salida = args.salida or f"reportes_{mes}.zip"
+    exportar_paquete(salida, mes, lambda hechos, total, archivo: print(f"[{hechos}/{total}] {archivo}"),
+                     en_paralelo=not args.serial)
+    print(f"Paquete generado: {salida}")
+
+
+if __name__ == '__main__':
+    main()
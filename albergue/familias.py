@@ -0,0 +1,200 @@
+"""
+Grafo familiar: titular -> acompañantes activos e inactivos.
+
+Se mantiene en memoria (compartido por proceso) y se actualiza con cada
+alta, edición y baja propias, igual que `residentes.registro_activos`; si los
+datos cambiaron por fuera, se reconstruye desde la hoja Personas. Así validar
+el límite de acompañantes, asignar la siguiente letra y dar de baja a un
+grupo familiar no recorren la tabla.
+
+El límite cuenta solo acompañantes activos: quien ya salió libera su lugar,
+pero su letra no se vuelve a asignar.
+"""
+from collections import namedtuple
+
+import pandas as pd
+
+from . import almacen
+from .folios import normalize_id
+
+EstadoFamilia = namedtuple('EstadoFamilia', 'titular limite activos inactivos restantes siguiente_letra')
+
+
+def letra(indice):
+    """0 -> 'A', 25 -> 'Z', 26 -> 'AA', ..."""
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def indice_letra(folio, tutor):
+    """Índice de la letra de un folio '<tutor>-<letra>', o None si no tiene esa forma."""
+    prefijo = f"{tutor}-"
+    sufijo = folio[len(prefijo):] if folio.startswith(prefijo) else ''
+    if not sufijo or not all('A' <= c <= 'Z' for c in sufijo):
+        return None
+    indice = 0
+    for c in sufijo:
+        indice = indice * 26 + ord(c) - 64
+    return indice - 1
+
+
+def _texto(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ''
+    return str(valor).strip()
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return 0
+
+
+class _Miembro:
+    __slots__ = ('folio', 'tipo', 'tutor', 'limite', 'activo')
+
+    def __init__(self, folio, tipo, tutor, limite, salida):
+        self.folio = normalize_id(folio)
+        self.tipo = _texto(tipo)
+        self.tutor = normalize_id(_texto(tutor))
+        self.limite = _entero(limite)
+        self.activo = not _texto(salida)
+
+    def actualizar(self, campos):
+        if 'tipo' in campos:
+            self.tipo = _texto(campos['tipo'])
+        if 'tutor_folio' in campos:
+            self.tutor = normalize_id(_texto(campos['tutor_folio']))
+        if 'num_acompanantes' in campos:
+            self.limite = _entero(campos['num_acompanantes'])
+        if 'fecha_salida' in campos:
+            self.activo = not _texto(campos['fecha_salida'])
+
+
+class _Familia:
+    __slots__ = ('activos', 'inactivos', 'siguiente')
+
+    def __init__(self):
+        self.activos = {}  # folio -> None (orden de registro)
+        self.inactivos = {}
+        self.siguiente = 0  # índice de la próxima letra (nunca se reutiliza)
+
+
+class GrafoFamiliar:
+    """Personas por folio y familias por titular, al día con la versión de datos."""
+
+    def __init__(self):
+        self._personas = {}  # folio -> _Miembro
+        self._familias = {}  # folio del titular -> _Familia
+        self.titulares = 0  # personas de tipo Titular (para el siguiente folio)
+        self._version = None
+
+    def sincronizar(self):
+        """Reconstruye el grafo si los datos cambiaron por fuera de este proceso."""
+        almacen.inicializar_base()
+        with almacen.bloqueo:
+            version = almacen.version()
+            if self._version == version:
+                return self
+            df = almacen.vista_hoja('Personas')
+            columnas = [df[c] if c in df.columns else [None] * len(df)
+                        for c in ('folio', 'tipo', 'tutor_folio', 'num_acompanantes', 'fecha_salida')]
+            self._personas, self._familias, self.titulares = {}, {}, 0
+            for fila in zip(*columnas):
+                self._agregar(_Miembro(*fila))
+            self._version = version
+            return self
+
+    def olvidar(self):
+        with almacen.bloqueo:
+            self._personas, self._familias, self.titulares = {}, {}, 0
+            self._version = None
+
+    # --- Índices (internos) ---
+    def _agregar(self, m):
+        self._personas[m.folio] = m
+        if m.tipo == 'Titular':
+            self.titulares += 1
+        if m.tutor:
+            familia = self._familias.setdefault(m.tutor, _Familia())
+            (familia.activos if m.activo else familia.inactivos)[m.folio] = None
+            indice = indice_letra(m.folio, m.tutor)
+            familia.siguiente = max(familia.siguiente, len(familia.activos) + len(familia.inactivos),
+                                    -1 if indice is None else indice + 1)
+
+    def _quitar(self, m):
+        self._personas.pop(m.folio, None)
+        if m.tipo == 'Titular':
+            self.titulares -= 1
+        familia = self._familias.get(m.tutor)
+        if familia is not None:
+            familia.activos.pop(m.folio, None)
+            familia.inactivos.pop(m.folio, None)
+
+    # --- Consultas (O(1) salvo las listas devueltas) ---
+    def es_titular_activo(self, folio):
+        m = self._personas.get(normalize_id(folio))
+        return m is not None and m.activo and (m.tipo or 'Titular') == 'Titular'
+
+    def acompanantes_activos(self, folio_titular):
+        familia = self._familias.get(normalize_id(folio_titular))
+        return list(familia.activos) if familia else []
+
+    def estado(self, folio_titular):
+        """EstadoFamilia del titular, o None si no existe una persona con ese folio."""
+        folio = normalize_id(folio_titular)
+        titular = self._personas.get(folio)
+        if titular is None:
+            return None
+        familia = self._familias.get(folio) or _Familia()
+        return EstadoFamilia(folio, titular.limite, list(familia.activos), list(familia.inactivos),
+                             max(0, titular.limite - len(familia.activos)), letra(familia.siguiente))
+
+    # --- Escrituras propias (llamadas bajo almacen.bloqueo) ---
+    def _aplicar(self, version_previa, cambio):
+        # Solo si estábamos al día antes de escribir (como RegistroActivos)
+        if self._version is None or self._version != version_previa:
+            return
+        cambio()
+        self._version = almacen.version()
+
+    def alta(self, version_previa, registro):
+        def cambio():
+            m = _Miembro(registro.get('folio'), registro.get('tipo'), registro.get('tutor_folio'),
+                         registro.get('num_acompanantes'), registro.get('fecha_salida'))
+            if m.folio in self._personas:
+                self._quitar(self._personas[m.folio])
+            self._agregar(m)
+        self._aplicar(version_previa, cambio)
+
+    def edicion(self, version_previa, folio, campos):
+        def cambio():
+            m = self._personas.get(normalize_id(folio))
+            if m is None:
+                return
+            self._quitar(m)
+            m.actualizar(campos)
+            if 'folio' in campos:
+                m.folio = normalize_id(campos['folio'])
+            self._agregar(m)
+        self._aplicar(version_previa, cambio)
+
+    def baja(self, version_previa, folios):
+        def cambio():
+            for folio in folios:
+                m = self._personas.get(normalize_id(folio))
+                if m is not None and m.activo:
+                    self._quitar(m)
+                    m.activo = False
+                    self._agregar(m)
+        self._aplicar(version_previa, cambio)
+
+
+# Instancia compartida por todas las sesiones del proceso
+grafo_familiar = GrafoFamiliar()
+almacen.al_olvidar(grafo_familiar.olvidar)
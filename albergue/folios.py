@@ -0,0 +1,36 @@
+"""Asignación de folios para Titulares y Acompañantes."""
+from . import almacen
+
+
+def normalize_id(val):
+    """Normaliza valores de ID/Folio para comparación consistente (elimina .0 de floats, strip espacios)."""
+    s = str(val).strip()
+    if s.endswith('.0'):
+        return s[:-2]
+    if s.lower() == 'nan' or s == '':
+        return ''
+    return s
+
+
+def generar_folio(es_acompanante, folio_tutor=None):
+    """
+    Titular: siguiente número consecutivo (1001, 1002, ...).
+    Acompañante: folio del titular + letra (1001-A, 1001-B, ...), respetando
+    el límite de acompañantes activos registrado para el titular.
+    """
+    from .familias import grafo_familiar  # (familias importa este módulo)
+
+    with almacen.bloqueo:
+        grafo = grafo_familiar.sincronizar()
+        if not es_acompanante:
+            return str(1001 + grafo.titulares)
+
+        folio_tutor_str = normalize_id(folio_tutor)
+        familia = grafo.estado(folio_tutor_str)
+        if familia is None:
+            raise ValueError(f"No existe un Titular con el folio '{folio_tutor_str}'. Verifique el número.")
+
+        if familia.restantes <= 0:
+            raise ValueError(f"⚠️ El Titular {folio_tutor_str} tiene registrado un límite de {familia.limite} acompañantes y ya tiene {len(familia.activos)} activos vinculados. Consulte a un Administrador.")
+
+        return f"{folio_tutor_str}-{familia.siguiente_letra}"
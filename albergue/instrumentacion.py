@@ -0,0 +1,169 @@
+"""
+Instrumentación de rendimiento por rerun de Streamlit.
+
+Cada vista envuelve sus pasos (lectura de Excel, filtros, gráficas, PDF, SMTP)
+en `with medir("operacion"):`; los fragmentos que se reejecutan solos se
+miden como reruns parciales ("Rol / fragmento"). Las muestras se guardan en memoria (compartidas
+por todas las sesiones del proceso) para el panel de Admin y, opcionalmente,
+cada rerun se escribe como una línea JSON en un archivo de log. La ruta del
+log sale solo de ALBERGUE_PERF_LOG (o es perf_albergue.jsonl junto al libro
+de datos); desde la interfaz solo se enciende o se apaga.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+MAX_MUESTRAS = 5000
+
+# Log estructurado opcional (una línea JSON por rerun)
+LOG_FILE = os.environ.get("ALBERGUE_PERF_LOG", "")
+LOG_POR_OMISION = "perf_albergue.jsonl"
+_log_activo = bool(LOG_FILE)
+
+_muestras = deque(maxlen=MAX_MUESTRAS)  # (timestamp, rol, operacion, ms)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def ruta_log():
+    """ALBERGUE_PERF_LOG, o perf_albergue.jsonl en la carpeta del libro de datos."""
+    if LOG_FILE:
+        return LOG_FILE
+    from . import almacen
+    return os.path.join(os.path.dirname(os.path.abspath(almacen.DB_FILE)), LOG_POR_OMISION)
+
+
+def activar_log(activo):
+    """Enciende o apaga el log por rerun (la ruta no se elige aquí: ver `ruta_log`)."""
+    global _log_activo
+    _log_activo = bool(activo)
+
+
+def log_activo():
+    return _log_activo
+
+
+def iniciar_rerun(rol):
+    """Marca el inicio de un rerun para el rol dado. Cierra el rerun anterior si quedó abierto (p.ej. por st.rerun)."""
+    finalizar_rerun(interrumpido=True)
+    t0 = time.perf_counter()
+    _local.rerun = {
+        'id': uuid.uuid4().hex[:12],
+        'rol': rol,
+        'inicio': datetime.now().isoformat(timespec='milliseconds'),
+        't0': t0,
+        't_fin': t0,
+        'spans': [],
+    }
+
+
+def finalizar_rerun(interrumpido=False):
+    """
+    Registra la duración total del rerun actual, lo escribe en el log (si está
+    activo) y lo cierra. Si el script se interrumpió (st.rerun, excepción), la
+    duración llega hasta el final del último span medido.
+    """
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return
+    _local.rerun = None
+    fin = rerun['t_fin'] if interrumpido else time.perf_counter()
+    total_ms = (fin - rerun['t0']) * 1000
+    with _lock:
+        _muestras.append((time.time(), rerun['rol'], 'rerun_total', total_ms))
+    if not _log_activo:
+        return
+    registro = {
+        'rerun': rerun['id'],
+        'rol': rerun['rol'],
+        'inicio': rerun['inicio'],
+        'total_ms': round(total_ms, 3),
+        'interrumpido': interrumpido,
+        'spans': rerun['spans'],
+    }
+    try:
+        with _lock, open(ruta_log(), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    except OSError:
+        # La instrumentación nunca debe tumbar la vista
+        pass
+
+
+@contextmanager
+def rerun_parcial(rol):
+    """
+    Rerun de un fragmento (st.fragment): si el script completo no está
+    corriendo, se registra como un rerun propio de `rol`; si no, sus spans
+    se suman al rerun en curso.
+    """
+    if getattr(_local, 'rerun', None) is not None:
+        yield
+        return
+    iniciar_rerun(rol)
+    try:
+        yield
+    finally:
+        finalizar_rerun()
+
+
+@contextmanager
+def medir(operacion):
+    """Mide el tiempo del bloque y lo registra bajo `operacion` para el rol del rerun actual."""
+    rerun = getattr(_local, 'rerun', None)
+    rol = rerun['rol'] if rerun else ''
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        with _lock:
+            _muestras.append((time.time(), rol, operacion, ms))
+        if rerun is not None:
+            rerun['t_fin'] = time.perf_counter()
+            rerun['spans'].append({'operacion': operacion, 'ms': round(ms, 3)})
+
+
+def _percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    k = (len(valores_ordenados) - 1) * p
+    i = int(k)
+    j = min(i + 1, len(valores_ordenados) - 1)
+    return valores_ordenados[i] + (valores_ordenados[j] - valores_ordenados[i]) * (k - i)
+
+
+def resumen(por_rol=True):
+    """
+    Devuelve una lista de dicts con n, p50, p95 y max (ms) por operación
+    (y por rol si por_rol=True), ordenada por p95 descendente.
+    """
+    with _lock:
+        muestras = list(_muestras)
+    grupos = {}
+    for _, rol, operacion, ms in muestras:
+        clave = (rol, operacion) if por_rol else ('', operacion)
+        grupos.setdefault(clave, []).append(ms)
+
+    filas = []
+    for (rol, operacion), tiempos in grupos.items():
+        tiempos.sort()
+        fila = {'operacion': operacion, 'n': len(tiempos),
+                'p50_ms': round(_percentil(tiempos, 0.50), 2),
+                'p95_ms': round(_percentil(tiempos, 0.95), 2),
+                'max_ms': round(tiempos[-1], 2)}
+        if por_rol:
+            fila = {'rol': rol, **fila}
+        filas.append(fila)
+    filas.sort(key=lambda f: f['p95_ms'], reverse=True)
+    return filas
+
+
+def limpiar():
+    """Descarta todas las muestras en memoria."""
+    with _lock:
+        _muestras.clear()
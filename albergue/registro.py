@@ -0,0 +1,104 @@
+"""Registro de personas: altas, ediciones y consultas."""
+from datetime import datetime
+
+import pandas as pd
+
+from . import almacen, bitacora, catalogos, diario, edades, eventos
+from .familias import grafo_familiar
+from .folios import generar_folio, normalize_id
+from .residentes import registro_activos
+
+
+def calcular_edad(fecha_nac, hoy=None):
+    """Edad en años cumplidos (misma regla que `edades` para toda la tabla)."""
+    hoy = hoy or datetime.now().date()
+    return hoy.year - fecha_nac.year - ((hoy.month, hoy.day) < (fecha_nac.month, fecha_nac.day))
+
+
+def guardar_persona(nueva_persona):
+    with almacen.bloqueo:
+        version_previa = almacen.version()
+        # Leer la hoja antes de anotar: si no está en caché, al parsearla se
+        # reaplicarían las entradas pendientes del diario, incluida esta alta
+        df_actual = almacen.leer_hoja('Personas')
+        almacen.anotar(diario.ALTA, {'registro': nueva_persona})
+        df_nuevo = pd.concat([df_actual, pd.DataFrame([nueva_persona])], ignore_index=True)
+        almacen.escribir_hoja(df_nuevo, 'Personas')
+        if not nueva_persona.get('fecha_salida'):
+            registro_activos.alta(version_previa, nueva_persona)
+        grafo_familiar.alta(version_previa, nueva_persona)
+        eventos.feed.publicar(eventos.ALTA, [normalize_id(nueva_persona['folio'])])
+
+
+def registrar_ingreso(datos, es_acompanante=False, folio_tutor=None):
+    """
+    Asigna folio y guarda a la persona. `datos` trae los campos del formulario
+    (sin folio); se completan tipo, tutor, fecha de ingreso y campos de salida.
+    Devuelve el registro guardado. Lanza ValueError si el folio no es válido.
+    """
+    with almacen.bloqueo:
+        nuevo_folio = generar_folio(es_acompanante, folio_tutor if es_acompanante else None)
+        registro = {
+            'folio': nuevo_folio,
+            'tipo': 'Acompañante' if es_acompanante else 'Titular',
+            'tutor_folio': folio_tutor if es_acompanante else '',
+            'fecha_ingreso': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'num_acompanantes': 0,
+            'fecha_salida': '',
+            'motivo_salida': '',
+        }
+        datos = catalogos.canonizar_registro(datos)
+        if datos.get('fecha_nacimiento'):
+            # La edad se deriva de la fecha de nacimiento cuando está disponible
+            edad = edades.edades_cumplidas(pd.Series([datos['fecha_nacimiento']])).iloc[0]
+            if pd.notna(edad):
+                datos['edad'] = int(edad)
+        registro.update({k: v for k, v in datos.items() if k not in ('folio', 'tipo', 'tutor_folio')})
+        guardar_persona(registro)
+        return registro
+
+
+def actualizar_persona(datos_actualizados):
+    """
+    Actualiza los datos de una persona existente basado en su folio. Solo se
+    guardan los campos que cambian, como deltas en el diario (sin reescribir
+    el libro). Devuelve False si el folio no existe. Lanza ValueError si el
+    nuevo límite de acompañantes queda por debajo de los activos vinculados.
+    """
+    with almacen.bloqueo:
+        grafo_familiar.sincronizar()
+        version_previa = almacen.version()
+        df = almacen.vista_hoja('Personas')
+        folio_str = normalize_id(datos_actualizados['folio'])
+
+        fila = almacen.indice_folios().get(folio_str)
+        if fila is None:
+            return False
+
+        datos_actualizados = catalogos.canonizar_registro(datos_actualizados)
+        deltas = bitacora.calcular_deltas(df.loc[fila], folio_str, datos_actualizados)
+        if not deltas:
+            return True
+        cambios = {d.campo: d.nuevo for d in deltas}
+        if 'num_acompanantes' in cambios:
+            familia = grafo_familiar.estado(folio_str)
+            limite = int(cambios['num_acompanantes'] or 0)
+            if familia is not None and limite < len(familia.activos):
+                raise ValueError(f"El Titular {folio_str} tiene {len(familia.activos)} acompañantes activos; "
+                                 f"el límite no puede ser menor.")
+        seq = almacen.registrar_deltas(deltas)
+        registro_activos.edicion(version_previa, folio_str, cambios)
+        grafo_familiar.edicion(version_previa, folio_str, cambios)
+        eventos.feed.publicar(eventos.EDICION, [folio_str])
+    # Fuera del bloqueo: el fsync se comparte con las ediciones concurrentes
+    almacen.confirmar(seq)
+    return True
+
+
+def obtener_persona(df, folio):
+    """Fila de la persona con ese folio (comparando normalizado), o None."""
+    folio_norm = normalize_id(folio)
+    match = df[df['folio'].apply(normalize_id) == folio_norm]
+    if match.empty:
+        return None
+    return match.iloc[0]
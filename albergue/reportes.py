@@ -0,0 +1,153 @@
+"""Reportes: movimientos (altas/bajas), PDFs y envío por correo."""
+from datetime import datetime
+import smtplib
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.mime.application import MIMEApplication
+
+import pandas as pd
+from fpdf import FPDF
+
+
+# --- REPORTES DE MOVIMIENTOS ---
+def calcular_movimientos(df):
+    """
+    Agrupa altas y bajas por día y por mes.
+    Devuelve (mov_diario, mov_mensual) con columnas Altas y Bajas.
+    """
+    if 'fecha_salida' not in df.columns:
+        df['fecha_salida'] = ''
+    
+    # Altas por día (Robustez: convertir a string y tomar primeros 10 caracteres YYYY-MM-DD)
+    df['ingreso_dt'] = pd.to_datetime(df['fecha_ingreso'].astype(str).str.strip().str[:10], errors='coerce').dt.date
+    altas_dia = df['ingreso_dt'].value_counts().rename("Altas")
+    
+    # Bajas por día
+    df['salida_dt'] = pd.to_datetime(df['fecha_salida'].astype(str).str.strip().str[:10], errors='coerce').dt.date
+    bajas_dia = df['salida_dt'].value_counts().rename("Bajas")
+    
+    # Unir (Outer join para mostrar días donde solo hubo altas o solo bajas)
+    mov_diario = pd.concat([altas_dia, bajas_dia], axis=1).fillna(0).astype(int).sort_index()
+    
+    # Extraer mes año (YYYY-MM)
+    altas_mes = pd.to_datetime(df['fecha_ingreso'].astype(str).str.strip().str[:10], errors='coerce').dt.strftime('%Y-%m').value_counts().rename("Altas")
+    bajas_mes = pd.to_datetime(df['fecha_salida'].astype(str).str.strip().str[:10], errors='coerce').dt.strftime('%Y-%m').value_counts().rename("Bajas")
+    
+    mov_mensual = pd.concat([altas_mes, bajas_mes], axis=1).fillna(0).astype(int).sort_index()
+    return mov_diario, mov_mensual
+
+
+def generar_pdf_reporte(df_diario, df_mensual, resumen=None):
+    """
+    Genera un PDF con las tablas de movimientos diarios y mensuales.
+    Recibe DataFrames de Pandas (tablas) y, opcionalmente, un resumen
+    acumulado {concepto: valor} que se muestra antes de las tablas.
+    """
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, "Reporte de Movimientos - Albergue Belén", ln=True, align='C')
+    pdf.set_font("Arial", size=10)
+    pdf.cell(0, 10, f"Generado el: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='R')
+    pdf.ln(10)
+    
+    # --- RESUMEN ACUMULADO (reportes por cambios) ---
+    if resumen:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 10, "Resumen", ln=True)
+        pdf.set_font("Courier", size=10)
+        for concepto, valor in resumen.items():
+            pdf.cell(100, 8, str(concepto), border=1)
+            pdf.cell(60, 8, str(valor), border=1)
+            pdf.ln()
+        pdf.ln(10)
+    
+    # --- TABLA DIARIA ---
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "1. Movimientos Diarios (Altas y Bajas)", ln=True)
+    pdf.set_font("Courier", size=10)
+    
+    # Encabezado Manual para tabla simple
+    pdf.cell(60, 8, "Fecha", border=1)
+    pdf.cell(40, 8, "Altas", border=1)
+    pdf.cell(40, 8, "Bajas", border=1)
+    pdf.ln()
+    
+    pdf.set_font("Courier", size=10)
+    # df_diario index es la fecha, columnas son Altas, Bajas
+    if not df_diario.empty:
+        for fecha, row in df_diario.iterrows():
+            # Convertir fecha a string si es necesario
+            fecha_str = str(fecha)
+            pdf.cell(60, 8, fecha_str[:12], border=1)
+            pdf.cell(40, 8, str(int(row.get('Altas', 0))), border=1)
+            pdf.cell(40, 8, str(int(row.get('Bajas', 0))), border=1)
+            pdf.ln()
+    else:
+        pdf.cell(0, 8, "No hay movimientos registrados.", border=1)
+    
+    pdf.ln(10)
+    
+    # --- TABLA MENSUAL ---
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "2. Movimientos Mensuales", ln=True)
+    
+    pdf.set_font("Courier", 'B', 10)
+    pdf.cell(60, 8, "Mes", border=1)
+    pdf.cell(40, 8, "Altas", border=1)
+    pdf.cell(40, 8, "Bajas", border=1)
+    pdf.ln()
+
+    pdf.set_font("Courier", size=10)
+    if not df_mensual.empty:
+        for mes, row in df_mensual.iterrows():
+            mes_str = str(mes)
+            pdf.cell(60, 8, mes_str, border=1)
+            pdf.cell(40, 8, str(int(row.get('Altas', 0))), border=1)
+            pdf.cell(40, 8, str(int(row.get('Bajas', 0))), border=1)
+            pdf.ln()
+    else:
+         pdf.cell(0, 8, "No hay movimientos mensuales.", border=1)
+            
+    return pdf.output(dest="S").encode("latin-1")
+
+def enviar_correo(destinatarios, asunto, cuerpo, archivo_bytes, nombre_archivo, remitente, password):
+    msg = MIMEMultipart()
+    msg['From'] = remitente
+    
+    msg['To'] = ", ".join(destinatarios)
+    msg['Subject'] = asunto
+    
+    msg.attach(MIMEText(cuerpo, 'plain'))
+    
+    part = MIMEApplication(archivo_bytes, Name=nombre_archivo)
+    part['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    msg.attach(part)
+    
+    
+    try:
+        server = smtplib.SMTP('smtp.gmail.com', 587)
+        server.starttls()
+        server.login(remitente, password)
+        # Sendmail accepts a list for recipients
+        server.sendmail(remitente, destinatarios, msg.as_string())
+        server.quit()
+        return True, "Correo enviado exitosamente."
+    except Exception as e:
+        return False, str(e)
+
+
+def generar_pdf_reglamento(nombre, fecha_ingreso):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt="REGLAMENTO DEL ALBERGUE BELÉN", ln=1, align="C")
+    pdf.cell(200, 10, txt=f"Fecha de Ingreso: {fecha_ingreso}", ln=1, align="R")
+    pdf.ln(20)
+    pdf.multi_cell(0, 10, txt="REGLAMENTO INTERNO\n\n1. Respeto: Tratar con dignidad a todos los presentes.\n2. Limpieza: Mantener limpias las áreas comunes.\n3. Horarios: Respetar horas de silencio y salidas.\n4. Seguridad: Cuidar sus pertenencias personales.\n5. Convivencia: Resolver conflictos pacíficamente.\n\nAl firmar hago constar que he leído y acepto estas normas.")
+    pdf.ln(50)
+    pdf.cell(200, 10, txt="_" * 40, ln=1, align="C")
+    pdf.cell(200, 10, txt=f"Firma: {nombre}", ln=1, align="C")
+    
+    
+    return pdf.output(dest="S").encode("latin-1")
@@ -0,0 +1,182 @@
+"""
+Registro compacto en memoria de las personas activas (sin fecha de salida).
+
+Cada residente es un objeto con __slots__ (sin DataFrame ni Series), con los
+campos ya normalizados, de modo que las vistas leen atributos directamente y
+detectan cambios comparando valores simples. El registro se reconstruye solo
+cuando cambia la versión de los datos por fuera (otro proceso editó el Excel);
+las escrituras propias se aplican en sitio.
+"""
+import sys
+
+import pandas as pd
+
+from . import almacen, catalogos
+from .familias import grafo_familiar
+from .folios import normalize_id
+
+CAMPOS = (
+    'folio', 'nombre', 'identificacion', 'edad', 'fecha_nacimiento', 'nacionalidad',
+    'genero', 'tipo', 'tutor_folio', 'fecha_ingreso', 'num_acompanantes',
+)
+# Valores muy repetidos: se internan para compartir una sola copia del texto
+_INTERNADOS = ('nacionalidad', 'genero', 'tipo')
+# Se comparan por su forma canónica: otra escritura del mismo valor no es un cambio
+_CATALOGADOS = ('nacionalidad', 'genero')
+
+
+def _texto(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ''
+    return str(valor).strip()
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return 0
+
+
+class Residente:
+    __slots__ = CAMPOS
+
+    def __init__(self, **campos):
+        for campo in CAMPOS:
+            self._asignar(campo, campos.get(campo))
+
+    def _asignar(self, campo, valor):
+        if campo in ('edad', 'num_acompanantes'):
+            valor = _entero(valor)
+        elif campo in ('folio', 'tutor_folio', 'identificacion'):
+            valor = normalize_id(_texto(valor))
+        else:
+            valor = _texto(valor)
+            if campo in _INTERNADOS:
+                valor = sys.intern(valor)
+        setattr(self, campo, valor)
+
+    def actualizar(self, campos):
+        for campo, valor in campos.items():
+            if campo in CAMPOS:
+                self._asignar(campo, valor)
+
+    def cambios(self, nuevos):
+        """{campo: (anterior, nuevo)} para los campos de `nuevos` que difieren."""
+        diferencias = {}
+        for campo, valor in nuevos.items():
+            if campo not in CAMPOS:
+                continue
+            anterior = getattr(self, campo)
+            if isinstance(anterior, int):
+                distinto = _entero(valor) != anterior
+            elif campo in _CATALOGADOS:
+                catalogo = catalogos.obtener(campo)
+                distinto = catalogo.canonico(valor) != catalogo.canonico(anterior)
+            else:
+                distinto = _texto(valor) != anterior
+            if distinto:
+                diferencias[campo] = (anterior, valor)
+        return diferencias
+
+    def a_dict(self):
+        return {campo: getattr(self, campo) for campo in CAMPOS}
+
+    def __repr__(self):
+        return f"Residente(folio={self.folio!r}, nombre={self.nombre!r})"
+
+
+class RegistroActivos:
+    """Residentes activos indexados por folio normalizado, en orden de registro."""
+
+    def __init__(self):
+        self._por_folio = {}
+        self._version = None
+        self._opciones = None  # etiquetas "folio - nombre" de la versión actual
+
+    def sincronizar(self):
+        """Reconstruye el registro si los datos cambiaron por fuera de este proceso."""
+        with almacen.bloqueo:
+            version = almacen.version()
+            if self._version == version:
+                return self
+            df = almacen.filtrar_activos(almacen.cargar_datos())
+            columnas = [c for c in CAMPOS if c in df.columns]
+            por_folio = {}
+            for fila in df[columnas].itertuples(index=False, name=None):
+                r = Residente(**dict(zip(columnas, fila)))
+                por_folio[r.folio] = r
+            self._por_folio = por_folio
+            self._opciones = None
+            self._version = version
+            return self
+
+    def olvidar(self):
+        """Descarta el registro (se reconstruye en la próxima sincronización)."""
+        with almacen.bloqueo:
+            self._por_folio = {}
+            self._opciones = None
+            self._version = None
+
+    # --- Consultas ---
+    def __len__(self):
+        return len(self._por_folio)
+
+    def __iter__(self):
+        return iter(list(self._por_folio.values()))
+
+    def obtener(self, folio):
+        return self._por_folio.get(normalize_id(folio))
+
+    def folios(self):
+        return list(self._por_folio)
+
+    def opciones(self):
+        """Etiquetas "folio - nombre" para los buscadores (se rearman solo si cambian los datos)."""
+        opciones = self._opciones
+        if opciones is None:
+            opciones = self._opciones = [f"{r.folio} - {r.nombre}" for r in self._por_folio.values()]
+        return opciones
+
+    def acompanantes(self, folio_titular):
+        folios = grafo_familiar.sincronizar().acompanantes_activos(folio_titular)
+        return [self._por_folio[f] for f in folios if f in self._por_folio]
+
+    # --- Escrituras propias (llamadas por registro/bajas bajo almacen.bloqueo) ---
+    def _aplicar(self, version_previa, cambio):
+        # Solo si estábamos al día antes de escribir; si no, la próxima
+        # sincronización reconstruye todo desde el archivo.
+        if self._version is None or self._version != version_previa:
+            return
+        cambio()
+        self._opciones = None
+        self._version = almacen.version()
+
+    def alta(self, version_previa, registro):
+        def cambio():
+            r = Residente(**registro)
+            self._por_folio[r.folio] = r
+        self._aplicar(version_previa, cambio)
+
+    def edicion(self, version_previa, folio, campos):
+        def cambio():
+            r = self._por_folio.get(normalize_id(folio))
+            if r is not None:
+                r.actualizar(campos)
+        self._aplicar(version_previa, cambio)
+
+    def baja(self, version_previa, folios):
+        def cambio():
+            for folio in folios:
+                self._por_folio.pop(normalize_id(folio), None)
+        self._aplicar(version_previa, cambio)
+
+
+# Instancia compartida por todas las sesiones del proceso
+registro_activos = RegistroActivos()
+almacen.al_olvidar(registro_activos.olvidar)
+
+
+def obtener_activos():
+    """Registro de activos sincronizado con los datos actuales."""
+    return registro_activos.sincronizar()
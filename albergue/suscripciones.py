@@ -0,0 +1,123 @@
+"""
+Suscripciones al reporte de movimientos por correo.
+
+Por cada lista de destinatarios se guarda hasta qué día ya se le envió
+(`<base>.suscripciones.json`, junto al libro). Cada envío lleva solo las
+filas diarias posteriores, los meses que esas filas tocan y un resumen
+acumulado, en vez del historial completo. El día en curso no se da por
+cerrado: el siguiente envío lo vuelve a incluir con sus cifras al día.
+"""
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from . import almacen, analitica, artefactos, diario
+from .reportes import generar_pdf_reporte
+from .residentes import obtener_activos
+
+INICIO = 'inicio del registro'
+
+
+class Envio(namedtuple('Envio', 'clave destinatarios desde cerrado diario mensual resumen')):
+    """Reporte por cambios para una lista: filas nuevas, meses tocados y resumen acumulado."""
+    __slots__ = ()
+
+    @property
+    def vacio(self):
+        return self.diario.empty
+
+    @property
+    def nombre_archivo(self):
+        desde = 'completo' if self.desde == INICIO else self.desde
+        return f"Reporte_Movimientos_{desde}_{date.today().isoformat()}.pdf"
+
+
+def ruta():
+    return os.path.splitext(almacen.DB_FILE)[0] + '.suscripciones.json'
+
+
+def clave_lista(destinatarios):
+    """La misma lista sin importar orden, mayúsculas ni espacios."""
+    return ','.join(sorted({d.strip().lower() for d in destinatarios if d.strip()}))
+
+
+def _leer():
+    try:
+        with open(ruta(), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        # Sin estado (o dañado): el siguiente envío a cada lista es completo
+        return {}
+
+
+def _escribir(estado):
+    temporal = ruta() + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta())
+    diario.fsync_directorio(ruta())
+
+
+def suscripcion(destinatarios):
+    """Último envío a la lista ({'destinatarios', 'hasta', 'enviado', 'envios'}), o None si nunca se le envió."""
+    with almacen.bloqueo:
+        return _leer().get(clave_lista(destinatarios))
+
+
+def preparar(destinatarios, completo=False):
+    """Envio con los movimientos posteriores al último enviado a la lista (o todos si `completo` o es la primera vez)."""
+    previo = suscripcion(destinatarios)
+    mov_diario, mov_mensual = analitica.movimientos()
+    if previo and not completo:
+        cerrado = date.fromisoformat(previo['hasta'])
+        nuevos = mov_diario[mov_diario.index > cerrado]
+        meses = {d.strftime('%Y-%m') for d in nuevos.index}
+        mensual = mov_mensual[mov_mensual.index.astype(str).isin(meses)]
+        desde = (cerrado + timedelta(days=1)).isoformat()
+    else:
+        nuevos, mensual, desde = mov_diario, mov_mensual, INICIO
+
+    resumen = {
+        'Periodo': f"{desde} a {date.today().isoformat()}",
+        'Envío anterior': previo['enviado'] if previo else 'Primer envío',
+        'Altas del periodo': int(nuevos['Altas'].sum()),
+        'Bajas del periodo': int(nuevos['Bajas'].sum()),
+        'Altas acumuladas': int(mov_diario['Altas'].sum()),
+        'Bajas acumuladas': int(mov_diario['Bajas'].sum()),
+        'Personas activas': len(obtener_activos()),
+    }
+    ayer = (date.today() - timedelta(days=1)).isoformat()
+    return Envio(clave_lista(destinatarios), sorted({d.strip() for d in destinatarios if d.strip()}),
+                 desde, ayer, nuevos, mensual, resumen)
+
+
+def pdf(envio):
+    """PDF del envío (compartido entre listas con el mismo periodo mientras no cambien los datos)."""
+    return artefactos.cache.obtener(('pdf_movimientos',) + tuple(envio.resumen.items()),
+                                    lambda: generar_pdf_reporte(envio.diario, envio.mensual, envio.resumen))
+
+
+def cuerpo(envio):
+    if envio.desde == INICIO:
+        lineas = ["Reporte detallado de Altas y Bajas (Diario y Mensual), historial completo.", ""]
+    else:
+        lineas = ["Reporte de Altas y Bajas con los movimientos nuevos desde el envío anterior.", ""]
+    lineas.extend(f"{concepto}: {valor}" for concepto, valor in envio.resumen.items())
+    return "\n".join(lineas)
+
+
+def registrar(envio):
+    """Marca el envío como hecho: el próximo a la lista empieza después de `envio.cerrado`."""
+    with almacen.bloqueo:
+        estado = _leer()
+        anterior = estado.get(envio.clave, {})
+        estado[envio.clave] = {
+            'destinatarios': envio.destinatarios,
+            'hasta': max(envio.cerrado, anterior.get('hasta', '')),
+            'enviado': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'envios': anterior.get('envios', 0) + 1,
+        }
+        _escribir(estado)
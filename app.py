@@ -1,14 +1,18 @@
 import streamlit as st
 import pandas as pd
-import os
 from datetime import datetime
 import base64
-from fpdf import FPDF
-import matplotlib.pyplot as plt
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
+import functools
+import io
+
+from albergue import (
+    cargar_datos, obtener_activos,
+    calcular_edad, registrar_ingreso, actualizar_persona, historial_cambios,
+    obtener_encuesta, guardar_encuesta, procesar_baja,
+    enviar_correo,
+)
+from albergue import almacen, analitica, artefactos, catalogos, cifrado, edades, eventos, exportacion, familias, feed, instrumentacion, suscripciones
+from albergue.instrumentacion import medir, iniciar_rerun, finalizar_rerun
 
 # --- CONFIGURACIÓN DE CORREO (SECRETS) ---
 try:
@@ -18,379 +22,724 @@ except:
     SMTP_USER = ""
     SMTP_PASSWORD = ""
 
-def generar_pdf_reporte(df_diario, df_mensual):
+# --- CIFRADO EN REPOSO (SECRETS o variable ALBERGUE_CLAVE) ---
+try:
+    CLAVE_DATOS = st.secrets["ALBERGUE_CLAVE"]
+except:
+    CLAVE_DATOS = ""
+if CLAVE_DATOS:
+    cifrado.configurar(CLAVE_DATOS)
+
+# --- CONSTANTES ---
+def render_smart_select(label, campo, key_prefix, default_value=None, disabled=False):
     """
-    Genera un PDF con las tablas de movimientos diarios y mensuales.
-    Recibe DataFrames de Pandas (tablas).
+    Renderiza un selectbox con opciones comunes y un text_input opcional para 'OTROS'.
+    - Aparece vacío por defecto si no hay default_value.
+    - Devuelve el valor canónico del catálogo del campo (sin importar acentos,
+      mayúsculas ni espacios); los valores nuevos se capitalizan.
     """
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(0, 10, "Reporte de Movimientos - Albergue Belén", ln=True, align='C')
-    pdf.set_font("Arial", size=10)
-    pdf.cell(0, 10, f"Generado el: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='R')
-    pdf.ln(10)
+    catalogo = catalogos.obtener(campo)
+    lista_completa = catalogo.opciones()
     
-    # --- TABLA DIARIA ---
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "1. Movimientos Diarios (Altas y Bajas)", ln=True)
-    pdf.set_font("Courier", size=10)
+    # Búsqueda O(1) por clave normalizada
+    idx_default = catalogo.indice(default_value)
+    val_otro = ""
+    if idx_default is not None and lista_completa[idx_default] == catalogos.OTROS:
+        # Si no está en la lista standard, es "OTROS"
+        val_otro = catalogo.canonico(default_value)
+            
+    # Selectbox con placeholder (requiere index=None para mostrar placeholder)
+    sel = st.selectbox(
+        label, 
+        lista_completa, 
+        index=idx_default, 
+        key=f"{key_prefix}_sel_smart", 
+        disabled=disabled,
+        placeholder=f"Seleccione {label.lower()}..."
+    )
+    
+    final_val = sel
+    if sel == catalogos.OTROS:
+        final_val = st.text_input(
+            f"Especifique {label}", 
+            value=val_otro, 
+            key=f"{key_prefix}_txt_smart", 
+            disabled=disabled,
+            placeholder=f"Escriba la {label.lower()}..."
+        )
+        
+    return catalogo.canonico(final_val)
+
+# --- REFRESCO EN VIVO ENTRE SESIONES ---
+INTERVALO_REFRESCO = "3s"
+
+def marcar_vista_actualizada(clave):
+    """La vista se construye con los datos actuales: los eventos publicados hasta aquí ya están reflejados."""
+    st.session_state[clave] = feed.version
+
+@st.fragment(run_every=INTERVALO_REFRESCO)
+def vigilar_cambios(clave, es_relevante):
+    """
+    Revisa el feed de cambios (en memoria, sin leer el Excel) y reejecuta la
+    vista solo si otra sesión escribió algo que le afecta.
+    """
+    almacen.version()  # detecta cambios hechos por otros procesos (solo os.stat)
+    nuevos = feed.desde(st.session_state.get(clave, feed.version))
+    if nuevos is None or any(es_relevante(e) for e in nuevos):
+        st.rerun(scope="app")
+    st.session_state[clave] = feed.version
+
+# Cambios que alteran la lista de activos (selectores de folio)
+CAMBIOS_LISTA = (eventos.ALTA, eventos.BAJA, eventos.EXTERNO)
+
+# --- FRAGMENTOS (RERUNS PARCIALES) ---
+def fragmento(nombre):
+    """
+    st.fragment: un widget dentro del bloque reejecuta solo esa función, no
+    todo el script. Sus reruns parciales se miden como "Rol / nombre".
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            with instrumentacion.rerun_parcial(f"{rol_seleccionado} / {nombre}"):
+                return funcion(*args, **kwargs)
+        return st.fragment(envuelta)
+    return decorador
+
+def fijar_estado(clave, valor):
+    """Callback de botones: el estado cambia antes del rerun (del fragmento) que dispara el clic."""
+    st.session_state[clave] = valor
+
+def mostrar_aviso(clave):
+    """Muestra una vez el mensaje guardado antes de un st.rerun() de toda la app."""
+    mensaje = st.session_state.pop(clave, None)
+    if mensaje:
+        st.success(mensaje)
+
+# --- RECEPCIÓN ---
+@fragmento("ingreso")
+def formulario_ingreso():
+    """Formulario de ingreso: escribir o cambiar la fecha solo reejecuta este bloque."""
+    mostrar_aviso("aviso_ingreso")
+    st.subheader("Nuevo Ingreso")
+    # Eliminamos st.form para permitir interactividad (cálculo de edad en tiempo real)
+    col1, col2 = st.columns(2)
     
-    # Encabezado Manual para tabla simple
-    pdf.cell(60, 8, "Fecha", border=1)
-    pdf.cell(40, 8, "Altas", border=1)
-    pdf.cell(40, 8, "Bajas", border=1)
-    pdf.ln()
+    nombre = col1.text_input("Nombre Completo")
+    identificacion = col2.text_input("Identificación / No. de Documento")
     
-    pdf.set_font("Courier", size=10)
-    # df_diario index es la fecha, columnas son Altas, Bajas
-    if not df_diario.empty:
-        for fecha, row in df_diario.iterrows():
-            # Convertir fecha a string si es necesario
-            fecha_str = str(fecha)
-            pdf.cell(60, 8, fecha_str[:12], border=1)
-            pdf.cell(40, 8, str(int(row.get('Altas', 0))), border=1)
-            pdf.cell(40, 8, str(int(row.get('Bajas', 0))), border=1)
-            pdf.ln()
-    else:
-        pdf.cell(0, 8, "No hay movimientos registrados.", border=1)
+    fecha_nac = col1.date_input(
+        "Fecha de Nacimiento", 
+        min_value=datetime(1900, 1, 1),
+        max_value=datetime.now(),
+        value=datetime(2000, 1, 1) # Default visual
+    )
     
-    pdf.ln(10)
+    with col2:
+        nacionalidad = render_smart_select("Nacionalidad", "nacionalidad", "recepcion_nac")
+        
+    with col1:
+         genero = render_smart_select("Género", "genero", "recepcion_gen")
     
-    # --- TABLA MENSUAL ---
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "2. Movimientos Mensuales", ln=True)
+    # Calcular edad automáticamente
+    edad = 0
+    if fecha_nac:
+        edad = calcular_edad(fecha_nac)
+        col2.success(f"Edad calculada: {edad} años")
     
-    pdf.set_font("Courier", 'B', 10)
-    pdf.cell(60, 8, "Mes", border=1)
-    pdf.cell(40, 8, "Altas", border=1)
-    pdf.cell(40, 8, "Bajas", border=1)
-    pdf.ln()
-
-    pdf.set_font("Courier", size=10)
-    if not df_mensual.empty:
-        for mes, row in df_mensual.iterrows():
-            mes_str = str(mes)
-            pdf.cell(60, 8, mes_str, border=1)
-            pdf.cell(40, 8, str(int(row.get('Altas', 0))), border=1)
-            pdf.cell(40, 8, str(int(row.get('Bajas', 0))), border=1)
-            pdf.ln()
+    st.subheader("Datos de Registro y Acompañamiento")
+    
+    es_menor = (fecha_nac is not None and edad < 18)
+    
+    tipo_registro = "Titular" # Default
+    folio_tutor_input = ""
+    num_acompanantes = 0
+    es_familiar_bool = False
+    
+    if es_menor:
+        st.info(f"ℹ️ Al ser menor de edad ({edad} años), se registra automáticamente como Acompañante vinculado a un Titular.")
+        tipo_registro = "Acompañante"
+        es_familiar_bool = True
+        folio_tutor_input = st.text_input("Ingrese Folio del Titular / Tutor (Obligatorio)", help="El folio de la persona adulta responsable.")
     else:
-         pdf.cell(0, 8, "No hay movimientos mensuales.", border=1)
+        modo_ingreso = st.radio("Tipo de Registro:", ["Titular (Viene solo o es cabeza de familia)", "Acompañante (Es cónyuge/familiar de otro titular)"])
+        
+        if modo_ingreso.startswith("Titular"):
+            tipo_registro = "Titular"
+            es_familiar_bool = False
+            if st.checkbox("¿Viene con personas a su cargo (familia, hijos, otros)?"):
+                num_acompanantes = st.number_input("Número de acompañantes", min_value=1, step=1, value=1)
+        else:
+            tipo_registro = "Acompañante"
+            es_familiar_bool = True
+            folio_tutor_input = st.text_input("Ingrese Folio del Titular Responsable")
+
+    submitted = st.button("Registrar Ingreso")
+    
+    if submitted:
+        errores = []
+        if not nombre:
+            errores.append("El nombre es obligatorio.")
+        
+        if tipo_registro == "Acompañante" and not folio_tutor_input:
+            errores.append("El Folio del Titular es obligatorio para acompañantes (y menores).")
             
-    return pdf.output(dest="S").encode("latin-1")
+        if errores:
+            for e in errores:
+                st.error(e)
+        else:
+            try:
+                datos = {
+                    'nombre': nombre,
+                    'identificacion': identificacion,
+                    'edad': edad,
+                    'fecha_nacimiento': fecha_nac.strftime("%Y-%m-%d") if fecha_nac else "",
+                    'nacionalidad': nacionalidad,
+                    'genero': genero,
+                    'num_acompanantes': num_acompanantes,
+                }
+                with medir("registrar_ingreso"):
+                    registro = registrar_ingreso(datos, es_familiar_bool, folio_tutor_input if es_familiar_bool else None)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                # La lista de bajas cambia: rerun completo
+                st.session_state["aviso_ingreso"] = f"Registrado con éxito. Folio Asignado: {registro['folio']}"
+                st.rerun()
 
-def enviar_correo(destinatarios, asunto, cuerpo, archivo_bytes, nombre_archivo, remitente, password):
-    msg = MIMEMultipart()
-    msg['From'] = remitente
+@fragmento("bajas")
+def panel_bajas():
+    """Baja de una persona (y su grupo familiar): buscar y escribir el motivo solo reejecuta este bloque."""
+    mostrar_aviso("aviso_baja")
+    # Solo personas activas (sin fecha de salida)
+    with medir("registro_activos"):
+        activos = obtener_activos()
     
-    msg['To'] = ", ".join(destinatarios)
-    msg['Subject'] = asunto
+    if len(activos) == 0:
+        st.info("No hay personas activas en el albergue actualmente.")
+        return
     
-    msg.attach(MIMEText(cuerpo, 'plain'))
+    # Buscador: Folio - Nombre (armado una vez por versión de datos)
+    with medir("opciones_busqueda"):
+        opciones = activos.opciones()
+    seleccion = st.selectbox("Buscar persona por Folio o Nombre", opciones)
     
-    part = MIMEApplication(archivo_bytes, Name=nombre_archivo)
-    part['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
-    msg.attach(part)
+    if seleccion:
+        # Extraer folio
+        folio_sel = seleccion.split(" - ")[0]
+        persona_sel = activos.obtener(folio_sel)
+        
+        st.markdown("### Datos de la Persona")
+        st.markdown(f"""
+        - **Nombre:** {persona_sel.nombre}
+        - **Folio:** {persona_sel.folio}
+        - **Fecha Ingreso:** {persona_sel.fecha_ingreso or 'N/A'}
+        - **Número de Acompañantes:** {persona_sel.num_acompanantes}
+        """)
+        
+        tipo_persona = persona_sel.tipo or 'Titular'
+        lista_baja = [folio_sel] # Lista de folios a dar de baja
+        mensaje_alerta = ""
+        
+        # Lógica Familiar: Si es Titular, buscar acompañantes activos
+        if tipo_persona == 'Titular':
+            with medir("buscar_acompanantes"):
+                acompanantes = activos.acompanantes(folio_sel)
+            
+            if acompanantes:
+                nombres_acomp = [r.nombre for r in acompanantes]
+                folios_acomp = [r.folio for r in acompanantes]
+                lista_baja.extend(folios_acomp)
+                
+                st.warning(f"⚠️ **ATENCIÓN:** Al dar de baja a este Titular, también se dará de baja a sus {len(nombres_acomp)} acompañantes:")
+                st.write(f"**Acompañantes:** {', '.join(nombres_acomp)}")
+                mensaje_alerta = f"Se dará de baja al grupo familiar completo ({len(lista_baja)} personas)."
+        
+        motivo_baja = st.text_area("Motivo de Salida (Obligatorio)")
+        
+        if st.button("Confirmar Baja / Salida", disabled=(not motivo_baja), type="primary"):
+            # Procesar Baja
+            try:
+                with medir("procesar_baja"):
+                    procesar_baja(lista_baja, motivo_baja)
+            except Exception as e:
+                st.error(f"Error al procesar la salida: {e}")
+            else:
+                st.session_state["aviso_baja"] = f"✅ Salida registrada exitosamente. {mensaje_alerta}"
+                st.rerun()
+
+# --- TRABAJO SOCIAL / ENFERMERÍA ---
+@fragmento("datos_persona")
+def datos_persona(folio_buscar, prefijo, titulo, etiqueta_editar, mostrar_tope_tutor=False):
+    """
+    Datos de la persona, de lectura o en modo edición (claves con `prefijo`
+    por módulo). Editar, Cancelar y escribir solo reejecutan este bloque.
+    """
+    activos = obtener_activos()
+    persona = activos.obtener(folio_buscar)
+    if persona is None:
+        st.info("La persona ya no está activa.")
+        return
+    mostrar_aviso(f"{prefijo}aviso_persona")
     
+    # Key para el estado de edición de este folio
+    key_edit = f"{prefijo}edit_mode_{folio_buscar}"
+    if key_edit not in st.session_state:
+        st.session_state[key_edit] = False
     
-    try:
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(remitente, password)
-        # Sendmail accepts a list for recipients
-        server.sendmail(remitente, destinatarios, msg.as_string())
-        server.quit()
-        return True, "Correo enviado exitosamente."
-    except Exception as e:
-        return False, str(e)
-
-
-def generar_pdf_reglamento(nombre, fecha_ingreso):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt="REGLAMENTO DEL ALBERGUE BELÉN", ln=1, align="C")
-    pdf.cell(200, 10, txt=f"Fecha de Ingreso: {fecha_ingreso}", ln=1, align="R")
-    pdf.ln(20)
-    pdf.multi_cell(0, 10, txt="REGLAMENTO INTERNO\n\n1. Respeto: Tratar con dignidad a todos los presentes.\n2. Limpieza: Mantener limpias las áreas comunes.\n3. Horarios: Respetar horas de silencio y salidas.\n4. Seguridad: Cuidar sus pertenencias personales.\n5. Convivencia: Resolver conflictos pacíficamente.\n\nAl firmar hago constar que he leído y acepto estas normas.")
-    pdf.ln(50)
-    pdf.cell(200, 10, txt="_" * 40, ln=1, align="C")
-    pdf.cell(200, 10, txt=f"Firma: {nombre}", ln=1, align="C")
+    is_editing = st.session_state[key_edit]
+    disabled_inputs = not is_editing
     
+    st.subheader(titulo)
     
-    return pdf.output(dest="S").encode("latin-1")
-
-# --- CONFIGURACIÓN DE "BASE DE DATOS" (EXCEL) ---
-DB_FILE = 'datos_albergue.xlsx'
-
-def cargar_datos():
-    if not os.path.exists(DB_FILE):
-        # Crear archivo si no existe
-        with pd.ExcelWriter(DB_FILE) as writer:
-            pd.DataFrame(columns=['usuario', 'pass', 'rol']).to_excel(writer, sheet_name='Usuarios', index=False)
-            # COLS ACTUALIZADAS
-            pd.DataFrame(columns=[
-                'folio', 'nombre', 'identificacion', 'edad', 'fecha_nacimiento', 
-                'nacionalidad', 'genero', 'tipo', 'tutor_folio', 'fecha_ingreso', 'num_acompanantes',
-                'fecha_salida', 'motivo_salida'
-            ]).to_excel(writer, sheet_name='Personas', index=False)
-            
-            # SCHEMA ENCUESTAS ACTUALIZADO
-            pd.DataFrame(columns=[
-                'folio_persona', 'estado_civil', 'escolaridad', 'ocupacion', 
-                'enfermedad_cronica', 'estado_migratorio', 'motivo_salida', 'destino', 'redes_apoyo', 'observaciones'
-            ]).to_excel(writer, sheet_name='Encuestas', index=False)
+    # Usaremos contenedores o columnas para layout homogéneo
+    c1, c2 = st.columns(2)
     
-    # Leer hojas
-    xls = pd.ExcelFile(DB_FILE)
-    df_personas = pd.read_excel(xls, 'Personas')
-    # Podríamos leer encuestas también si fuera necesario
-    return df_personas
-
-def guardar_persona(nueva_persona):
-    # Cargar excel existente, agregar fila y guardar
-    df_actual = pd.read_excel(DB_FILE, sheet_name='Personas')
-    df_nuevo = pd.concat([df_actual, pd.DataFrame([nueva_persona])], ignore_index=True)
+    # --- CAMPOS UNIFICADOS (Lectura/Edición controlados por 'disabled_inputs') ---
+    # 1. Nombre
+    val_nombre = c1.text_input("Nombre Completo", value=persona.nombre, disabled=disabled_inputs, key=f"{prefijo}p_nom_{folio_buscar}")
     
-    with pd.ExcelWriter(DB_FILE, mode='a', if_sheet_exists='replace') as writer:
-        df_nuevo.to_excel(writer, sheet_name='Personas', index=False)
-
-def actualizar_persona(datos_actualizados):
-    """Actualiza los datos de una persona existente basado en su folio."""
-    try:
-        df = pd.read_excel(DB_FILE, sheet_name='Personas')
-        folio_str = str(datos_actualizados['folio']).strip()
-        
-        # Crear columna temporal para match exacto
-        df['folio_str'] = df['folio'].astype(str).str.strip()
-        
-        # Buscar índice
-        matches = df.index[df['folio_str'] == folio_str].tolist()
-        
-        if matches:
-            idx = matches[0]
-            # Actualizar campos
-            for k, v in datos_actualizados.items():
-                if k in df.columns:
-                    df.at[idx, k] = v
-            
-            # Guardar (sin la columna temporal)
-            df_final = df.drop(columns=['folio_str'])
-            with pd.ExcelWriter(DB_FILE, mode='a', if_sheet_exists='replace') as writer:
-                df_final.to_excel(writer, sheet_name='Personas', index=False)
-            return True
-        return False
-    except Exception as e:
-        st.error(f"Error al actualizar: {e}")
-        return False
+    # 2. Edad
+    # Edad al día de hoy: con fecha de nacimiento se calcula y no se edita
+    val_edad_int = edades.edad_de(folio_buscar, persona.edad)
+    edad_calculada = edades.desde_nacimiento(persona.fecha_nacimiento) is not None
+    val_edad = c2.number_input("Edad", value=val_edad_int, step=1, disabled=disabled_inputs or edad_calculada,
+                               help=f"Calculada desde la fecha de nacimiento ({persona.fecha_nacimiento})." if edad_calculada else None,
+                               key=f"{prefijo}p_edad_{folio_buscar}")
+    
+    # 3. Nacionalidad
+    with c1:
+        val_nac = render_smart_select("Nacionalidad", "nacionalidad", f"{prefijo}p_nac_{folio_buscar}", default_value=persona.nacionalidad, disabled=disabled_inputs)
+    
+    # 4. Género
+    with c2:
+        val_gen = render_smart_select("Género", "genero", f"{prefijo}p_gen_{folio_buscar}", default_value=persona.genero, disabled=disabled_inputs)
+    
+    # 5. ID
+    val_id = c1.text_input("Identificación / ID", value=persona.identificacion, disabled=disabled_inputs, key=f"{prefijo}p_id_{folio_buscar}")
+    
+    # 6. Lógica condicional (Acompañantes / Tutor)
+    tipo_p = persona.tipo or 'Titular'
+    val_acompanantes = persona.num_acompanantes
+    
+    if tipo_p == 'Titular':
+        # Titular: Campo numérico editable (si está en modo edición)
+        val_acompanantes = c2.number_input("Número de Acompañantes", value=val_acompanantes, step=1, disabled=disabled_inputs, key=f"{prefijo}p_anum_{folio_buscar}")
+    else:
+        # Acompañante: Muestra folio tutor (Siempre deshabilitado para edición manual directa, es referencial)
+        tutor_clean = persona.tutor_folio
+        c2.text_input("Folio del Titular/Tutor", value=tutor_clean, disabled=True, key=f"{prefijo}p_tut_{folio_buscar}")
+        
+        # Info extra visual (grafo familiar: sin recorrer la tabla)
+        familia = familias.grafo_familiar.sincronizar().estado(tutor_clean)
+        if mostrar_tope_tutor and familia is not None:
+             st.caption(f"ℹ️ Titular autoriza hasta {familia.limite} acompañantes "
+                        f"({len(familia.activos)} activos, {familia.restantes} lugares libres).")
 
-def guardar_encuesta(nueva_encuesta):
-    # Guardar en la hoja Encuestas
-    try:
-        df_actual = pd.read_excel(DB_FILE, sheet_name='Encuestas')
-    except:
-        # Fallback si la hoja no existe
-        df_actual = pd.DataFrame()
-        
-    # Eliminar registro previo si existe (Actualizar/Editar)
-    folio = nueva_encuesta['folio_persona']
-    if not df_actual.empty and 'folio_persona' in df_actual.columns:
-        # Convertir a string ambos lados para asegurar match
-        df_actual = df_actual[df_actual['folio_persona'].astype(str) != str(folio)]
-        
-    df_nuevo = pd.concat([df_actual, pd.DataFrame([nueva_encuesta])], ignore_index=True)
+    # --- BOTONES DE ACCIÓN ---
+    st.write("") # Espaciador
     
-    with pd.ExcelWriter(DB_FILE, mode='a', if_sheet_exists='replace') as writer:
-        df_nuevo.to_excel(writer, sheet_name='Encuestas', index=False)
+    if not is_editing:
+        st.button(etiqueta_editar, key=f"{prefijo}btn_edit_{folio_buscar}", on_click=fijar_estado, args=(key_edit, True))
+    else:
+        # Solo los campos que cambian: habilitan Actualizar y son lo único que se envía
+        formulario = {'nombre': val_nombre, 'nacionalidad': val_nac, 'genero': val_gen, 'identificacion': val_id}
+        if not edad_calculada:
+            formulario['edad'] = val_edad
+        if tipo_p == 'Titular':
+            formulario['num_acompanantes'] = val_acompanantes
+        cambios = persona.cambios(formulario)
+        
+        col_b1, col_b2 = st.columns([1, 1])
+        with col_b1:
+            st.button("❌ Cancelar", key=f"{prefijo}btn_cancel_{folio_buscar}", on_click=fijar_estado, args=(key_edit, False))
+        with col_b2:
+            # Botón Actualizar
+            if st.button("💾 Actualizar y Guardar", disabled=not cambios, key=f"{prefijo}btn_save_{folio_buscar}"):
+                 datos_update = {'folio': folio_buscar, **{campo: nuevo for campo, (_, nuevo) in cambios.items()}}
+                     
+                 try:
+                     with medir("actualizar_persona"):
+                         actualizado = actualizar_persona(datos_update)
+                 except Exception as e:
+                     st.error(f"Error al actualizar: {e}")
+                     actualizado = False
+                 if actualizado:
+                     st.session_state[f"{prefijo}aviso_persona"] = "Actualizado correctamente."
+                     st.session_state[key_edit] = False
+                     st.rerun()
+                 else:
+                     st.error("No se pudo actualizar.")
 
-# --- LÓGICA DE FOLIOS ---
-def normalize_id(val):
-    """Normaliza valores de ID/Folio para comparación consistente (elimina .0 de floats, strip espacios)."""
-    s = str(val).strip()
-    if s.endswith('.0'):
-        return s[:-2]
-    if s.lower() == 'nan' or s == '':
-        return ''
-    return s
+    # El diario solo se lee si se pide el historial
+    if st.toggle("🕓 Historial de cambios", key=f"{prefijo}hist_{folio_buscar}"):
+        with medir("historial_cambios"):
+            cambios_persona = historial_cambios(folio_buscar)
+        if cambios_persona:
+            st.dataframe(pd.DataFrame([d.a_dict() for d in reversed(cambios_persona)]), hide_index=True)
+        else:
+            st.caption("Sin ediciones registradas.")
 
-def generar_folio(es_acompanante, folio_tutor=None):
-    df = cargar_datos()
-    if df.empty:
-        ultimo_folio = 1000
-    else:
-        try:
-            ultimo_folio = 1000
-        except:
-            ultimo_folio = 1000
+@fragmento("cuestionario_social")
+def cuestionario_social(folio_buscar):
+    """Cuestionario social: editar o escribir en un campo solo reejecuta este bloque."""
+    persona = obtener_activos().obtener(folio_buscar)
+    if persona is None:
+        return
+    mostrar_aviso("aviso_encuesta")
+    st.subheader("Cuestionario Social")
+    
+    # Encuesta previa (índice por folio en caché por versión de datos)
+    with medir("obtener_encuesta"):
+        datos_previos = obtener_encuesta(folio_buscar)
+    
+    # Key para estado de edición de la entrevista
+    key_social = f"social_edit_{folio_buscar}"
+    existe_encuesta = datos_previos is not None
+    
+    # Si no está en sesión, inicializar
+    if key_social not in st.session_state:
+        # Si existe encuesta -> Modo Lectura (False)
+        # Si NO existe -> Modo Edición (True) para llenar por primera vez
+        st.session_state[key_social] = not existe_encuesta
+        
+    is_social_editing = st.session_state[key_social]
+    disabled_social = not is_social_editing
+    
+    # --- WIDGETS HOMOGÉNEOS ---
+    # Listas de opciones
+    opts_civil = ["Soltero/a", "Casado/a", "Unión Libre", "Divorciado/a", "Viudo/a"]
+    opts_escolaridad = ["Ninguna", "Primaria", "Secundaria", "Preparatoria/Bachillerato", "Universidad", "Posgrado"]
+    opts_migratorio = ["Irregular", "Solicitante", "TURH", "En Tránsito", "Retorno voluntario", "Refugiado"]
+    
+    # Valores por defecto para widgets (tomados de datos_previos si existen, o default)
+    val_civil_idx = 0
+    val_escolaridad_idx = 0
+    val_ocupacion = ""
+    val_enfermedad = ""
+    val_migratorio_idx = 0
+    val_motivo = ""
+    val_destino = ""
+    
+    if datos_previos is not None:
+        try: val_civil_idx = opts_civil.index(datos_previos.get('estado_civil', opts_civil[0]))
+        except: pass
+        try: val_escolaridad_idx = opts_escolaridad.index(datos_previos.get('escolaridad', opts_escolaridad[0]))
+        except: pass
+        val_ocupacion = datos_previos.get('ocupacion', "")
+        val_enfermedad = datos_previos.get('enfermedad_cronica', "")
+        try: val_migratorio_idx = opts_migratorio.index(datos_previos.get('estado_migratorio', opts_migratorio[0]))
+        except: pass
+        val_motivo = datos_previos.get('motivo_salida', "")
+        val_destino = datos_previos.get('destino', "")
+    
+    # Layout de Inputs
+    sc1, sc2 = st.columns(2)
+    
+    # Usar keys únicos para evitar conflictos
+    inp_civil = sc1.selectbox("Estado Civil", opts_civil, index=val_civil_idx, disabled=disabled_social, key=f"s_civ_{folio_buscar}")
+    inp_escolaridad = sc2.selectbox("Escolaridad", opts_escolaridad, index=val_escolaridad_idx, disabled=disabled_social, key=f"s_esc_{folio_buscar}")
+    
+    inp_ocupacion = sc1.text_input("Ocupación", value=val_ocupacion, disabled=disabled_social, key=f"s_ocu_{folio_buscar}")
+    inp_enfermedad = sc2.text_input("Enfermedad Crónica", value=val_enfermedad, help="Especifique o escriba 'Ninguna'", disabled=disabled_social, key=f"s_enf_{folio_buscar}")
+    
+    inp_migratorio = sc1.selectbox("Estado Migratorio", opts_migratorio, index=val_migratorio_idx, disabled=disabled_social, key=f"s_mig_{folio_buscar}")
+    
+    inp_motivo = st.text_area("Motivo de salida de origen", value=val_motivo, disabled=disabled_social, key=f"s_mot_{folio_buscar}")
+    inp_destino = st.text_input("Destino Final", value=val_destino, disabled=disabled_social, key=f"s_des_{folio_buscar}")
+    
+    st.write("") # Espaciador
+    
+    # --- LÓGICA DE BOTONES ---
+    if not is_social_editing:
+        # MODO LECTURA
+        
+        # 1. Botón Editar
+        st.button("✏️ Editar Entrevista", key=f"btn_s_edit_{folio_buscar}", on_click=fijar_estado, args=(key_social, True))
+        
+        # 2. Botón PDF (SOLO SI ES MENOR DE 18, como solicitado)
+        # Validar edad desde el registro de persona
+        edad_val = edades.edad_de(folio_buscar, persona.edad)
+            
+        if edad_val >= edades.MAYORIA_EDAD:
+            if st.button("📄 Generar/Ver Reglamento", key=f"btn_pdf_{folio_buscar}"):
+                 # Generación "al vuelo"
+                 nombre_p = persona.nombre or 'Desconocido'
+                 fecha_i = persona.fecha_ingreso or datetime.now().strftime("%Y-%m-%d")
+                 with medir("generar_pdf_reglamento"):
+                     pdf_bytes = artefactos.pdf_reglamento(nombre_p, fecha_i)
+                 b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
+                 pdf_link = f'<a href="data:application/pdf;base64,{b64_pdf}" download="Reglamento_{folio_buscar}.pdf" target="_blank">📥 Descargar PDF Generado</a>'
+                 st.markdown(pdf_link, unsafe_allow_html=True)
     
-    if not es_acompanante:
-        # Generación simple: incrementamos según conteo de Titulares
-        count_titulares = len(df[df['tipo'] == 'Titular']) if not df.empty else 0
-        return str(1001 + count_titulares)
     else:
-        # Lógica para acompañantes
-        # 1. Validar que exista el Titular y recuperar límite
-        folio_tutor_str = normalize_id(folio_tutor)
-        
-        # Filtrar Titular (asegurando string normalizado)
-        if df.empty:
-            raise ValueError("No hay datos en el sistema.")
-            
-        # Normalizamos la columna folio para buscar
-        df['folio_norm'] = df['folio'].apply(normalize_id)
-        titular_match = df[df['folio_norm'] == folio_tutor_str]
-        
-        if titular_match.empty:
-            raise ValueError(f"No existe un Titular con el folio '{folio_tutor_str}'. Verifique el número.")
-            
-        titular = titular_match.iloc[0]
-        try:
-            limite_acompanantes = int(titular['num_acompanantes'])
-        except:
-            limite_acompanantes = 0
-            
-        # 2. Contar acompañantes existentes vinculados a este tutor
-        # Normalizamos la columna tutor_folio
-        df['tutor_folio_norm'] = df['tutor_folio'].apply(normalize_id)
-        hijos_existentes = df[df['tutor_folio_norm'] == folio_tutor_str]
-        cantidad_actual = len(hijos_existentes)
+        # MODO EDICIÓN / CRACIÓN
+        col_sa, col_sb = st.columns([1, 1])
         
-        # 3. Validar límite
-        if cantidad_actual >= limite_acompanantes:
-            raise ValueError(f"⚠️ El Titular {folio_tutor_str} tiene registrado un límite de {limite_acompanantes} acompañantes y ya tiene {cantidad_actual} vinculados. Consulte a un Administrador.")
-            
-        # 4. Generar Letra (A, B, C...)
-        letra = chr(65 + cantidad_actual) # 65='A'
-        return f"{folio_tutor_str}-{letra}"
+        with col_sa:
+            # Mostrar cancelar solo si ya existía datos previos (si es nuevo registro, cancelar quizás no tenga sentido o podría limpiar)
+            if existe_encuesta:
+                st.button("❌ Cancelar", key=f"btn_s_cancel_{folio_buscar}", on_click=fijar_estado, args=(key_social, False))
+                    
+        with col_sb:
+            label_save = "💾 Guardar Entrevista" if existe_encuesta else "💾 Registrar Entrevista"
+            if st.button(label_save, key=f"btn_s_save_{folio_buscar}"):
+                datos_encuesta = {
+                    'folio_persona': folio_buscar,
+                    'estado_civil': inp_civil,
+                    'escolaridad': inp_escolaridad,
+                    'ocupacion': inp_ocupacion,
+                    'enfermedad_cronica': inp_enfermedad,
+                    'estado_migratorio': inp_migratorio,
+                    'motivo_salida': inp_motivo,
+                    'destino': inp_destino,
+                    'redes_apoyo': 'N/A', 
+                    'observaciones': 'N/A'
+                }
+                with medir("guardar_encuesta"):
+                    guardar_encuesta(datos_encuesta)
+                st.session_state["aviso_encuesta"] = "Entrevista guardada exitosamente."
+                
+                # Cambiar a modo lectura
+                st.session_state[key_social] = False
+                st.rerun()
 
-def generar_folio(es_acompanante, folio_tutor=None):
-    df = cargar_datos()
-    if df.empty:
-        ultimo_folio = 1000
-    else:
-        try:
-            ultimo_folio = 1000
-        except:
-            ultimo_folio = 1000
+# --- ADMIN ---
+FILTROS_POBLACION = {
+    "Activos (En Albergue)": (analitica.ACTIVOS, "Solo Activos"),
+    "Inactivos (Salidas)": (analitica.SALIDAS, "Solo Salidas"),
+    "Histórico (Todos)": (analitica.TODOS, "Todos"),
+}
+
+@fragmento("estadisticas")
+def panel_estadisticas():
+    """Gráficas por población: cambiar el filtro solo reejecuta este bloque (conteos en caché de `analitica`)."""
+    # Selector de filtro
+    opcion_filtro = st.radio(
+        "Filtro de Visualización para Gráficas:", 
+        list(FILTROS_POBLACION), 
+        horizontal=True
+    )
+    poblacion, label_filtro = FILTROS_POBLACION[opcion_filtro]
     
-    if not es_acompanante:
-        # Generación simple: incrementamos según conteo de Titulares
-        count_titulares = len(df[df['tipo'] == 'Titular']) if not df.empty else 0
-        return str(1001 + count_titulares)
-    else:
-        # Lógica para acompañantes
-        # 1. Validar que exista el Titular y recuperar límite
-        folio_tutor_str = normalize_id(folio_tutor)
+    with medir("filtro_poblacion"):
+        total_filtro = int(analitica.conteos([], poblacion=poblacion)['personas'].iloc[0])
+    
+    st.info(f"Mostrando datos para: **{total_filtro} personas** ({label_filtro})")
+
+    c1, c2 = st.columns(2)
+    
+    with c1:
+        st.write(f"**Nacionalidad ({label_filtro})**")
+        if total_filtro:
+            with medir("grafica_nacionalidad"):
+                conteo_nac = analitica.conteos(['nacionalidad'], poblacion=poblacion).set_index('nacionalidad')['personas']
+                st.bar_chart(conteo_nac.drop(analitica.SIN_REGISTRO, errors='ignore'))
+        else:
+            st.caption("Sin datos para mostrar con este filtro.")
         
-        # Filtrar Titular (asegurando string normalizado)
-        if df.empty:
-            raise ValueError("No hay datos en el sistema.")
-            
-        # Normalizamos la columna folio para buscar
-        df['folio_norm'] = df['folio'].apply(normalize_id)
-        titular_match = df[df['folio_norm'] == folio_tutor_str]
+    with c2:
+        st.write(f"**Estado Civil ({label_filtro})**")
         
-        if titular_match.empty:
-            raise ValueError(f"No existe un Titular con el folio '{folio_tutor_str}'. Verifique el número.")
-            
-        titular = titular_match.iloc[0]
-        try:
-            limite_acompanantes = int(titular['num_acompanantes'])
-        except:
-            limite_acompanantes = 0
+        if total_filtro:
+            # Solo personas del filtro actual que tienen encuesta
+            datos_civil = analitica.conteos(['estado_civil'], {'encuesta': ['Sí']}, poblacion).set_index('estado_civil')['personas']
             
-        # 2. Contar acompañantes existentes vinculados a este tutor
-        # Normalizamos la columna tutor_folio
-        df['tutor_folio_norm'] = df['tutor_folio'].apply(normalize_id)
-        hijos_existentes = df[df['tutor_folio_norm'] == folio_tutor_str]
-        cantidad_actual = len(hijos_existentes)
-        
-        # 3. Validar límite
-        if cantidad_actual >= limite_acompanantes:
-             raise ValueError(f"El Titular ya alcanzó el límite de acompañantes ({cantidad_actual}/{limite_acompanantes}).")
-        
-        # Para folio acompañante, usamos 1001-A, 1001-B logic?
-        # El usuario pidió folios consecutivos normales anteriormente en otra sesión o manejamos 
-        # la lógica simple 1000n.
-        # Revisando código previo: parece que el usuario quería folios únicos decimales o algo así, 
-        # pero luego se corrigió.
-        # Mantendremos la lógica simple de conteo global si es lo que hay, 
-        # OJO: La función original estaba TRUNCADA en la vista anterior.
-        # Re-implementaré la lógica de generar_folio tal cual estaba y agrego las constantes.
-        
-        # Wait, I am replacing `generar_folio`? No, I should use insert.
-        # But `replace_file_content` replaces a block.
-        # I will replace the END of `generar_folio` and add the new code AFTER it.
-        # Actually, let's just insert the new code BEFORE `st.title`.
-        # The prompt says `generar_folio` ends around line 265.
-        
-        # Let's perform a safer replacement targeting the area just before st.title.
-        return str(uuid.uuid4())[:8] # Fallback dummy if needed, but I should preserve original logic if I can see it.
-        # Actually I can't see the full body of `generar_folio` in the snippet efficiently without viewing again.
-        # The View output showed `generar_folio` starting at 217.
-        # I will Target `st.title` to insert BEFORE it.
+            if not datos_civil.empty:
+                def dibujar_pastel(ax_pie):
+                    ax_pie.pie(datos_civil, labels=datos_civil.index, autopct='%1.1f%%', startangle=90)
+                    ax_pie.axis('equal') 
+                
+                with medir("grafica_estado_civil"):
+                    # PNG en caché por población y versión de datos
+                    st.image(artefactos.imagen(('estado_civil', poblacion), dibujar_pastel))
+            else:
+                st.caption("No hay encuestas asociadas a este grupo.")
+        else:
+            st.caption("Datos insuficientes para graficar.")
 
-# --- CONSTANTES ---
-NACIONALIDADES_COMUNES = ["Mexicana", "Guatemalteca", "Hondureña", "Salvadoreña", "Nicaragüense", "Venezolana", "Cubana", "Haitiana", "Colombiana", "Ecuatoriana"]
-GENEROS_COMUNES = ["Masculino", "Femenino"]
+    st.markdown("---")
+    panel_cohortes(poblacion)
 
-def render_smart_select(label, options_base, key_prefix, default_value=None, disabled=False):
-    """
-    Renderiza un selectbox con opciones comunes y un text_input opcional para 'OTROS'.
-    - Aparece vacío por defecto si no hay default_value.
-    - Capitaliza la primera letra del resultado final.
-    """
-    lista_completa = sorted(options_base) + ["--- OTROS ---"]
+@fragmento("cohortes")
+def panel_cohortes(poblacion):
+    """Cruce de dimensiones: sus selectores solo reejecutan este bloque."""
+    st.write("### Análisis por Cohortes")
+    st.caption("Cruza cualquier combinación de dimensiones; respeta el filtro de población de arriba.")
     
-    idx_default = None
-    val_otro = ""
+    nombres_dim = list(analitica.DIMENSIONES)
+    etiqueta_dim = analitica.DIMENSIONES.get
     
-    if default_value:
-        # Intentar buscar valor exacto o case-insensitive para pre-seleccionar
-        # Nota: stored values might be lowercase or mixed. We standardize to Capitalized for matching.
-        default_cap = str(default_value).strip().capitalize()
-        
-        # Buscar en la lista
-        if default_cap in lista_completa:
-             idx_default = lista_completa.index(default_cap)
-        elif default_value in lista_completa:
-             idx_default = lista_completa.index(default_value)
-        else:
-            # Si no está en la lista standard, es "OTROS"
-            idx_default = lista_completa.index("--- OTROS ---")
-            val_otro = default_value
-            
-    # Selectbox con placeholder (requiere index=None para mostrar placeholder)
-    sel = st.selectbox(
-        label, 
-        lista_completa, 
-        index=idx_default, 
-        key=f"{key_prefix}_sel_smart", 
-        disabled=disabled,
-        placeholder=f"Seleccione {label.lower()}..."
-    )
+    cc1, cc2 = st.columns([2, 1])
+    dims_filas = cc1.multiselect("Agrupar por", nombres_dim, default=['nacionalidad'], format_func=etiqueta_dim, key="coh_filas")
+    dim_columna = cc2.selectbox("Columnas", [None] + nombres_dim, format_func=lambda d: "(ninguna)" if d is None else etiqueta_dim(d), key="coh_columna")
     
-    final_val = sel
-    if sel == "--- OTROS ---":
-        final_val = st.text_input(
-            f"Especifique {label}", 
-            value=val_otro, 
-            key=f"{key_prefix}_txt_smart", 
-            disabled=disabled,
-            placeholder=f"Escriba la {label.lower()}..."
+    filtros_coh = {}
+    with st.expander("Filtros de cohorte"):
+        dims_filtro = st.multiselect("Filtrar por", nombres_dim, format_func=etiqueta_dim, key="coh_dims_filtro")
+        for dim in dims_filtro:
+            filtros_coh[dim] = st.multiselect(etiqueta_dim(dim), analitica.valores(dim), key=f"coh_val_{dim}")
+    
+    if dim_columna is not None and dim_columna in dims_filas:
+        st.warning("La dimensión de columnas no puede repetirse en 'Agrupar por'.")
+    elif dims_filas:
+        with medir("cohortes"):
+            if dim_columna is not None:
+                tabla_coh = analitica.pivote(dims_filas, dim_columna, filtros_coh, poblacion)
+            else:
+                tabla_coh = analitica.conteos(dims_filas, filtros_coh, poblacion).set_index(dims_filas)
+        st.dataframe(tabla_coh.rename_axis(index=[etiqueta_dim(d) for d in dims_filas]), use_container_width=True)
+        if len(dims_filas) == 1 and dim_columna is None:
+            st.bar_chart(tabla_coh['personas'])
+        st.download_button(
+            "Descargar CSV", tabla_coh.to_csv().encode('utf-8'),
+            file_name="cohortes.csv", mime="text/csv", key="coh_csv"
         )
-        
-    if final_val:
-        # Capitalizar primera letra siempre
-        return str(final_val).strip().capitalize()
-    return ""
+    else:
+        total_coh = analitica.conteos([], filtros_coh, poblacion)['personas'].iloc[0]
+        st.metric("Personas en la cohorte", int(total_coh))
+
+@fragmento("movimientos")
+def panel_movimientos():
+    """Altas/bajas, paquete del mes y envío por correo (tablas en caché por versión de datos)."""
+    with medir("calcular_movimientos"):
+        mov_diario, mov_mensual = analitica.movimientos()
+    
+    # --- TABLA DIARIA ---
+    st.write("#### 📅 Movimientos Diarios")
+    st.dataframe(mov_diario, use_container_width=True)
+    
+    # --- TABLA MENSUAL ---
+    st.write("#### Movimientos Mensuales")
+    st.dataframe(mov_mensual, use_container_width=True)
+    
+    # --- PAQUETE DE REPORTES DEL MES ---
+    st.write("#### 📦 Paquete de Reportes del Mes")
+    st.caption("Movimientos, ocupación, demografía por nacionalidad y firmas del reglamento (PDF + Excel) en un ZIP.")
+    meses_paquete = sorted((str(m) for m in mov_mensual.index), reverse=True)
+    if meses_paquete:
+        mes_paquete = st.selectbox("Mes del paquete", meses_paquete, key="paquete_mes")
+        if st.button("Generar paquete ZIP", key="paquete_generar"):
+            barra = st.progress(0.0, text="Calculando tablas...")
+            
+            def avance_paquete(hechos, total, archivo):
+                barra.progress(hechos / total, text=f"{archivo} ({hechos}/{total})")
+            
+            def generar_zip():
+                buffer_zip = io.BytesIO()
+                exportacion.exportar_paquete(buffer_zip, mes_paquete, avance_paquete)
+                return buffer_zip.getvalue()
+            
+            try:
+                # Compartido entre sesiones mientras no cambien los datos
+                with medir("exportar_paquete"):
+                    datos_zip = artefactos.cache.obtener(('paquete', mes_paquete), generar_zip)
+                barra.progress(1.0, text="Paquete listo.")
+                st.session_state['paquete_zip'] = (mes_paquete, datos_zip)
+            except Exception as e:
+                st.error(f"Error generando el paquete: {e}")
+        
+        if st.session_state.get('paquete_zip'):
+            mes_zip, datos_zip = st.session_state['paquete_zip']
+            st.download_button(
+                f"⬇️ Descargar paquete {mes_zip}", datos_zip,
+                file_name=f"reportes_{mes_zip}.zip", mime="application/zip", key="paquete_descargar"
+            )
+    else:
+        st.caption("Aún no hay movimientos registrados.")
+    
+    st.markdown("---")
+    st.markdown("---")
+    st.header("Enviar Reporte PDF por Correo")
+    
+    # Input de destinatarios múltiple
+    destinatarios_str = st.text_input("Destinatarios (separados por coma)", help="Ejemplo: correo1@gmail.com, correo2@hotmail.com")
+    # Convertir string separado por comas a lista limpia
+    lista_destinos = [email.strip() for email in destinatarios_str.split(',') if email.strip()]
+    
+    # Cada lista recibe solo los movimientos posteriores a su último envío
+    previo = suscripciones.suscripcion(lista_destinos) if lista_destinos else None
+    if previo:
+        st.caption(f"Último envío a esta lista: {previo['enviado']}. Se enviarán solo los movimientos "
+                   f"posteriores al {previo['hasta']} y un resumen acumulado.")
+    elif lista_destinos:
+        st.caption("Primer envío a esta lista: se incluirá el historial completo.")
+    completo = st.checkbox("Enviar historial completo", key="correo_completo", disabled=not previo)
+    
+    if st.button("Generar y Enviar Reporte PDF"):
+        # Validar Credenciales del Sistema
+        if not SMTP_USER or not SMTP_PASSWORD:
+            st.error(" Error de Configuración: No se encontraron las credenciales de correo.")
+            st.info("Por favor, configura 'SMTP_USER' y 'SMTP_PASSWORD' en los 'Secrets' de Streamlit Cloud o en '.streamlit/secrets.toml' localmente.")
+        elif not destinatarios_str:
+            st.error("Ingresa al menos un destinatario.")
+        elif not lista_destinos:
+            st.error("No se detectaron correos válidos.")
+        else:
+            with medir("preparar_envio"):
+                envio = suscripciones.preparar(lista_destinos, completo)
+            if envio.vacio:
+                st.info(f"No hay movimientos nuevos desde el último envío ({previo['enviado'] if previo else 'ninguno'}).")
+            else:
+                with st.spinner(f"Generando PDF y enviando a {len(lista_destinos)} destinatarios..."):
+                    try:
+                        with medir("generar_pdf_reporte"):
+                            pdf_bytes = suscripciones.pdf(envio)
+                        
+                        asunto = f"Reporte Albergue - {datetime.now().strftime('%Y-%m-%d')}"
+                        
+                        # Usar credenciales cargadas desde Secrets
+                        with medir("enviar_correo"):
+                            exito, mensaje = enviar_correo(
+                                lista_destinos, asunto, suscripciones.cuerpo(envio), 
+                                pdf_bytes, envio.nombre_archivo, 
+                                SMTP_USER, SMTP_PASSWORD
+                            )
+                        
+                        if exito:
+                            suscripciones.registrar(envio)
+                            st.success(f"{mensaje} ({len(envio.diario)} días con movimientos, desde {envio.desde}).")
+                        else:
+                            st.error(f"Error al enviar: {mensaje}")
+                    except Exception as e:
+                        st.error(f"Error generando reporte: {e}")
+
+@fragmento("rendimiento")
+def panel_rendimiento():
+    """Latencias recientes por operación (y por rol / fragmento) y uso de la caché de artefactos."""
+    with st.expander("⏱️ Rendimiento (latencias recientes)"):
+        agrupar_rol = st.checkbox("Desglosar por rol", value=True, key="perf_por_rol")
+        filas_perf = instrumentacion.resumen(por_rol=agrupar_rol)
+        if filas_perf:
+            st.dataframe(pd.DataFrame(filas_perf), use_container_width=True, hide_index=True)
+        else:
+            st.caption("Aún no hay mediciones registradas.")
+        
+        log_activo = st.checkbox("Registrar cada rerun en archivo (JSON Lines)", value=instrumentacion.log_activo(), key="perf_log_activo",
+                                 help=f"Archivo: {instrumentacion.ruta_log()} (se cambia con ALBERGUE_PERF_LOG).")
+        instrumentacion.activar_log(log_activo)
+        
+        st.button("Limpiar mediciones", key="perf_limpiar", on_click=instrumentacion.limpiar)
+        
+        # --- CACHÉ DE ARTEFACTOS (PDF, gráficas, agregados) ---
+        st.write("**Caché de artefactos**")
+        stats_cache = artefactos.cache.estadisticas()
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Uso", f"{stats_cache['bytes'] / 2**20:.1f} / {stats_cache['max_bytes'] / 2**20:.0f} MB")
+        k2.metric("Entradas", stats_cache['entradas'])
+        k3.metric("Tasa de aciertos", f"{stats_cache['tasa_aciertos']:.0%}")
+        k4.metric("Desalojos", stats_cache['desalojos'])
+        filas_cache = artefactos.cache.estadisticas_por_tipo()
+        if filas_cache:
+            st.dataframe(pd.DataFrame(filas_cache), use_container_width=True, hide_index=True)
+        st.button("Vaciar caché de artefactos", key="cache_limpiar", on_click=artefactos.cache.limpiar)
 
 # --- INTERFAZ GRAFICA (STREAMLIT) ---
 st.title("Sistema de Gestión Albergue BELÉN")
 
 # Simulación de Login (Sidebar)
 rol_seleccionado = st.sidebar.selectbox("Selecciona tu Rol (Simulado)", ["Recepción", "Trabajo Social", "Enfermería", "Admin"])
+iniciar_rerun(rol_seleccionado)
 
 if rol_seleccionado == "Recepción":
     st.header("Módulo de Recepción")
@@ -398,683 +747,84 @@ if rol_seleccionado == "Recepción":
     # Navegación por pestañas
     tab_ingreso, tab_salida = st.tabs(["Registro de Ingresos", "Registro de Bajas"])
     
-    # --- PESTAÑA 1: ENTRADAS (Lógica Existente) ---
+    # --- PESTAÑA 1: ENTRADAS ---
     with tab_ingreso:
-        st.subheader("Nuevo Ingreso")
-        # Eliminamos st.form para permitir interactividad (cálculo de edad en tiempo real)
-        col1, col2 = st.columns(2)
-        
-        nombre = col1.text_input("Nombre Completo")
-        identificacion = col2.text_input("Identificación / No. de Documento")
-        
-        fecha_nac = col1.date_input(
-            "Fecha de Nacimiento", 
-            min_value=datetime(1900, 1, 1),
-            max_value=datetime.now(),
-            value=datetime(2000, 1, 1) # Default visual
-        )
-        
-        with col2:
-            nacionalidad = render_smart_select("Nacionalidad", NACIONALIDADES_COMUNES, "recepcion_nac")
-            
-        with col1:
-             genero = render_smart_select("Género", GENEROS_COMUNES, "recepcion_gen")
-        
-        # Calcular edad automáticamente
-        edad = 0
-        if fecha_nac:
-            edad = (datetime.now().date() - fecha_nac).days // 365
-            col2.success(f"Edad calculada: {edad} años")
-        
-        st.subheader("Datos de Registro y Acompañamiento")
-        
-        es_menor = (fecha_nac is not None and edad < 18)
-        
-        tipo_registro = "Titular" # Default
-        folio_tutor_input = ""
-        num_acompanantes = 0
-        es_familiar_bool = False
-        
-        if es_menor:
-            st.info(f"ℹ️ Al ser menor de edad ({edad} años), se registra automáticamente como Acompañante vinculado a un Titular.")
-            tipo_registro = "Acompañante"
-            es_familiar_bool = True
-            folio_tutor_input = st.text_input("Ingrese Folio del Titular / Tutor (Obligatorio)", help="El folio de la persona adulta responsable.")
-        else:
-            modo_ingreso = st.radio("Tipo de Registro:", ["Titular (Viene solo o es cabeza de familia)", "Acompañante (Es cónyuge/familiar de otro titular)"])
-            
-            if modo_ingreso.startswith("Titular"):
-                tipo_registro = "Titular"
-                es_familiar_bool = False
-                if st.checkbox("¿Viene con personas a su cargo (familia, hijos, otros)?"):
-                    num_acompanantes = st.number_input("Número de acompañantes", min_value=1, step=1, value=1)
-            else:
-                tipo_registro = "Acompañante"
-                es_familiar_bool = True
-                folio_tutor_input = st.text_input("Ingrese Folio del Titular Responsable")
-
-        submitted = st.button("Registrar Ingreso")
-        
-        if submitted:
-            errores = []
-            if not nombre:
-                errores.append("El nombre es obligatorio.")
-            
-            if tipo_registro == "Acompañante" and not folio_tutor_input:
-                errores.append("El Folio del Titular es obligatorio para acompañantes (y menores).")
-                
-            if errores:
-                for e in errores:
-                    st.error(e)
-            else:
-                try:
-                    nuevo_folio = generar_folio(es_familiar_bool, folio_tutor_input if es_familiar_bool else None)
-                    
-                    datos = {
-                        'folio': nuevo_folio,
-                        'nombre': nombre,
-                        'identificacion': identificacion,
-                        'edad': edad,
-                        'fecha_nacimiento': fecha_nac.strftime("%Y-%m-%d") if fecha_nac else "",
-                        'nacionalidad': nacionalidad,
-                        'genero': genero,
-                        'tipo': tipo_registro,
-                        'tutor_folio': folio_tutor_input if es_familiar_bool else '',
-                        'fecha_ingreso': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'num_acompanantes': num_acompanantes,
-                        'fecha_salida': '',  # Nuevo campo vacío
-                        'motivo_salida': ''  # Nuevo campo vacío
-                    }
-                    guardar_persona(datos)
-                    st.success(f"Registrado con éxito. Folio Asignado: {nuevo_folio}")
-                except ValueError as e:
-                    st.error(str(e))
+        formulario_ingreso()
 
-    # --- PESTAÑA 2: SALIDAS (Nueva Funcionalidad) ---
+    # --- PESTAÑA 2: SALIDAS ---
     with tab_salida:
         st.subheader("Procesar Baja")
-        df_salida = cargar_datos()
-        
-        # Filtrar solo personas activas (fecha_salida es NaN o vacío)
-        if not df_salida.empty:
-            # Asegurar que existe columna fecha_salida (por si es archivo viejo)
-            if 'fecha_salida' not in df_salida.columns:
-                df_salida['fecha_salida'] = ''
-            
-            # Filtro: Aquellos que NO tienen fecha de salida (vacío o NaN)
-            activos = df_salida[df_salida['fecha_salida'].isna() | (df_salida['fecha_salida'] == '')]
-            
-            if activos.empty:
-                st.info("No hay personas activas en el albergue actualmente.")
-            else:
-                # Buscador: Folio - Nombre
-                opciones = activos.apply(lambda x: f"{x['folio']} - {x['nombre']}", axis=1).tolist()
-                seleccion = st.selectbox("Buscar persona por Folio o Nombre", opciones)
-                
-                if seleccion:
-                    # Extraer folio
-                    folio_sel = seleccion.split(" - ")[0]
-                    # Convertir a string para evitar IndexError por mismatch de tipos
-                    persona_sel = activos[activos['folio'].astype(str) == folio_sel].iloc[0]
-                    
-                    st.markdown("### Datos de la Persona")
-                    st.markdown(f"""
-                    - **Nombre:** {persona_sel['nombre']}
-                    - **Folio:** {persona_sel['folio']}
-                    - **Fecha Ingreso:** {persona_sel.get('fecha_ingreso', 'N/A')}
-                    - **Número de Acompañantes:** {persona_sel.get('num_acompanantes', 0)}
-                    """)
-                    
-                    tipo_persona = persona_sel.get('tipo', 'Titular')
-                    lista_baja = [folio_sel] # Lista de folios a dar de baja
-                    mensaje_alerta = ""
-                    
-                    # Lógica Familiar: Si es Titular, buscar acompañantes activos
-                    if tipo_persona == 'Titular':
-                        # Normalizar para buscar hijos
-                        folio_norm = normalize_id(folio_sel)
-                        activos['tutor_norm'] = activos['tutor_folio'].apply(normalize_id)
-                        acompanantes = activos[activos['tutor_norm'] == folio_norm]
-                        
-                        if not acompanantes.empty:
-                            nombres_acomp = acompanantes['nombre'].tolist()
-                            folios_acomp = acompanantes['folio'].tolist()
-                            lista_baja.extend(folios_acomp)
-                            
-                            st.warning(f"⚠️ **ATENCIÓN:** Al dar de baja a este Titular, también se dará de baja a sus {len(nombres_acomp)} acompañantes:")
-                            st.write(f"**Acompañantes:** {', '.join(nombres_acomp)}")
-                            mensaje_alerta = f"Se dará de baja al grupo familiar completo ({len(lista_baja)} personas)."
-                    
-                    motivo_baja = st.text_area("Motivo de Salida (Obligatorio)")
-                    
-                    if st.button("Confirmar Baja / Salida", disabled=(not motivo_baja), type="primary"):
-                        # Procesar Baja
-                        try:
-                            df_update = pd.read_excel(DB_FILE, sheet_name='Personas')
-                            # Asegurar columnas
-                            if 'fecha_salida' not in df_update.columns: df_update['fecha_salida'] = ''
-                            if 'motivo_salida' not in df_update.columns: df_update['motivo_salida'] = ''
-                            
-                            ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            
-                            # Actualizar registros
-                            # Convertimos a string para asegurar match
-                            df_update['folio_str'] = df_update['folio'].astype(str)
-                            lista_baja_str = [str(x) for x in lista_baja]
-                            
-                            mask = df_update['folio_str'].isin(lista_baja_str)
-                            df_update.loc[mask, 'fecha_salida'] = ahora
-                            df_update.loc[mask, 'motivo_salida'] = motivo_baja
-                            
-                            # Guardar
-                            df_update = df_update.drop(columns=['folio_str'])
-                            with pd.ExcelWriter(DB_FILE, mode='a', if_sheet_exists='replace') as writer:
-                                df_update.to_excel(writer, sheet_name='Personas', index=False)
-                                
-                            st.success(f"✅ Salida registrada exitosamente. {mensaje_alerta}")
-                            st.rerun()
-                            
-                        except Exception as e:
-                            st.error(f"Error al procesar la salida: {e}")
+        marcar_vista_actualizada("feed_recepcion")
+        vigilar_cambios("feed_recepcion", lambda e: e.tipo in CAMBIOS_LISTA or e.tipo == eventos.EDICION)
+        panel_bajas()
 
 elif rol_seleccionado == "Trabajo Social":
     st.header("Entrevista Social")
-    df = cargar_datos()
+    marcar_vista_actualizada("feed_social")
+    # Solo activos para entrevista
+    with medir("registro_activos"):
+        activos = obtener_activos()
     
-    # Filtrar solo activos para entrevista
-    if 'fecha_salida' not in df.columns: df['fecha_salida'] = ''
-    df_activos = df[df['fecha_salida'].isna() | (df['fecha_salida'] == '')]
-    
-    if df_activos.empty:
+    if len(activos) == 0:
         st.info("No hay personas activas registradas para realizar entrevista.")
-        folio_buscar = None
     else:
         # Buscador de personas (Solo Activos)
-        folio_buscar = st.selectbox("Seleccione persona (Solo Activos)", df_activos['folio'].tolist())
+        folio_buscar = st.selectbox("Seleccione persona (Solo Activos)", activos.folios())
+        vigilar_cambios("feed_social", lambda e: e.tipo in CAMBIOS_LISTA or e.afecta(folio_buscar))
         
-        # Cargar datos de encuestas para verificar existencia
-        try:
-            df_encuestas = pd.read_excel(DB_FILE, sheet_name='Encuestas')
-        except:
-            df_encuestas = pd.DataFrame()
-            
-        datos_previos = None
-        if not df_encuestas.empty and 'folio_persona' in df_encuestas.columns:
-             match = df_encuestas[df_encuestas['folio_persona'].astype(str) == str(folio_buscar)]
-             if not match.empty:
-                 datos_previos = match.iloc[0]
-
-        # Mostrar datos traídos de recepción (Solo lectura)
         if folio_buscar:
-            persona = df[df['folio'] == folio_buscar].iloc[0]
-            
-            # Key para el estado de edición de este folio
-            key_edit = f"edit_mode_{folio_buscar}"
-            if key_edit not in st.session_state:
-                st.session_state[key_edit] = False
-            
-            is_editing = st.session_state[key_edit]
-            disabled_inputs = not is_editing
-            
-            st.subheader("Datos de la persona")
-            
-            # Usaremos contenedores o columnas para layout homogéneo
-            c1, c2 = st.columns(2)
-            
-            # --- CAMPOS UNIFICADOS (Lectura/Edición controlados por 'disabled_inputs') ---
-            # 1. Nombre
-            val_nombre = c1.text_input("Nombre Completo", value=persona['nombre'], disabled=disabled_inputs, key=f"p_nom_{folio_buscar}")
-            
-            # 2. Edad
-            val_edad_int = int(persona['edad']) if pd.notnull(persona['edad']) else 0
-            val_edad = c2.number_input("Edad", value=val_edad_int, step=1, disabled=disabled_inputs, key=f"p_edad_{folio_buscar}")
-            
-            # 3. Nacionalidad
-            with c1:
-                val_nac = render_smart_select("Nacionalidad", NACIONALIDADES_COMUNES, f"p_nac_{folio_buscar}", default_value=persona['nacionalidad'], disabled=disabled_inputs)
-            
-            # 4. Género
-            with c2:
-                val_gen = render_smart_select("Género", GENEROS_COMUNES, f"p_gen_{folio_buscar}", default_value=persona.get('genero', ''), disabled=disabled_inputs)
-            
-            # 5. ID
-            val_id = c1.text_input("Identificación / ID", value=persona.get('identificacion', ''), disabled=disabled_inputs, key=f"p_id_{folio_buscar}")
-            
-            # 6. Lógica condicional (Acompañantes / Tutor)
-            tipo_p = persona.get('tipo', 'Titular')
-            val_acompanantes = persona.get('num_acompanantes', 0)
-            
-            if tipo_p == 'Titular':
-                # Titular: Campo numérico editable (si está en modo edición)
-                val_acompanantes = c2.number_input("Número de Acompañantes", value=int(val_acompanantes) if pd.notnull(val_acompanantes) else 0, step=1, disabled=disabled_inputs, key=f"p_anum_{folio_buscar}")
-            else:
-                # Acompañante: Muestra folio tutor (Siempre deshabilitado para edición manual directa, es referencial)
-                tutor_folio = persona.get('tutor_folio', 'N/A')
-                tutor_clean = normalize_id(tutor_folio)
-                c2.text_input("Folio del Titular/Tutor", value=tutor_clean, disabled=True, key=f"p_tut_{folio_buscar}")
-                
-                # Info extra visual
-                df['folio_norm_temp'] = df['folio'].apply(normalize_id)
-                tutor_row = df[df['folio_norm_temp'] == tutor_clean]
-                if not tutor_row.empty:
-                     lim = tutor_row.iloc[0].get('num_acompanantes', 0)
-                     st.caption(f"ℹ️ Titular autoriza hasta {lim} acompañantes.")
-
-            # --- BOTONES DE ACCIÓN ---
-            st.write("") # Espaciador
-            
-            if not is_editing:
-                if st.button("✏️ Editar", key=f"btn_edit_{folio_buscar}"):
-                    st.session_state[key_edit] = True
-                    st.rerun()
-            else:
-                # Detectar cambios para habilitar/deshabilitar botón Actualizar
-                cambio_nombre = val_nombre != persona['nombre']
-                cambio_edad = val_edad != val_edad_int
-                cambio_nac = val_nac != persona['nacionalidad']
-                cambio_gen = val_gen != persona.get('genero', '')
-                cambio_id = str(val_id) != str(persona.get('identificacion', ''))
-                
-                cambio_num_acomp = False
-                if tipo_p == 'Titular':
-                    old_num = int(persona.get('num_acompanantes', 0)) if pd.notnull(persona.get('num_acompanantes', 0)) else 0
-                    cambio_num_acomp = val_acompanantes != old_num
-                
-                hay_cambios = any([cambio_nombre, cambio_edad, cambio_nac, cambio_gen, cambio_id, cambio_num_acomp])
-                
-                col_b1, col_b2 = st.columns([1, 1])
-                with col_b1:
-                    if st.button("❌ Cancelar", key=f"btn_cancel_{folio_buscar}"):
-                        st.session_state[key_edit] = False
-                        st.rerun()
-                with col_b2:
-                    # Botón Actualizar
-                    if st.button("💾 Actualizar y Guardar", disabled=not hay_cambios, key=f"btn_save_{folio_buscar}"):
-                         datos_update = {
-                            'folio': folio_buscar,
-                            'nombre': val_nombre,
-                            'edad': val_edad,
-                            'nacionalidad': val_nac,
-                            'genero': val_gen,
-                            'identificacion': val_id
-                        }
-                         if tipo_p == 'Titular':
-                             datos_update['num_acompanantes'] = val_acompanantes
-                             
-                         if actualizar_persona(datos_update):
-                             st.success("Actualizado correctamente.")
-                             st.session_state[key_edit] = False
-                             st.rerun()
-                         else:
-                             st.error("No se pudo actualizar.")
-            
+            datos_persona(folio_buscar, "", "Datos de la persona", "✏️ Editar", mostrar_tope_tutor=True)
             st.markdown("---")
-            st.subheader("Cuestionario Social")
-            
-            # Key para estado de edición de la entrevista
-            key_social = f"social_edit_{folio_buscar}"
-            existe_encuesta = datos_previos is not None
-            
-            # Si no está en sesión, inicializar
-            if key_social not in st.session_state:
-                # Si existe encuesta -> Modo Lectura (False)
-                # Si NO existe -> Modo Edición (True) para llenar por primera vez
-                st.session_state[key_social] = not existe_encuesta
-                
-            is_social_editing = st.session_state[key_social]
-            disabled_social = not is_social_editing
-            
-            # --- WIDGETS HOMOGÉNEOS ---
-            # Listas de opciones
-            opts_civil = ["Soltero/a", "Casado/a", "Unión Libre", "Divorciado/a", "Viudo/a"]
-            opts_escolaridad = ["Ninguna", "Primaria", "Secundaria", "Preparatoria/Bachillerato", "Universidad", "Posgrado"]
-            opts_migratorio = ["Irregular", "Solicitante", "TURH", "En Tránsito", "Retorno voluntario", "Refugiado"]
-            
-            # Valores por defecto para widgets (tomados de datos_previos si existen, o default)
-            val_civil_idx = 0
-            val_escolaridad_idx = 0
-            val_ocupacion = ""
-            val_enfermedad = ""
-            val_migratorio_idx = 0
-            val_motivo = ""
-            val_destino = ""
-            
-            if datos_previos is not None:
-                try: val_civil_idx = opts_civil.index(datos_previos.get('estado_civil', opts_civil[0]))
-                except: pass
-                try: val_escolaridad_idx = opts_escolaridad.index(datos_previos.get('escolaridad', opts_escolaridad[0]))
-                except: pass
-                val_ocupacion = datos_previos.get('ocupacion', "")
-                val_enfermedad = datos_previos.get('enfermedad_cronica', "")
-                try: val_migratorio_idx = opts_migratorio.index(datos_previos.get('estado_migratorio', opts_migratorio[0]))
-                except: pass
-                val_motivo = datos_previos.get('motivo_salida', "")
-                val_destino = datos_previos.get('destino', "")
-            
-            # Layout de Inputs
-            sc1, sc2 = st.columns(2)
-            
-            # Usar keys únicos para evitar conflictos
-            inp_civil = sc1.selectbox("Estado Civil", opts_civil, index=val_civil_idx, disabled=disabled_social, key=f"s_civ_{folio_buscar}")
-            inp_escolaridad = sc2.selectbox("Escolaridad", opts_escolaridad, index=val_escolaridad_idx, disabled=disabled_social, key=f"s_esc_{folio_buscar}")
-            
-            inp_ocupacion = sc1.text_input("Ocupación", value=val_ocupacion, disabled=disabled_social, key=f"s_ocu_{folio_buscar}")
-            inp_enfermedad = sc2.text_input("Enfermedad Crónica", value=val_enfermedad, help="Especifique o escriba 'Ninguna'", disabled=disabled_social, key=f"s_enf_{folio_buscar}")
-            
-            inp_migratorio = sc1.selectbox("Estado Migratorio", opts_migratorio, index=val_migratorio_idx, disabled=disabled_social, key=f"s_mig_{folio_buscar}")
-            
-            inp_motivo = st.text_area("Motivo de salida de origen", value=val_motivo, disabled=disabled_social, key=f"s_mot_{folio_buscar}")
-            inp_destino = st.text_input("Destino Final", value=val_destino, disabled=disabled_social, key=f"s_des_{folio_buscar}")
-            
-            st.write("") # Espaciador
-            
-            # --- LÓGICA DE BOTONES ---
-            if not is_social_editing:
-                # MODO LECTURA
-                
-                # 1. Botón Editar
-                if st.button("✏️ Editar Entrevista", key=f"btn_s_edit_{folio_buscar}"):
-                    st.session_state[key_social] = True
-                    st.rerun()
-                
-                # 2. Botón PDF (SOLO SI ES MENOR DE 18, como solicitado)
-                # Validar edad desde el registro de persona
-                edad_val = 0
-                try:
-                    edad_val = int(persona.get('edad', 0))
-                except:
-                    pass
-                    
-                if edad_val >= 18:
-                    if st.button("📄 Generar/Ver Reglamento", key=f"btn_pdf_{folio_buscar}"):
-                         # Generación "al vuelo"
-                         nombre_p = persona.get('nombre', 'Desconocido')
-                         fecha_i = persona.get('fecha_ingreso', datetime.now().strftime("%Y-%m-%d"))
-                         pdf_bytes = generar_pdf_reglamento(nombre_p, fecha_i)
-                         b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-                         pdf_link = f'<a href="data:application/pdf;base64,{b64_pdf}" download="Reglamento_{folio_buscar}.pdf" target="_blank">📥 Descargar PDF Generado</a>'
-                         st.markdown(pdf_link, unsafe_allow_html=True)
-            
-            else:
-                # MODO EDICIÓN / CRACIÓN
-                col_sa, col_sb = st.columns([1, 1])
-                
-                with col_sa:
-                    # Mostrar cancelar solo si ya existía datos previos (si es nuevo registro, cancelar quizás no tenga sentido o podría limpiar)
-                    if existe_encuesta:
-                        if st.button("❌ Cancelar", key=f"btn_s_cancel_{folio_buscar}"):
-                            st.session_state[key_social] = False
-                            st.rerun()
-                            
-                with col_sb:
-                    label_save = "💾 Guardar Entrevista" if existe_encuesta else "💾 Registrar Entrevista"
-                    if st.button(label_save, key=f"btn_s_save_{folio_buscar}"):
-                        datos_encuesta = {
-                            'folio_persona': folio_buscar,
-                            'estado_civil': inp_civil,
-                            'escolaridad': inp_escolaridad,
-                            'ocupacion': inp_ocupacion,
-                            'enfermedad_cronica': inp_enfermedad,
-                            'estado_migratorio': inp_migratorio,
-                            'motivo_salida': inp_motivo,
-                            'destino': inp_destino,
-                            'redes_apoyo': 'N/A', 
-                            'observaciones': 'N/A'
-                        }
-                        guardar_encuesta(datos_encuesta)
-                        st.success("Entrevista guardada exitosamente.")
-                        
-                        # Cambiar a modo lectura
-                        st.session_state[key_social] = False
-                        st.rerun()
+            cuestionario_social(folio_buscar)
 
 
 elif rol_seleccionado == "Enfermería":
     st.header("Módulo de Enfermería")
-    df = cargar_datos()
-    
-    # Filtrar solo activos para atención
-    if 'fecha_salida' not in df.columns: df['fecha_salida'] = ''
-    df_activos = df[df['fecha_salida'].isna() | (df['fecha_salida'] == '')]
+    marcar_vista_actualizada("feed_enfermeria")
+    # Solo activos para atención
+    with medir("registro_activos"):
+        activos = obtener_activos()
     
-    if df_activos.empty:
+    if len(activos) == 0:
         st.info("No hay personas activas registradas para atención médica.")
-        folio_buscar = None
     else:
         # Buscador de personas (Solo Activos)
-        folio_buscar = st.selectbox("Seleccione paciente (Solo Activos)", df_activos['folio'].tolist(), key="enf_k_selector")
+        folio_buscar = st.selectbox("Seleccione paciente (Solo Activos)", activos.folios(), key="enf_k_selector")
+        vigilar_cambios("feed_enfermeria", lambda e: e.tipo in CAMBIOS_LISTA or (e.tipo == eventos.EDICION and e.afecta(folio_buscar)))
         
-        # Mostrar datos de la persona
         if folio_buscar:
-            persona = df[df['folio'] == folio_buscar].iloc[0]
-            
-            # Key único para edición en enfermería
-            key_edit = f"enf_edit_mode_{folio_buscar}"
-            if key_edit not in st.session_state:
-                st.session_state[key_edit] = False
-            
-            is_editing = st.session_state[key_edit]
-            disabled_inputs = not is_editing
-            
-            st.subheader("Datos del Paciente")
-            
-            c1, c2 = st.columns(2)
-            
-            # --- CAMPOS (Replicados de Trabajo Social) ---
-            val_nombre = c1.text_input("Nombre Completo", value=persona['nombre'], disabled=disabled_inputs, key=f"enf_p_nom_{folio_buscar}")
-            
-            val_edad_int = int(persona['edad']) if pd.notnull(persona['edad']) else 0
-            val_edad = c2.number_input("Edad", value=val_edad_int, step=1, disabled=disabled_inputs, key=f"enf_p_edad_{folio_buscar}")
-            
-            # val_nac = c1.text_input("Nacionalidad", value=persona['nacionalidad'], disabled=disabled_inputs, key=f"enf_p_nac_{folio_buscar}")
-            with c1:
-                val_nac = render_smart_select("Nacionalidad", NACIONALIDADES_COMUNES, f"enf_nac_{folio_buscar}", default_value=persona['nacionalidad'], disabled=disabled_inputs)
-            with c2:
-                val_gen = render_smart_select("Género", GENEROS_COMUNES, f"enf_gen_{folio_buscar}", default_value=persona.get('genero', ''), disabled=disabled_inputs)
-            val_id = c1.text_input("Identificación / ID", value=persona.get('identificacion', ''), disabled=disabled_inputs, key=f"enf_p_id_{folio_buscar}")
-            
-            # Acompañantes / Tutor Logic
-            tipo_p = persona.get('tipo', 'Titular')
-            val_acompanantes = persona.get('num_acompanantes', 0)
-            
-            if tipo_p == 'Titular':
-                val_acompanantes = c2.number_input("Número de Acompañantes", value=int(val_acompanantes) if pd.notnull(val_acompanantes) else 0, step=1, disabled=disabled_inputs, key=f"enf_p_anum_{folio_buscar}")
-            else:
-                tutor_folio = persona.get('tutor_folio', 'N/A')
-                tutor_clean = normalize_id(tutor_folio)
-                c2.text_input("Folio del Titular/Tutor", value=tutor_clean, disabled=True, key=f"enf_p_tut_{folio_buscar}")
-            
-            # --- BOTONES DE ACCIÓN ---
-            st.write("") 
-            
-            if not is_editing:
-                if st.button("✏️ Editar Datos Personales", key=f"enf_btn_edit_{folio_buscar}"):
-                    st.session_state[key_edit] = True
-                    st.rerun()
-            else:
-                # Detectar cambios
-                cambio_nombre = val_nombre != persona['nombre']
-                cambio_edad = val_edad != val_edad_int
-                cambio_nac = val_nac != persona['nacionalidad']
-                cambio_gen = val_gen != persona.get('genero', '')
-                cambio_id = str(val_id) != str(persona.get('identificacion', ''))
-                
-                cambio_num_acomp = False
-                if tipo_p == 'Titular':
-                    old_num = int(persona.get('num_acompanantes', 0)) if pd.notnull(persona.get('num_acompanantes', 0)) else 0
-                    cambio_num_acomp = val_acompanantes != old_num
-                
-                hay_cambios = any([cambio_nombre, cambio_edad, cambio_nac, cambio_gen, cambio_id, cambio_num_acomp])
-                
-                col_b1, col_b2 = st.columns([1, 1])
-                with col_b1:
-                    if st.button("❌ Cancelar", key=f"enf_btn_cancel_{folio_buscar}"):
-                        st.session_state[key_edit] = False
-                        st.rerun()
-                with col_b2:
-                    if st.button("💾 Actualizar y Guardar", disabled=not hay_cambios, key=f"enf_btn_save_{folio_buscar}"):
-                         datos_update = {
-                            'folio': folio_buscar,
-                            'nombre': val_nombre,
-                            'edad': val_edad,
-                            'nacionalidad': val_nac,
-                            'genero': val_gen,
-                            'identificacion': val_id
-                        }
-                         if tipo_p == 'Titular':
-                             datos_update['num_acompanantes'] = val_acompanantes
-                             
-                         if actualizar_persona(datos_update):
-                             st.success("Actualizado correctamente.")
-                             st.session_state[key_edit] = False
-                             st.rerun()
-                         else:
-                             st.error("No se pudo actualizar.")
-            
+            datos_persona(folio_buscar, "enf_", "Datos del Paciente", "✏️ Editar Datos Personales")
             st.markdown("---")
             st.info("Módulo de Enfermería en construcción.")
 
 elif rol_seleccionado == "Admin":
     st.header("Dashboard General")
-    df = cargar_datos()
+    if not cifrado.activo():
+        st.warning("Los datos se guardan sin cifrar. Configura 'ALBERGUE_CLAVE' en los 'Secrets' "
+                   "(genera una con `python -m albergue.cifrado --generar-clave`).")
+    marcar_vista_actualizada("feed_admin")
+    vigilar_cambios("feed_admin", lambda e: True)
+    with medir("cargar_datos"):
+        df = cargar_datos()
     
     st.write("### Base de datos actual (Vista Excel)")
-    st.dataframe(df)
+    with medir("render_tabla_personas"):
+        st.dataframe(df)
     
     st.write("### Estadísticas Rápidas")
     
     # --- FILTRO POBLACIÓN DINÁMICO ---
     if not df.empty:
-        # Asegurar columna fecha_salida
-        if 'fecha_salida' not in df.columns:
-            df['fecha_salida'] = ''
-        
-        # Selector de filtro
-        opcion_filtro = st.radio(
-            "Filtro de Visualización para Gráficas:", 
-            ["Activos (En Albergue)", "Inactivos (Salidas)", "Histórico (Todos)"], 
-            horizontal=True
-        )
-        
-        df_filtrado = pd.DataFrame()
-        label_filtro = ""
-        
-        if opcion_filtro.startswith("Activos"):
-            df_filtrado = df[df['fecha_salida'].isna() | (df['fecha_salida'] == '')]
-            label_filtro = "Solo Activos"
-        elif opcion_filtro.startswith("Inactivos"):
-            df_filtrado = df[~(df['fecha_salida'].isna() | (df['fecha_salida'] == ''))]
-            label_filtro = "Solo Salidas"
-        else:
-            df_filtrado = df
-            label_filtro = "Todos"
-        
-        st.info(f"Mostrando datos para: **{len(df_filtrado)} personas** ({label_filtro})")
-        
-        # Cargar Encuestas
-        try:
-            df_encuestas = pd.read_excel(DB_FILE, sheet_name='Encuestas')
-        except:
-            df_encuestas = pd.DataFrame()
-
-        c1, c2 = st.columns(2)
-        
-        with c1:
-            st.write(f"**Nacionalidad ({label_filtro})**")
-            if not df_filtrado.empty:
-                st.bar_chart(df_filtrado['nacionalidad'].value_counts())
-            else:
-                st.caption("Sin datos para mostrar con este filtro.")
-            
-        with c2:
-            st.write(f"**Estado Civil ({label_filtro})**")
-            
-            if not df_encuestas.empty and not df_filtrado.empty and 'estado_civil' in df_encuestas.columns:
-                # Filtrar encuestas que coincidan con folios del filtro actual
-                folios_validos = df_filtrado['folio'].astype(str).tolist()
-                df_encuestas['folio_str'] = df_encuestas['folio_persona'].astype(str)
-                
-                encuestas_filtradas = df_encuestas[df_encuestas['folio_str'].isin(folios_validos)]
-                
-                if not encuestas_filtradas.empty:
-                    fig_pie, ax_pie = plt.subplots(figsize=(6, 3))
-                    datos_civil = encuestas_filtradas['estado_civil'].fillna('Sin Registro').value_counts()
-                    ax_pie.pie(datos_civil, labels=datos_civil.index, autopct='%1.1f%%', startangle=90)
-                    ax_pie.axis('equal') 
-                    st.pyplot(fig_pie)
-                else:
-                    st.caption("No hay encuestas asociadas a este grupo.")
-            else:
-                st.caption("Datos insuficientes para graficar.")
+        panel_estadisticas()
 
         st.markdown("---")
         st.write("### Reporte de Altas y Bajas")
         
         if 'fecha_ingreso' in df.columns:
-            # --- TABLA DIARIA ---
-            st.write("#### 📅 Movimientos Diarios")
-            
-            # Altas por día (Robustez: convertir a string y tomar primeros 10 caracteres YYYY-MM-DD)
-            df['ingreso_dt'] = pd.to_datetime(df['fecha_ingreso'].astype(str).str.strip().str[:10], errors='coerce').dt.date
-            altas_dia = df['ingreso_dt'].value_counts().rename("Altas")
-            
-            # Bajas por día
-            df['salida_dt'] = pd.to_datetime(df['fecha_salida'].astype(str).str.strip().str[:10], errors='coerce').dt.date
-            bajas_dia = df['salida_dt'].value_counts().rename("Bajas")
-            
-            # Unir (Outer join para mostrar días donde solo hubo altas o solo bajas)
-            # Convertimos indices a datetime para ordenar si es necesario, o concatenamos
-            mov_diario = pd.concat([altas_dia, bajas_dia], axis=1).fillna(0).astype(int).sort_index()
-            st.dataframe(mov_diario, use_container_width=True)
-            
-            # --- TABLA MENSUAL ---
-            st.write("#### Movimientos Mensuales")
-            
-            # Extraer mes año (YYYY-MM)
-            altas_mes = pd.to_datetime(df['fecha_ingreso'].astype(str).str.strip().str[:10], errors='coerce').dt.strftime('%Y-%m').value_counts().rename("Altas")
-            bajas_mes = pd.to_datetime(df['fecha_salida'].astype(str).str.strip().str[:10], errors='coerce').dt.strftime('%Y-%m').value_counts().rename("Bajas")
-            
-            mov_mensual = pd.concat([altas_mes, bajas_mes], axis=1).fillna(0).astype(int).sort_index()
-            st.dataframe(mov_mensual, use_container_width=True)
-            
-            st.markdown("---")
-            st.markdown("---")
-            st.header("Enviar Reporte PDF por Correo")
-            
-            # Input de destinatarios múltiple
-            destinatarios_str = st.text_input("Destinatarios (separados por coma)", help="Ejemplo: correo1@gmail.com, correo2@hotmail.com")
-            
-            if st.button("Generar y Enviar Reporte PDF"):
-                # Validar Credenciales del Sistema
-                if not SMTP_USER or not SMTP_PASSWORD:
-                    st.error(" Error de Configuración: No se encontraron las credenciales de correo.")
-                    st.info("Por favor, configura 'SMTP_USER' y 'SMTP_PASSWORD' en los 'Secrets' de Streamlit Cloud o en '.streamlit/secrets.toml' localmente.")
-                elif not destinatarios_str:
-                    st.error("Ingresa al menos un destinatario.")
-                else:
-                    # Convertir string separado por comas a lista limpia
-                    lista_destinos = [email.strip() for email in destinatarios_str.split(',') if email.strip()]
-                    
-                    if not lista_destinos:
-                         st.error("No se detectaron correos válidos.")
-                    else:
-                        with st.spinner(f"Generando PDF y enviando a {len(lista_destinos)} destinatarios..."):
-                            try:
-                                pdf_bytes = generar_pdf_reporte(mov_diario, mov_mensual)
-                                
-                                asunto = f"Reporte Albergue - {datetime.now().strftime('%Y-%m-%d')}"
-                                cuerpo = "Reporte detallado de Altas y Bajas (Diario y Mensual)."
-                                
-                                # Usar credenciales cargadas desde Secrets
-                                exito, mensaje = enviar_correo(
-                                    lista_destinos, asunto, cuerpo, 
-                                    pdf_bytes, "Reporte_Movimientos.pdf", 
-                                    SMTP_USER, SMTP_PASSWORD
-                                )
-                                
-                                if exito:
-                                    st.success(f"{mensaje}")
-                                else:
-                                    st.error(f"Error al enviar: {mensaje}")
-                            except Exception as e:
-                                st.error(f"Error generando reporte: {e}")
\ No newline at end of file
+            panel_movimientos()
+
+    # --- PANEL DE RENDIMIENTO ---
+    st.markdown("---")
+    panel_rendimiento()
+
+finalizar_rerun()
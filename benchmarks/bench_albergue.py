@@ -0,0 +1,159 @@
+"""
+Benchmark sin Streamlit de la capa de datos y del dashboard.
+
+Uso:
+    python -m benchmarks.bench_albergue --escalas 1000,10000,100000 --salida bench.json
+
+Para cada escala genera una base sintética en un directorio temporal, mide cada
+operación varias veces y emite un JSON con min/mediana/max en milisegundos.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import albergue
+from benchmarks.datos_sinteticos import escribir_base
+
+
+def medir(funcion, repeticiones, preparar=None):
+    """Ejecuta funcion() repeticiones veces y devuelve los tiempos en ms."""
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return tiempos
+
+
+def _resumen(escala, operacion, tiempos, error=None):
+    resultado = {'escala': escala, 'operacion': operacion, 'repeticiones': len(tiempos)}
+    if tiempos:
+        resultado.update({
+            'min_ms': round(min(tiempos), 3),
+            'mediana_ms': round(statistics.median(tiempos), 3),
+            'max_ms': round(max(tiempos), 3),
+        })
+    if error:
+        resultado['error'] = error
+    return resultado
+
+
+def bench_escala(escala, repeticiones, dir_trabajo):
+    """Mide todas las operaciones sobre una base sintética de `escala` filas."""
+    base = os.path.join(dir_trabajo, f"base_{escala}.xlsx")
+    db = os.path.join(dir_trabajo, f"datos_{escala}.xlsx")
+    df_base = escribir_base(base, escala)
+    shutil.copyfile(base, db)
+    albergue.configurar(db)
+
+    # Titular con cupo libre para medir folios de acompañante
+    activos = df_base[df_base['fecha_salida'] == '']
+    titulares = activos[activos['tipo'] == 'Titular']
+    ocupados = df_base['tutor_folio'].value_counts()
+    con_cupo = [f for f, lim in zip(titulares['folio'], titulares['num_acompanantes'])
+                if ocupados.get(f, 0) < lim]
+    folio_tutor = con_cupo[0] if con_cupo else None
+    folio_editar = titulares['folio'].iloc[0]
+    folios_baja = titulares['folio'].tolist()
+    encuesta = {
+        'folio_persona': folio_editar, 'estado_civil': 'Casado/a', 'escolaridad': 'Primaria',
+        'ocupacion': 'Comerciante', 'enfermedad_cronica': 'Ninguna', 'estado_migratorio': 'Solicitante',
+        'motivo_salida': 'Económico', 'destino': 'Monterrey', 'redes_apoyo': 'N/A', 'observaciones': 'N/A'
+    }
+
+    def nueva_persona():
+        return {
+            'folio': albergue.generar_folio(False), 'nombre': 'Persona Benchmark', 'identificacion': '123',
+            'edad': 30, 'fecha_nacimiento': '1995-01-01', 'nacionalidad': 'Mexicana', 'genero': 'Femenino',
+            'tipo': 'Titular', 'tutor_folio': '', 'fecha_ingreso': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'num_acompanantes': 0, 'fecha_salida': '', 'motivo_salida': ''
+        }
+
+    # Cada repetición escribe un valor distinto: con el mismo la edición no
+    # produce deltas y se mediría solo el camino sin cambios
+    contador = itertools.count(1)
+
+    def editar_persona():
+        if not albergue.actualizar_persona({'folio': folio_editar, 'nombre': f"Nombre Editado {next(contador)}"}):
+            raise LookupError(f"folio {folio_editar} no encontrado")
+
+    def guardar_encuesta():
+        albergue.guardar_encuesta({**encuesta, 'ocupacion': f"Comerciante {next(contador)}"})
+
+    def folio_acompanante():
+        if folio_tutor is None:
+            raise LookupError("ningún titular activo tiene cupo para acompañantes")
+        albergue.generar_folio(True, folio_tutor)
+
+    def baja_familiar():
+        albergue.baja_grupo_familiar(str(folios_baja.pop()), "Benchmark")
+
+    df_cache = albergue.cargar_datos()
+    movimientos = albergue.calcular_movimientos(df_cache.copy())
+
+    operaciones = [
+        ('cargar_datos', lambda: albergue.cargar_datos()),
+        ('generar_folio_titular', lambda: albergue.generar_folio(False)),
+        ('generar_folio_acompanante', folio_acompanante),
+        ('guardar_persona', lambda: albergue.guardar_persona(nueva_persona())),
+        ('actualizar_persona', editar_persona),
+        ('guardar_encuesta', guardar_encuesta),
+        ('baja_familiar', baja_familiar),
+        ('calcular_movimientos', lambda: albergue.calcular_movimientos(df_cache.copy())),
+        ('generar_pdf_reporte', lambda: albergue.generar_pdf_reporte(*movimientos)),
+    ]
+
+    resultados = []
+    for nombre, funcion in operaciones:
+        try:
+            tiempos = medir(funcion, repeticiones)
+            resultados.append(_resumen(escala, nombre, tiempos))
+        except Exception as e:
+            resultados.append(_resumen(escala, nombre, [], error=f"{type(e).__name__}: {e}"))
+        print(json.dumps(resultados[-1], ensure_ascii=False), file=sys.stderr)
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la capa de datos del albergue.")
+    parser.add_argument('--escalas', default='1000,10000,100000', help="Filas de Personas, separadas por coma.")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto stdout).")
+    args = parser.parse_args(argv)
+
+    escalas = [int(x) for x in args.escalas.split(',') if x.strip()]
+
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix='bench_albergue_') as dir_trabajo:
+        for escala in escalas:
+            resultados.extend(bench_escala(escala, args.repeticiones, dir_trabajo))
+
+    reporte = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'repeticiones': args.repeticiones,
+        'resultados': resultados,
+    }
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
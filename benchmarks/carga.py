@@ -0,0 +1,400 @@
+"""
+Prueba de carga sin Streamlit: muchas sesiones de personal trabajando a la
+vez (hilos dentro de varios procesos) contra una copia temporal de la base.
+
+Uso:
+    python -m benchmarks.carga --personas 1000 --procesos 2 --hilos 3 --operaciones 30
+    python -m benchmarks.carga --base datos_albergue.xlsx --procesos 3 --hilos 4 --salida carga.json
+
+Cada sesión simulada (Recepción, Trabajo Social o Enfermería) mezcla
+ingresos (incluidos los que dejan en blanco nacionalidad y género, y altas
+directas con `guardar_persona`), asignaciones de folio, ediciones, encuestas
+y bajas familiares sobre las personas que ella misma registró, así que el estado final esperado
+se conoce. Al terminar se relee la base en frío y se reportan throughput,
+latencias (p50/p95/p99 por operación) y violaciones de integridad: folios
+duplicados o asignados dos veces, ingresos, ediciones, encuestas o bajas
+perdidos, familias por encima de su límite y un diario que no reproduce el libro.
+El código de salida es 1 si hubo violaciones.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datos_sinteticos import GENEROS, NACIONALIDADES, escribir_base
+
+# Peso de cada operación por rol
+MEZCLAS = {
+    'Recepción': {'ingreso': 4, 'acompanante': 3, 'folio': 2, 'baja': 2, 'edicion': 1,
+                  'sin_catalogos': 1, 'directo': 1},
+    'Trabajo Social': {'encuesta': 4, 'edicion': 2, 'ingreso': 1, 'acompanante': 1, 'sin_catalogos': 1},
+    'Enfermería': {'edicion': 4, 'encuesta': 1, 'ingreso': 1},
+}
+ROLES = list(MEZCLAS)
+MAX_EJEMPLOS = 20
+
+
+# --- SESIÓN SIMULADA (dentro de un proceso de carga) ---
+class Sesion:
+    """Una persona del personal: opera solo sobre las personas que registró y anota lo que espera ver."""
+
+    def __init__(self, nombre, rol, semilla, pausa):
+        self.nombre = nombre
+        self.rol = rol
+        self.rnd = random.Random(semilla)
+        self.pausa = pausa
+        self.contador = 0
+        self.titulares = {}  # folio activo -> acompañantes que aún caben
+        self.activos = []  # folios activos registrados por esta sesión
+        self.familia = {}  # titular -> [acompañantes]
+        # Estado esperado al final
+        self.altas = {}  # folio -> nombre
+        self.limites = {}  # titular -> num_acompanantes
+        self.identificacion = {}  # folio -> último valor confirmado
+        self.encuesta = {}  # folio -> ocupación confirmada
+        self.bajas = set()
+        # Métricas
+        self.latencias = {}
+        self.errores = Counter()
+        self.ejemplos_error = []
+
+    def _token(self):
+        self.contador += 1
+        return f"{self.nombre}-{self.contador}"
+
+    def _elegir(self):
+        operaciones = MEZCLAS[self.rol]
+        op = self.rnd.choices(list(operaciones), weights=list(operaciones.values()))[0]
+        if op in ('edicion', 'encuesta') and not self.activos:
+            return 'ingreso'
+        if op == 'acompanante' and not any(self.titulares.values()):
+            return 'ingreso'
+        if op == 'baja' and not self.titulares:
+            return 'ingreso'
+        return op
+
+    # --- Operaciones ---
+    def ingreso(self, catalogos=True):
+        from albergue import registrar_ingreso
+        limite = self.rnd.randint(0, 3)
+        nombre = f"Carga {self._token()}"
+        datos = self._datos(nombre, limite)
+        if not catalogos:
+            datos.update(nacionalidad='', genero='')
+        self._titular(registrar_ingreso(datos)['folio'], nombre, limite)
+
+    def sin_catalogos(self):
+        self.ingreso(catalogos=False)
+
+    def directo(self):
+        # Alta con el registro ya armado, sin registrar_ingreso: folio y guardado bajo el mismo bloqueo
+        from albergue import almacen, generar_folio, guardar_persona
+        limite = self.rnd.randint(0, 3)
+        nombre = f"Carga {self._token()}"
+        with almacen.bloqueo:
+            folio = generar_folio(False)
+            guardar_persona({**self._datos(nombre, limite), 'folio': folio, 'tipo': 'Titular', 'tutor_folio': '',
+                             'fecha_ingreso': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                             'fecha_salida': '', 'motivo_salida': ''})
+        self._titular(folio, nombre, limite)
+
+    def _titular(self, folio, nombre, limite):
+        self.altas[folio] = nombre
+        self.limites[folio] = limite
+        self.titulares[folio] = limite
+        self.familia[folio] = []
+        self.activos.append(folio)
+
+    def acompanante(self):
+        from albergue import registrar_ingreso
+        tutor = self.rnd.choice([f for f, libres in self.titulares.items() if libres > 0])
+        nombre = f"Carga {self._token()}"
+        registro = registrar_ingreso(self._datos(nombre, 0), es_acompanante=True, folio_tutor=tutor)
+        folio = registro['folio']
+        self.altas[folio] = nombre
+        self.titulares[tutor] -= 1
+        self.familia[tutor].append(folio)
+        self.activos.append(folio)
+
+    def folio(self):
+        from albergue import generar_folio
+        generar_folio(False)
+
+    def edicion(self):
+        from albergue import actualizar_persona
+        folio = self.rnd.choice(self.activos)
+        valor = self._token()
+        if not actualizar_persona({'folio': folio, 'identificacion': valor}):
+            raise LookupError(f"folio {folio} no encontrado")
+        self.identificacion[folio] = valor
+
+    def encuesta_social(self):
+        from albergue import guardar_encuesta
+        folio = self.rnd.choice(self.activos)
+        valor = self._token()
+        guardar_encuesta({
+            'folio_persona': folio, 'estado_civil': 'Soltero/a', 'escolaridad': 'Primaria',
+            'ocupacion': valor, 'enfermedad_cronica': 'Ninguna', 'estado_migratorio': 'Solicitante',
+            'motivo_salida': 'Prueba de carga', 'destino': 'N/A', 'redes_apoyo': 'N/A', 'observaciones': 'N/A',
+        })
+        self.encuesta[folio] = valor
+
+    def baja(self):
+        from albergue import baja_grupo_familiar
+        titular = self.rnd.choice(list(self.titulares))
+        dados = baja_grupo_familiar(titular, f"Prueba de carga {self._token()}")
+        self.bajas.update(str(f) for f in dados)
+        salen = {titular, *self.familia.get(titular, [])}
+        self.activos = [f for f in self.activos if f not in salen]
+        del self.titulares[titular]
+
+    def _datos(self, nombre, num_acompanantes):
+        edad = self.rnd.randint(18, 70)
+        return {
+            'nombre': nombre,
+            'identificacion': self._token(),
+            'edad': edad,
+            'fecha_nacimiento': f"{datetime.now().year - edad}-{self.rnd.randint(1, 12):02d}-{self.rnd.randint(1, 28):02d}",
+            'nacionalidad': self.rnd.choice(NACIONALIDADES),
+            'genero': self.rnd.choice(GENEROS),
+            'num_acompanantes': num_acompanantes,
+        }
+
+    def ejecutar(self, operaciones):
+        acciones = {'ingreso': self.ingreso, 'sin_catalogos': self.sin_catalogos, 'directo': self.directo,
+                    'acompanante': self.acompanante, 'folio': self.folio,
+                    'edicion': self.edicion, 'encuesta': self.encuesta_social, 'baja': self.baja}
+        for _ in range(operaciones):
+            op = self._elegir()
+            t0 = time.perf_counter()
+            try:
+                acciones[op]()
+            except Exception as e:
+                self.errores[op] += 1
+                if len(self.ejemplos_error) < MAX_EJEMPLOS:
+                    self.ejemplos_error.append({'sesion': self.nombre, 'operacion': op, 'error': f"{type(e).__name__}: {e}"})
+            else:
+                self.latencias.setdefault(op, []).append((time.perf_counter() - t0) * 1000)
+            if self.pausa:
+                time.sleep(self.rnd.uniform(0, 2 * self.pausa))
+
+    def resultado(self):
+        return {
+            'sesion': self.nombre, 'rol': self.rol,
+            'latencias': self.latencias, 'errores': dict(self.errores), 'ejemplos_error': self.ejemplos_error,
+            'altas': self.altas, 'limites': self.limites, 'familia': self.familia,
+            'identificacion': self.identificacion, 'encuesta': self.encuesta, 'bajas': sorted(self.bajas),
+        }
+
+
+def ejecutar_proceso(db, indice, hilos, operaciones, semilla, pausa, barrera, clave=None):
+    """Cuerpo de cada proceso de carga: `hilos` sesiones simultáneas. Devuelve sus resultados y la hora de fin."""
+    import albergue
+    from albergue import cifrado
+    cifrado.configurar(clave)
+    albergue.configurar(db)
+    albergue.cargar_datos()  # caché caliente antes de la salida sincronizada
+    sesiones = []
+    for h in range(hilos):
+        n = indice * hilos + h
+        sesiones.append(Sesion(f"P{indice}H{h}", ROLES[n % len(ROLES)], semilla * 1000 + n, pausa))
+    hilos_carga = [threading.Thread(target=s.ejecutar, args=(operaciones,)) for s in sesiones]
+    barrera.wait()
+    for t in hilos_carga:
+        t.start()
+    for t in hilos_carga:
+        t.join()
+    return [s.resultado() for s in sesiones], time.time()
+
+
+# --- VERIFICACIÓN ---
+def verificar(db, sesiones):
+    """Relee la base en frío y compara con lo que cada sesión vio confirmado. Devuelve la lista de violaciones."""
+    from albergue import almacen
+    from albergue.folios import normalize_id
+
+    almacen.configurar(db)
+    personas = almacen.cargar_datos()
+    encuestas = almacen.cargar_encuestas()
+    violaciones = []
+
+    def violacion(tipo, folio, detalle):
+        violaciones.append({'tipo': tipo, 'folio': str(folio), 'detalle': detalle})
+
+    personas['folio_norm'] = personas['folio'].apply(normalize_id)
+    for folio, veces in personas['folio_norm'].value_counts().items():
+        if veces > 1:
+            violacion('folio_duplicado', folio, f"{veces} filas con el mismo folio")
+    por_folio = personas.drop_duplicates('folio_norm', keep='last').set_index('folio_norm')
+    sin_salida = personas.index.isin(almacen.filtrar_activos(personas).index)
+
+    def texto(folio, campo):
+        valor = por_folio.at[folio, campo] if campo in por_folio.columns else ''
+        return '' if pd.isna(valor) else normalize_id(valor)
+
+    asignados = {}
+    for s in sesiones:
+        for folio, nombre in s['altas'].items():
+            if folio in asignados:
+                violacion('folio_asignado_dos_veces', folio, f"sesiones {asignados[folio]} y {s['sesion']}")
+            asignados[folio] = s['sesion']
+            if folio not in por_folio.index:
+                violacion('ingreso_perdido', folio, f"confirmado a {s['sesion']} pero no está en la base")
+            elif por_folio.at[folio, 'nombre'] != nombre:
+                violacion('ingreso_sobrescrito', folio, f"esperado '{nombre}', hay '{por_folio.at[folio, 'nombre']}'")
+
+        for folio, valor in s['identificacion'].items():
+            if folio in por_folio.index and texto(folio, 'identificacion') != valor:
+                violacion('edicion_perdida', folio, f"esperado '{valor}', hay '{texto(folio, 'identificacion')}'")
+
+        for folio, valor in s['encuesta'].items():
+            filas = encuestas[encuestas['folio_persona'].apply(normalize_id) == folio] if not encuestas.empty else encuestas
+            if len(filas) != 1:
+                violacion('encuesta_duplicada' if len(filas) else 'encuesta_perdida', folio, f"{len(filas)} encuestas")
+            elif normalize_id(filas['ocupacion'].iloc[0]) != valor:
+                violacion('encuesta_perdida', folio, f"esperado '{valor}', hay '{filas['ocupacion'].iloc[0]}'")
+
+        bajas = set(s['bajas'])
+        for folio in s['altas']:
+            if folio not in por_folio.index:
+                continue
+            salida = texto(folio, 'fecha_salida')
+            if folio in bajas and not salida:
+                violacion('baja_perdida', folio, "confirmada pero sin fecha de salida")
+            elif folio not in bajas and salida:
+                violacion('baja_inesperada', folio, f"fecha de salida {salida} sin baja de su sesión")
+
+        for titular, limite in s['limites'].items():
+            vinculados = int(((personas['tutor_folio'].apply(normalize_id) == titular) & sin_salida).sum())
+            if vinculados > limite:
+                violacion('familia_excede_limite', titular, f"{vinculados} acompañantes activos, límite {limite}")
+
+    # El diario completo debe reproducir el libro
+    hojas, _ = almacen._reconstruir_desde_diario()
+    rehecha = hojas['Personas'].assign(folio_norm=lambda d: d['folio'].apply(normalize_id))
+    rehecha = rehecha.drop_duplicates('folio_norm', keep='last').set_index('folio_norm')
+    for folio in set(por_folio.index) ^ set(rehecha.index):
+        violacion('diario_no_reproduce', folio, "el folio está solo en el libro o solo en el diario")
+    for folio in set(por_folio.index) & set(asignados):
+        for campo in ('identificacion', 'fecha_salida'):
+            libro = texto(folio, campo)
+            valor = rehecha.at[folio, campo] if campo in rehecha.columns else ''
+            diario = '' if pd.isna(valor) else normalize_id(valor)
+            if libro != diario:
+                violacion('diario_no_reproduce', folio, f"{campo}: libro '{libro}', diario '{diario}'")
+    return violaciones
+
+
+# --- REPORTE ---
+def _percentiles(tiempos):
+    p50, p95, p99 = np.percentile(tiempos, [50, 95, 99])
+    return {'p50_ms': round(float(p50), 2), 'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2), 'max_ms': round(max(tiempos), 2)}
+
+
+def resumir(sesiones, duracion):
+    por_op = {}
+    errores = Counter()
+    for s in sesiones:
+        for op, tiempos in s['latencias'].items():
+            por_op.setdefault(op, []).extend(tiempos)
+        errores.update(s['errores'])
+    total = sum(len(t) for t in por_op.values())
+    filas = []
+    for op in sorted(set(por_op) | set(errores)):
+        tiempos = por_op.get(op, [])
+        fila = {'operacion': op, 'n': len(tiempos), 'errores': errores.get(op, 0),
+                'ops_por_s': round(len(tiempos) / duracion, 2) if duracion else 0.0}
+        if tiempos:
+            fila.update(_percentiles(tiempos))
+        filas.append(fila)
+    todos = [t for tiempos in por_op.values() for t in tiempos]
+    return {
+        'duracion_s': round(duracion, 3),
+        'operaciones': total,
+        'errores': sum(errores.values()),
+        'ops_por_s': round(total / duracion, 2) if duracion else 0.0,
+        **(_percentiles(todos) if todos else {}),
+        'por_operacion': filas,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga con sesiones simultáneas del personal.")
+    parser.add_argument('--base', help="Libro a copiar (por defecto se genera uno sintético).")
+    parser.add_argument('--personas', type=int, default=1000, help="Filas de la base sintética.")
+    parser.add_argument('--procesos', type=int, default=2)
+    parser.add_argument('--hilos', type=int, default=3, help="Sesiones por proceso.")
+    parser.add_argument('--operaciones', type=int, default=30, help="Operaciones por sesión.")
+    parser.add_argument('--pausa', type=float, default=0.0, help="Pausa media entre operaciones (s).")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto stdout).")
+    args = parser.parse_args(argv)
+
+    import albergue
+    from albergue import almacen, cifrado
+
+    # La clave (si hay) llega a los procesos de carga como argumento, no por el entorno
+    clave = os.environ.pop(cifrado.VARIABLE_CLAVE, None)
+
+    with tempfile.TemporaryDirectory(prefix='carga_albergue_') as dir_trabajo:
+        db = os.path.join(dir_trabajo, 'datos_carga.xlsx')
+        if args.base:
+            shutil.copyfile(args.base, db)
+        else:
+            escribir_base(db, args.personas, semilla=args.semilla)
+        # El diario (instantánea inicial) se crea antes de arrancar la carga
+        albergue.configurar(db)
+        almacen.obtener_diario()
+
+        contexto = multiprocessing.get_context('spawn')
+        with contexto.Manager() as manager, \
+                ProcessPoolExecutor(max_workers=args.procesos, mp_context=contexto) as pool:
+            barrera = manager.Barrier(args.procesos + 1)
+            futuros = [pool.submit(ejecutar_proceso, db, i, args.hilos, args.operaciones, args.semilla, args.pausa,
+                                   barrera, clave)
+                       for i in range(args.procesos)]
+            barrera.wait()
+            inicio = time.time()
+            resultados = [f.result() for f in futuros]
+        fin = max(t for _, t in resultados)
+        sesiones = [s for lote, _ in resultados for s in lote]
+
+        violaciones = verificar(db, sesiones)
+
+    reporte = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'base': args.base or f"sintética ({args.personas} personas)",
+        'procesos': args.procesos,
+        'hilos_por_proceso': args.hilos,
+        'operaciones_por_sesion': args.operaciones,
+        'resumen': resumir(sesiones, fin - inicio),
+        'violaciones': dict(Counter(v['tipo'] for v in violaciones)),
+        'ejemplos_violaciones': violaciones[:MAX_EJEMPLOS],
+        'ejemplos_errores': [e for s in sesiones for e in s['ejemplos_error']][:MAX_EJEMPLOS],
+    }
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    else:
+        print(texto)
+    return 1 if violaciones else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+"""
+Generador de bases de datos sintéticas (Personas + Encuestas) con el mismo
+esquema que crea albergue.almacen, para pruebas de rendimiento.
+"""
+import glob
+import os
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from albergue.almacen import COLUMNAS_USUARIOS, COLUMNAS_PERSONAS, COLUMNAS_ENCUESTAS
+
+NACIONALIDADES = ["Mexicana", "Guatemalteca", "Hondureña", "Salvadoreña", "Nicaragüense", "Venezolana", "Cubana", "Haitiana", "Colombiana", "Ecuatoriana"]
+GENEROS = ["Masculino", "Femenino"]
+NOMBRES = ["Ana", "Luis", "María", "José", "Carmen", "Jorge", "Rosa", "Pedro", "Lucía", "Carlos"]
+APELLIDOS = ["López", "García", "Hernández", "Martínez", "Pérez", "Ramírez", "Cruz", "Flores"]
+ESTADOS_CIVILES = ["Soltero/a", "Casado/a", "Unión Libre", "Divorciado/a", "Viudo/a"]
+ESCOLARIDADES = ["Ninguna", "Primaria", "Secundaria", "Preparatoria/Bachillerato", "Universidad", "Posgrado"]
+ESTADOS_MIGRATORIOS = ["Irregular", "Solicitante", "TURH", "En Tránsito", "Retorno voluntario", "Refugiado"]
+
+
+def _persona(rnd, folio, tipo, tutor, fecha_ingreso, num_acomp, hoy, menor=False):
+    edad = rnd.randint(1, 17) if menor else rnd.randint(18, 70)
+    fecha_nac = hoy - timedelta(days=edad * 365 + rnd.randint(0, 364))
+    return {
+        'folio': folio,
+        'nombre': f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+        'identificacion': str(rnd.randint(10**7, 10**8 - 1)),
+        'edad': edad,
+        'fecha_nacimiento': fecha_nac.strftime("%Y-%m-%d"),
+        'nacionalidad': rnd.choice(NACIONALIDADES),
+        'genero': rnd.choice(GENEROS),
+        'tipo': tipo,
+        'tutor_folio': tutor,
+        'fecha_ingreso': fecha_ingreso.strftime("%Y-%m-%d %H:%M:%S"),
+        'num_acompanantes': num_acomp,
+        'fecha_salida': '',
+        'motivo_salida': '',
+    }
+
+
+def generar_personas(n_filas, semilla=0, prop_salidas=0.6, dias_historia=730):
+    """
+    Genera aprox. n_filas personas agrupadas en familias (Titular + Acompañantes).
+    Algunos titulares dejan cupos libres para poder generar nuevos acompañantes.
+    Las salidas se aplican por grupo familiar, igual que en la pestaña de Bajas.
+    """
+    rnd = random.Random(semilla)
+    hoy = datetime.now()
+    inicio = hoy - timedelta(days=dias_historia)
+    filas = []
+    num_titular = 1001
+    while len(filas) < n_filas:
+        ingreso = inicio + timedelta(seconds=rnd.randint(0, dias_historia * 86400))
+        limite = rnd.choice([0, 0, 0, 1, 2, 3, 4])
+        # Cupos ocupados: a veces menos que el límite
+        ocupados = rnd.randint(0, limite)
+        folio = str(num_titular)
+        grupo = [_persona(rnd, folio, 'Titular', '', ingreso, limite, hoy)]
+        for i in range(ocupados):
+            grupo.append(_persona(rnd, f"{folio}-{chr(65 + i)}", 'Acompañante', folio, ingreso, 0, hoy,
+                                  menor=rnd.random() < 0.6))
+        if rnd.random() < prop_salidas:
+            salida = ingreso + timedelta(days=rnd.randint(1, 90))
+            if salida < hoy:
+                for p in grupo:
+                    p['fecha_salida'] = salida.strftime("%Y-%m-%d %H:%M:%S")
+                    p['motivo_salida'] = "Continúa su trayecto"
+        filas.extend(grupo)
+        num_titular += 1
+    return pd.DataFrame(filas[:n_filas], columns=COLUMNAS_PERSONAS)
+
+
+def generar_encuestas(df_personas, semilla=0, prop_encuestas=0.7):
+    """Genera una encuesta para una fracción de las personas registradas."""
+    rnd = random.Random(semilla + 1)
+    filas = []
+    for folio in df_personas['folio']:
+        if rnd.random() >= prop_encuestas:
+            continue
+        filas.append({
+            'folio_persona': folio,
+            'estado_civil': rnd.choice(ESTADOS_CIVILES),
+            'escolaridad': rnd.choice(ESCOLARIDADES),
+            'ocupacion': rnd.choice(["Albañil", "Comerciante", "Hogar", "Estudiante", ""]),
+            'enfermedad_cronica': rnd.choice(["Ninguna", "Diabetes", "Hipertensión"]),
+            'estado_migratorio': rnd.choice(ESTADOS_MIGRATORIOS),
+            'motivo_salida': rnd.choice(["Violencia", "Económico", "Reunificación familiar"]),
+            'destino': rnd.choice(["Estados Unidos", "Monterrey", "CDMX", "Tijuana"]),
+            'redes_apoyo': 'N/A',
+            'observaciones': 'N/A',
+        })
+    return pd.DataFrame(filas, columns=COLUMNAS_ENCUESTAS)
+
+
+def escribir_base(ruta, n_filas, semilla=0):
+    """
+    Escribe un datos_albergue.xlsx sintético en ruta y devuelve el DataFrame de
+    Personas. Borra el diario de escritura de un libro anterior en la misma ruta.
+    """
+    for diario_previo in glob.glob(glob.escape(os.path.splitext(ruta)[0]) + '.diario*.jsonl'):
+        os.remove(diario_previo)
+    df_personas = generar_personas(n_filas, semilla=semilla)
+    df_encuestas = generar_encuestas(df_personas, semilla=semilla)
+    with pd.ExcelWriter(ruta) as writer:
+        pd.DataFrame(columns=COLUMNAS_USUARIOS).to_excel(writer, sheet_name='Usuarios', index=False)
+        df_personas.to_excel(writer, sheet_name='Personas', index=False)
+        df_encuestas.to_excel(writer, sheet_name='Encuestas', index=False)
+    return df_personas
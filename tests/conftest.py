@@ -0,0 +1,23 @@
+import pytest
+
+import albergue
+from albergue import almacen
+
+
+@pytest.fixture
+def base(tmp_path):
+    """Libro vacío en un directorio temporal (con su diario)."""
+    ruta = str(tmp_path / 'datos.xlsx')
+    albergue.configurar(ruta)
+    almacen.inicializar_base()
+    return ruta
+
+
+def persona(folio, nombre, **campos):
+    registro = {
+        'folio': folio, 'nombre': nombre, 'identificacion': '', 'edad': 30, 'fecha_nacimiento': '1995-01-01',
+        'nacionalidad': '', 'genero': '', 'tipo': 'Titular', 'tutor_folio': '',
+        'fecha_ingreso': '2026-10-01 10:00:00', 'num_acompanantes': 0, 'fecha_salida': '', 'motivo_salida': '',
+    }
+    registro.update(campos)
+    return registro
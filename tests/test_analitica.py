@@ -0,0 +1,62 @@
+import pytest
+
+import albergue
+from albergue import analitica, artefactos
+
+from conftest import persona
+
+
+@pytest.fixture
+def poblacion(base):
+    albergue.guardar_persona(persona('1001', 'A', nacionalidad='Hondureña', genero='Femenino',
+                                     fecha_ingreso='2026-08-05 10:00:00'))
+    albergue.guardar_persona(persona('1002', 'B', nacionalidad='hondurena ', genero='Masculino',
+                                     fecha_ingreso='2026-09-01 10:00:00'))
+    albergue.guardar_persona(persona('1002-A', 'C', nacionalidad='Hondureña', genero='Masculino', tipo='Acompañante',
+                                     tutor_folio='1002', edad=9, fecha_nacimiento='2017-03-01',
+                                     fecha_ingreso='2026-09-01 10:00:00'))
+    albergue.guardar_persona(persona('1003', 'D', nacionalidad='Mexicana', genero='Femenino',
+                                     fecha_ingreso='2026-09-02 10:00:00',
+                                     fecha_salida='2026-09-20 10:00:00', motivo_salida='Traslado'))
+    albergue.guardar_encuesta({'folio_persona': '1001', 'estado_migratorio': 'Solicitante'})
+    return base
+
+
+def _como_dict(tabla, dimension):
+    return dict(zip(tabla[dimension], tabla['personas']))
+
+
+def test_conteos_por_poblacion_y_variantes_canonicas(poblacion):
+    assert _como_dict(analitica.conteos(['nacionalidad']), 'nacionalidad') == {'Hondureña': 3, 'Mexicana': 1}
+    assert _como_dict(analitica.conteos(['nacionalidad'], poblacion=analitica.ACTIVOS), 'nacionalidad') == {'Hondureña': 3}
+    assert _como_dict(analitica.conteos(['genero'], poblacion=analitica.SALIDAS), 'genero') == {'Femenino': 1}
+    assert _como_dict(analitica.conteos(['menor']), 'menor') == {'No': 3, 'Sí': 1}
+    assert _como_dict(analitica.conteos(['estado_migratorio']), 'estado_migratorio') == {
+        analitica.SIN_REGISTRO: 3, 'Solicitante': 1}
+    del_mes = analitica.conteos([], {'mes_ingreso': ['2026-09']})
+    assert del_mes['personas'].tolist() == [3]
+    with pytest.raises(ValueError):
+        analitica.conteos(['no_existe'])
+
+
+def test_pivote_con_totales(poblacion):
+    tabla = analitica.pivote(['nacionalidad'], 'genero')
+    assert tabla.loc['Hondureña', 'Masculino'] == 2 and tabla.loc['Hondureña', 'Femenino'] == 1
+    assert tabla.loc['Mexicana', 'Masculino'] == 0
+    assert tabla['Total'].tolist() == [3, 1]
+
+
+def test_resultados_en_cache_hasta_que_cambian_los_datos(poblacion):
+    analitica.conteos(['genero'])
+    aciertos = artefactos.cache.estadisticas()['aciertos']
+    analitica.conteos(['genero'])
+    assert artefactos.cache.estadisticas()['aciertos'] == aciertos + 1
+
+    albergue.guardar_persona(persona('1004', 'E', genero='Femenino'))
+    assert _como_dict(analitica.conteos(['genero']), 'genero') == {'Femenino': 3, 'Masculino': 2}
+
+
+def test_movimientos_por_dia_y_mes(poblacion):
+    diario, mensual = analitica.movimientos()
+    assert int(diario['Altas'].sum()) == 4 and int(diario['Bajas'].sum()) == 1
+    assert mensual.loc['2026-09'].tolist() == [3, 1] and mensual.loc['2026-08'].tolist() == [1, 0]
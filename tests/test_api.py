@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from albergue import api
+
+TOKEN = 'secreto-de-prueba'
+
+
+@pytest.fixture
+def servidor(base):
+    srv = api.crear_servidor('127.0.0.1', 0, token=TOKEN)
+    hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+    hilo.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def pedir(url, metodo='GET', datos=None, token=TOKEN):
+    cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else None
+    peticion = urllib.request.Request(url, data=cuerpo, method=metodo)
+    peticion.add_header('Content-Type', 'application/json')
+    if token:
+        peticion.add_header('Authorization', f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(peticion) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_sin_token_no_arranca(monkeypatch):
+    monkeypatch.delenv(api.VARIABLE_TOKEN, raising=False)
+    with pytest.raises(ValueError):
+        api.crear_servidor('127.0.0.1', 0)
+
+
+def test_peticiones_sin_token_o_con_token_incorrecto_reciben_401(servidor):
+    assert pedir(f"{servidor}/ocupacion", token=None)[0] == 401
+    assert pedir(f"{servidor}/ocupacion", token='otro')[0] == 401
+    assert pedir(f"{servidor}/personas", 'POST', {'nombre': 'Ana'}, token=None)[0] == 401
+    estado, datos = pedir(f"{servidor}/ocupacion")
+    assert estado == 200 and datos['activos'] == 0
+
+
+def test_ingreso_rechaza_campos_fuera_de_la_lista(servidor):
+    estado, datos = pedir(f"{servidor}/personas", 'POST', {'nombre': 'Ana', 'fecha_salida': '2026-01-01'})
+    assert estado == 400 and 'fecha_salida' in datos['error']
+    estado, _ = pedir(f"{servidor}/personas", 'POST', {'nombre': 'Ana', 'folio': 'X-1'})
+    assert estado == 400
+
+    estado, registro = pedir(f"{servidor}/personas", 'POST', {'nombre': 'Ana', 'edad': 30})
+    assert estado == 201 and registro['fecha_salida'] == ''
+    assert pedir(f"{servidor}/ocupacion")[1]['activos'] == 1
+
+
+def test_encuesta_exige_folio_existente_y_campos_conocidos(servidor):
+    assert pedir(f"{servidor}/encuestas/NOEXISTE", 'PUT', {'escolaridad': 'Primaria'})[0] == 404
+
+    folio = pedir(f"{servidor}/personas", 'POST', {'nombre': 'Ana'})[1]['folio']
+    estado, datos = pedir(f"{servidor}/encuestas/{folio}", 'PUT', {'escolaridad': 'Primaria', 'clave': 'x'})
+    assert estado == 400 and 'clave' in datos['error']
+
+    estado, encuesta = pedir(f"{servidor}/encuestas/{folio}", 'PUT', {'escolaridad': 'Primaria'})
+    assert estado == 200 and encuesta['folio_persona'] == folio
+    assert pedir(f"{servidor}/personas/{folio}")[1]['encuesta']['escolaridad'] == 'Primaria'
+
+
+def test_espera_de_cambios_despierta_con_escrituras_de_otro_proceso(servidor, base):
+    version = pedir(f"{servidor}/cambios?desde=0")[1]['version']
+    codigo = (f"import sys, albergue; sys.path.insert(0, {os.path.dirname(__file__)!r}); from conftest import persona; "
+              f"albergue.configurar({base!r}); albergue.guardar_persona(persona('2001', 'Otro proceso'))")
+    escritor = threading.Timer(0.5, lambda: subprocess.run([sys.executable, '-c', codigo], check=True))
+    escritor.start()
+    inicio = time.monotonic()
+    estado, datos = pedir(f"{servidor}/cambios?desde={version}&espera=20")
+    transcurrido = time.monotonic() - inicio
+    escritor.join()
+    assert estado == 200
+    assert [e['tipo'] for e in datos['eventos']] == ['externo']
+    assert transcurrido < 15
+
+
+def test_consulta_y_movimientos(servidor):
+    assert pedir(f"{servidor}/personas/NOEXISTE")[0] == 404
+    folio = pedir(f"{servidor}/personas", 'POST', {'nombre': 'Ana', 'nacionalidad': 'hondurena'})[1]['folio']
+    estado, datos = pedir(f"{servidor}/personas/{folio}")
+    assert estado == 200 and datos['nombre'] == 'Ana' and datos['nacionalidad'] == 'Hondureña'
+    assert datos['encuesta'] is None
+
+    for periodo in ('diario', 'mensual'):
+        filas = pedir(f"{servidor}/movimientos?periodo={periodo}")[1]
+        assert sum(f['altas'] for f in filas) == 1 and sum(f['bajas'] for f in filas) == 0
+    pedir(f"{servidor}/bajas", 'POST', {'folio': folio, 'motivo': 'Traslado'})
+    filas = pedir(f"{servidor}/movimientos")[1]
+    assert sum(f['bajas'] for f in filas) == 1
@@ -0,0 +1,56 @@
+import time
+
+import albergue
+from albergue import artefactos
+from albergue.artefactos import CacheArtefactos
+
+from conftest import persona
+
+
+def test_limite_en_bytes_desaloja_el_menos_usado(base):
+    cache = CacheArtefactos(max_bytes=100, ttl=60)
+    cache.obtener(('pdf', 1), lambda: b'x' * 40)
+    cache.obtener(('pdf', 2), lambda: b'x' * 40)
+    cache.obtener(('pdf', 1), lambda: b'no se genera')  # 1 pasa a ser el más reciente
+    cache.obtener(('pdf', 3), lambda: b'x' * 40)
+
+    stats = cache.estadisticas()
+    assert (stats['entradas'], stats['bytes'], stats['desalojos'], stats['aciertos']) == (2, 80, 1, 1)
+    assert cache.obtener(('pdf', 1), lambda: b'otro') == b'x' * 40
+    assert cache.obtener(('pdf', 2), lambda: b'y' * 40) == b'y' * 40  # fue desalojado: se regenera
+
+    # Lo que no cabe en el límite se devuelve pero no se guarda
+    assert cache.obtener(('grande',), lambda: b'x' * 101) == b'x' * 101
+    assert cache.estadisticas()['entradas'] == 2
+    cache.configurar(max_bytes=40)
+    assert cache.estadisticas()['bytes'] <= 40
+
+
+def test_ttl_vence_entradas(base):
+    cache = CacheArtefactos(max_bytes=1000, ttl=0.05)
+    generados = []
+    generar = lambda: generados.append(1) or b'pdf'
+    cache.obtener(('reglamento',), generar, por_version=False)
+    cache.obtener(('reglamento',), generar, por_version=False)
+    time.sleep(0.1)
+    cache.obtener(('reglamento',), generar, por_version=False)
+    assert len(generados) == 2
+    assert cache.estadisticas()['vencidos'] == 1
+    assert [f['tipo'] for f in cache.estadisticas_por_tipo()] == ['reglamento']
+
+
+def test_escribir_datos_invalida_solo_lo_ligado_a_la_version(base):
+    cache = CacheArtefactos(max_bytes=1000, ttl=60)
+    cache.obtener(('movimientos',), lambda: b'v1')
+    cache.obtener(('reglamento', 'Ana'), lambda: b'fijo', por_version=False)
+    albergue.guardar_persona(persona('1001', 'Ana'))
+
+    assert cache.obtener(('movimientos',), lambda: b'v2') == b'v2'
+    assert cache.obtener(('reglamento', 'Ana'), lambda: b'otro', por_version=False) == b'fijo'
+    assert cache.estadisticas()['invalidados'] == 1
+
+
+def test_tamano_de_valores():
+    assert artefactos.tamano(b'abc') == 3
+    assert artefactos.tamano('ñ') == 2
+    assert artefactos.tamano((b'ab', b'cd')) > 4
@@ -0,0 +1,35 @@
+import albergue
+from albergue import catalogos, eventos
+
+from conftest import persona
+
+
+def test_variantes_de_escritura_comparten_canonico(base):
+    for i, escritura in enumerate(['Peruana', 'peruana ', 'PERUANA', 'Boliviana']):
+        albergue.guardar_persona(persona(str(1001 + i), f"P{i}", nacionalidad=escritura))
+    catalogo = catalogos.obtener('nacionalidad')
+    assert catalogo.canonico('  perúana') == 'Peruana'
+    assert catalogo.canonico('hondurena') == 'Hondureña'
+    assert catalogo.canonico('') == ''
+    assert catalogo.indice('Hondureña') == catalogo.opciones().index('Hondureña')
+    assert catalogo.opciones()[catalogo.indice('Boliviana')] == catalogos.OTROS
+    assert catalogo.indice('') is None
+
+
+def test_escrituras_propias_no_reaprenden_de_la_tabla(base, monkeypatch):
+    albergue.registrar_ingreso({'nombre': 'Ana', 'nacionalidad': 'Hondureña'})
+    catalogo = catalogos.obtener('nacionalidad')
+    lecturas = []
+    original = catalogos.Catalogo.aprender
+    monkeypatch.setattr(catalogos.Catalogo, 'aprender', lambda self, v: (lecturas.append(self.campo), original(self, v)))
+
+    registro = albergue.registrar_ingreso({'nombre': 'Beto', 'nacionalidad': 'PARAGUAYA '})
+    assert registro['nacionalidad'] == 'Paraguaya'
+    assert albergue.actualizar_persona({'folio': registro['folio'], 'nombre': 'Beto B.', 'nacionalidad': 'paraguaya'})
+    assert catalogo.canonico('paraguaya') == 'Paraguaya'
+    assert lecturas == []
+
+    # Un cambio hecho por otro proceso sí obliga a releer la hoja
+    eventos.feed.publicar(eventos.EXTERNO)
+    assert catalogos.obtener('nacionalidad').canonico('PARAGUAYA') == 'Paraguaya'
+    assert 'nacionalidad' in lecturas
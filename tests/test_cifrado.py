@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+import albergue
+from albergue import almacen, cifrado, residentes
+
+
+@pytest.fixture
+def clave():
+    cifrado.configurar(cifrado.generar_clave())
+    yield
+    cifrado.configurar(None)
+
+
+def test_libro_y_diario_cifrados_en_disco(base, clave):
+    albergue.registrar_ingreso({'nombre': 'Nombre Confidencial', 'identificacion': 'ID-777'})
+    with open(base, 'rb') as f:
+        assert f.read(len(cifrado.MAGIA)) == cifrado.MAGIA
+    with open(almacen.ruta_diario(), 'rb') as f:
+        assert b'Confidencial' not in f.read()
+
+    almacen.configurar(base)
+    assert list(albergue.cargar_datos()['nombre']) == ['Nombre Confidencial']
+
+    cifrado.configurar(cifrado.generar_clave())
+    almacen.configurar(base)
+    with pytest.raises(cifrado.ErrorCifrado):
+        albergue.cargar_datos()
+
+
+def test_flujo_por_bloques_ida_y_vuelta(clave, tmp_path):
+    import io
+
+    datos = bytes(range(256)) * 5000
+    cifrado_ = io.BytesIO()
+    cifrado.cifrar_flujo(io.BytesIO(datos), cifrado_, bloque=4096)
+    cifrado_.seek(0)
+    assert b''.join(cifrado.bloques_descifrados(cifrado_)) == datos
+
+    truncado = io.BytesIO(cifrado_.getvalue()[:-(4096 + 16)])
+    with pytest.raises(cifrado.ErrorCifrado):
+        b''.join(cifrado.bloques_descifrados(truncado))
+
+
+def test_datos_descifrados_se_olvidan_tras_inactividad(base, clave, monkeypatch):
+    monkeypatch.setattr(almacen, 'TTL_DESCIFRADO', 1)
+    albergue.registrar_ingreso({'nombre': 'Secreto'})
+    albergue.registrar_ingreso({'nombre': 'Otro'})
+    assert len(residentes.registro_activos.sincronizar()) == 2
+    assert almacen._descifrado is not None
+
+    limite = time.monotonic() + 10
+    while time.monotonic() < limite and (almacen._descifrado is not None or len(residentes.registro_activos)):
+        time.sleep(0.2)
+    assert almacen._descifrado is None
+    assert len(residentes.registro_activos) == 0
+    assert not almacen._cache
+    # Se vuelven a descifrar al leer
+    assert len(residentes.registro_activos.sincronizar()) == 2
@@ -0,0 +1,68 @@
+import os
+
+import pandas as pd
+import pytest
+
+import albergue
+from albergue import almacen, cifrado, diario
+
+from conftest import persona
+
+
+def test_linea_danada_en_medio_lanza_diario_danado(base):
+    for i in range(3):
+        albergue.guardar_persona(persona(str(1001 + i), f"Persona {i}"))
+    ruta = almacen.ruta_diario()
+    with open(ruta, encoding='utf-8') as f:
+        lineas = f.readlines()
+    assert len(lineas) == 4
+    lineas[1] = lineas[1][:len(lineas[1]) // 2] + "\n"
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.writelines(lineas)
+
+    os.remove(base)
+    almacen.configurar(base)
+    with pytest.raises(diario.DiarioDanado):
+        almacen.recuperar()
+
+
+def test_ultima_linea_incompleta_se_descarta(base):
+    for i in range(2):
+        albergue.guardar_persona(persona(str(1001 + i), f"Persona {i}"))
+    with open(almacen.ruta_diario(), 'a', encoding='utf-8') as f:
+        f.write('{"seq": 99, "marca"')
+
+    os.remove(base)
+    almacen.configurar(base)
+    almacen.recuperar()
+    assert list(albergue.cargar_datos()['nombre']) == ['Persona 0', 'Persona 1']
+
+
+def _personas(ruta):
+    return pd.read_excel(cifrado.abrir(ruta), sheet_name='Personas')
+
+
+def test_recuperar_rehace_el_libro_borrado(base):
+    for i in range(3):
+        albergue.guardar_persona(persona(str(1001 + i), f"Persona {i}"))
+    albergue.actualizar_persona({'folio': '1002', 'nombre': 'Persona Editada'})
+    albergue.procesar_baja(['1003'], 'Salida')
+
+    os.remove(base)
+    almacen.configurar(base)
+    assert almacen.recuperar() == 6
+    df = _personas(base)
+    assert list(df['nombre']) == ['Persona 0', 'Persona Editada', 'Persona 2']
+    assert list(df['motivo_salida'].fillna('')) == ['', '', 'Salida']
+
+
+def test_restaurar_a_una_fecha(base, tmp_path):
+    albergue.guardar_persona(persona('1001', 'Antes'))
+    marca = list(almacen.obtener_diario().entradas())[-1].marca
+    albergue.actualizar_persona({'folio': '1001', 'nombre': 'Después'})
+    albergue.guardar_persona(persona('1002', 'Posterior'))
+
+    destino = str(tmp_path / 'restaurado.xlsx')
+    assert almacen.restaurar(destino, hasta=marca) == 2
+    assert list(_personas(destino)['nombre']) == ['Antes']
+    assert list(albergue.cargar_datos()['nombre']) == ['Después', 'Posterior']
@@ -0,0 +1,21 @@
+from datetime import date
+
+import albergue
+from albergue import edades
+
+from conftest import persona
+
+
+def test_desde_nacimiento():
+    assert edades.desde_nacimiento('2000-06-15', hoy=date(2026, 6, 14)) == 25
+    assert edades.desde_nacimiento('2000-06-15', hoy=date(2026, 6, 15)) == 26
+    assert edades.desde_nacimiento('', hoy=date(2026, 6, 15)) is None
+    assert edades.desde_nacimiento('no es fecha') is None
+
+
+def test_edad_capturada_solo_sin_fecha_de_nacimiento(base):
+    albergue.guardar_persona(persona('1001', 'Con fecha', edad=99, fecha_nacimiento='1995-01-01'))
+    albergue.guardar_persona(persona('1002', 'Sin fecha', edad=40, fecha_nacimiento=''))
+    assert edades.edad_de('1001') == edades.desde_nacimiento('1995-01-01')
+    assert albergue.actualizar_persona({'folio': '1002', 'edad': 41})
+    assert edades.edad_de('1002') == 41
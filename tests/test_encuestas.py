@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+import albergue
+from albergue import almacen, cifrado, diario
+
+from conftest import persona
+
+
+def encuesta(folio, ocupacion):
+    return {'folio_persona': folio, 'estado_civil': 'Soltero/a', 'escolaridad': 'Primaria', 'ocupacion': ocupacion,
+            'enfermedad_cronica': 'Ninguna', 'estado_migratorio': 'Solicitante', 'motivo_salida': '',
+            'destino': '', 'redes_apoyo': 'N/A', 'observaciones': 'N/A'}
+
+
+def test_guardar_y_reemplazar_encuesta(base):
+    albergue.guardar_persona(persona('1001', 'Ana'))
+    albergue.guardar_encuesta(encuesta('1001', 'Cocina'))
+    albergue.guardar_encuesta(encuesta('1001', 'Costura'))
+    assert albergue.obtener_encuesta('1001')['ocupacion'] == 'Costura'
+    assert len(albergue.cargar_encuestas()) == 1
+    assert albergue.obtener_encuesta('9999') is None
+
+
+def test_diario_danado_no_borra_las_encuestas(base):
+    for i in range(3):
+        folio = str(1001 + i)
+        albergue.guardar_persona(persona(folio, f"Persona {i}"))
+        albergue.guardar_encuesta(encuesta(folio, f"Oficio {i}"))
+    ruta = almacen.ruta_diario()
+    with open(ruta, encoding='utf-8') as f:
+        lineas = f.readlines()
+    lineas[1] = lineas[1][:len(lineas[1]) // 2] + "\n"
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.writelines(lineas)
+    antes = pd.read_excel(cifrado.abrir(base), sheet_name='Encuestas')
+
+    almacen.configurar(base)  # sin cachés: la hoja se vuelve a leer con el diario
+    with pytest.raises(diario.DiarioDanado):
+        albergue.obtener_encuesta('1001')
+    with pytest.raises(diario.DiarioDanado):
+        albergue.guardar_encuesta(encuesta('1003', 'Nuevo'))
+    despues = pd.read_excel(cifrado.abrir(base), sheet_name='Encuestas')
+    assert len(antes) == len(despues) == 3
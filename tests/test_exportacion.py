@@ -0,0 +1,17 @@
+import albergue
+from albergue import exportacion
+
+from conftest import persona
+
+
+def test_firmas_incluyen_adultos_del_mes_aunque_ya_salieron(base):
+    albergue.guardar_persona(persona('1001', 'Sigue', fecha_ingreso='2026-09-03 10:00:00'))
+    albergue.guardar_persona(persona('1002', 'Ya salió', fecha_ingreso='2026-09-10 10:00:00',
+                                     fecha_salida='2026-09-20 09:00:00', motivo_salida='Traslado'))
+    albergue.guardar_persona(persona('1002-A', 'Menor', tipo='Acompañante', tutor_folio='1002', edad=8,
+                                     fecha_nacimiento='2018-05-01', fecha_ingreso='2026-09-10 10:00:00'))
+    albergue.guardar_persona(persona('1003', 'Otro mes', fecha_ingreso='2026-08-28 10:00:00'))
+
+    firmantes = exportacion.firmantes_reglamento('2026-09')
+    assert list(firmantes['folio']) == ['1001', '1002']
+    assert list(firmantes['nombre']) == ['Sigue', 'Ya salió']
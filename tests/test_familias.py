@@ -0,0 +1,64 @@
+import pytest
+
+import albergue
+from albergue import almacen, familias
+from albergue.familias import grafo_familiar
+
+
+def test_letras_de_acompanantes():
+    assert [familias.letra(i) for i in (0, 1, 25, 26, 27, 701, 702)] == ['A', 'B', 'Z', 'AA', 'AB', 'ZZ', 'AAA']
+    for i in (0, 25, 26, 701, 702):
+        assert familias.indice_letra(f"1001-{familias.letra(i)}", '1001') == i
+    assert familias.indice_letra('1001-a', '1001') is None
+    assert familias.indice_letra('1002-A', '1001') is None
+    assert familias.indice_letra('1001', '1001') is None
+
+
+def _titular(limite):
+    return albergue.registrar_ingreso({'nombre': 'Titular', 'num_acompanantes': limite})['folio']
+
+
+def _acompanante(tutor):
+    return albergue.registrar_ingreso({'nombre': 'Acompañante'}, es_acompanante=True, folio_tutor=tutor)['folio']
+
+
+def test_limite_de_acompanantes_y_letras_no_reutilizadas(base):
+    titular = _titular(2)
+    assert [_acompanante(titular), _acompanante(titular)] == [f"{titular}-A", f"{titular}-B"]
+    with pytest.raises(ValueError, match='límite'):
+        _acompanante(titular)
+    with pytest.raises(ValueError, match='No existe'):
+        _acompanante('9999')
+
+    # Quien sale libera su lugar, pero su letra no se vuelve a asignar
+    albergue.procesar_baja([f"{titular}-A"], 'Salida')
+    assert _acompanante(titular) == f"{titular}-C"
+    estado = grafo_familiar.sincronizar().estado(titular)
+    assert (estado.limite, estado.restantes, estado.siguiente_letra) == (2, 0, 'D')
+    assert estado.activos == [f"{titular}-B", f"{titular}-C"] and estado.inactivos == [f"{titular}-A"]
+
+
+def test_grafo_reconstruido_desde_la_hoja_coincide(base):
+    titular = _titular(3)
+    for _ in range(3):
+        _acompanante(titular)
+    albergue.procesar_baja([f"{titular}-B"], 'Salida')
+    en_memoria = grafo_familiar.sincronizar().estado(titular)
+
+    almacen.configurar(base)  # como otro proceso: el grafo se rearma desde Personas
+    reconstruido = grafo_familiar.sincronizar().estado(titular)
+    assert reconstruido == en_memoria
+    assert reconstruido.inactivos == [f"{titular}-B"] and reconstruido.siguiente_letra == 'D'
+
+
+def test_baja_del_titular_incluye_solo_acompanantes_activos(base):
+    titular, otro = _titular(2), _titular(1)
+    a, b = _acompanante(titular), _acompanante(titular)
+    c = _acompanante(otro)
+    albergue.procesar_baja([a], 'Salida')
+    assert albergue.baja_grupo_familiar(titular, 'Traslado') == [titular, b]
+    assert not grafo_familiar.sincronizar().es_titular_activo(titular)
+    assert grafo_familiar.es_titular_activo(otro)
+    assert grafo_familiar.acompanantes_activos(otro) == [c]
+    # Un acompañante sale solo
+    assert albergue.baja_grupo_familiar(c, 'Salida') == [c]
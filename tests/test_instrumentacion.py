@@ -0,0 +1,27 @@
+import json
+import os
+
+from albergue import instrumentacion
+
+
+def test_log_por_rerun_junto_al_libro(base, monkeypatch):
+    monkeypatch.setattr(instrumentacion, 'LOG_FILE', '')
+    ruta = os.path.join(os.path.dirname(base), instrumentacion.LOG_POR_OMISION)
+    assert instrumentacion.ruta_log() == ruta
+
+    instrumentacion.activar_log(False)
+    instrumentacion.iniciar_rerun('Admin')
+    instrumentacion.finalizar_rerun()
+    assert not os.path.exists(ruta)
+
+    instrumentacion.activar_log(True)
+    try:
+        instrumentacion.iniciar_rerun('Admin')
+        with instrumentacion.medir('consulta'):
+            pass
+        instrumentacion.finalizar_rerun()
+    finally:
+        instrumentacion.activar_log(False)
+    with open(ruta, encoding='utf-8') as f:
+        registro = json.loads(f.readline())
+    assert registro['rol'] == 'Admin' and [s['operacion'] for s in registro['spans']] == ['consulta']
@@ -0,0 +1,59 @@
+import albergue
+from albergue import almacen
+
+from conftest import persona
+
+
+def folios():
+    return [albergue.normalize_id(f) for f in albergue.cargar_datos()['folio']]
+
+
+def test_guardar_persona_no_duplica_la_alta(base):
+    for i in range(3):
+        albergue.guardar_persona(persona(str(1001 + i), f"Persona {i}"))
+    assert folios() == ['1001', '1002', '1003']
+
+
+def test_registrar_ingreso_sin_catalogos_no_duplica(base):
+    datos = {'nombre': 'Sin Catálogo', 'identificacion': '', 'edad': 30, 'fecha_nacimiento': '',
+             'nacionalidad': '', 'genero': '', 'num_acompanantes': 0}
+    albergue.registrar_ingreso(dict(datos))
+    albergue.registrar_ingreso(dict(datos))
+    assert folios() == ['1001', '1002']
+    almacen.invalidar_cache()
+    assert folios() == ['1001', '1002']
+
+
+def test_alta_edicion_baja_y_relectura_en_frio(base):
+    titular = albergue.registrar_ingreso({'nombre': 'Titular', 'nacionalidad': 'Mexicana', 'genero': 'Femenino',
+                                          'num_acompanantes': 1})
+    acompanante = albergue.registrar_ingreso({'nombre': 'Hija'}, es_acompanante=True, folio_tutor=titular['folio'])
+    assert acompanante['folio'] == f"{titular['folio']}-A"
+    assert albergue.actualizar_persona({'folio': titular['folio'], 'identificacion': 'ABC123'})
+    assert albergue.baja_grupo_familiar(titular['folio'], 'Traslado') == [titular['folio'], acompanante['folio']]
+
+    almacen.configurar(base)  # otro proceso: sin cachés ni diario abierto
+    df = albergue.cargar_datos()
+    df.index = df['folio'].apply(albergue.normalize_id)
+    assert list(df.index) == [titular['folio'], acompanante['folio']]
+    assert albergue.normalize_id(df.at[titular['folio'], 'identificacion']) == 'ABC123'
+    assert set(df['motivo_salida']) == {'Traslado'}
+    assert albergue.filtrar_activos(df).empty
+
+
+def test_indice_de_folios_sigue_a_la_hoja_en_cache(base):
+    for i in range(3):
+        albergue.guardar_persona(persona(str(1001 + i), f"Persona {i}"))
+    with almacen.bloqueo:
+        indice = almacen.indice_folios()
+        assert indice == {'1001': 0, '1002': 1, '1003': 2}
+    assert albergue.actualizar_persona({'folio': '1002', 'nombre': 'Editada'})
+    assert not albergue.actualizar_persona({'folio': '9999', 'nombre': 'Nadie'})
+    with almacen.bloqueo:
+        # Las ediciones se aplican en sitio: mismo índice, misma hoja
+        assert almacen.indice_folios() is indice
+        assert almacen.vista_hoja('Personas').at[1, 'nombre'] == 'Editada'
+
+    albergue.guardar_persona(persona('1004', 'Nueva'))
+    with almacen.bloqueo:
+        assert almacen.indice_folios()['1004'] == 3
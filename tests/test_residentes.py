@@ -0,0 +1,19 @@
+import albergue
+from albergue import Residente
+
+from conftest import persona
+
+
+def test_cambios_solo_reporta_campos_distintos(base):
+    albergue.guardar_persona(persona('1001', 'Ana', nacionalidad='Hondureña', genero='Femenino',
+                                     identificacion='123', num_acompanantes=2))
+    r = albergue.obtener_activos().obtener('1001')
+    assert r.cambios({'nombre': ' Ana ', 'nacionalidad': 'hondurena', 'genero': 'FEMENINO',
+                      'identificacion': '123', 'num_acompanantes': '2', 'desconocido': 'x'}) == {}
+    assert r.cambios({'nombre': 'Ana María', 'num_acompanantes': 3, 'nacionalidad': 'Mexicana'}) == {
+        'nombre': ('Ana', 'Ana María'), 'num_acompanantes': (2, 3), 'nacionalidad': ('Hondureña', 'Mexicana')}
+
+
+def test_residente_normaliza_campos():
+    r = Residente(folio=1001.0, nombre='  Ana ', edad='31', num_acompanantes=None, tutor_folio=float('nan'))
+    assert (r.folio, r.nombre, r.edad, r.num_acompanantes, r.tutor_folio) == ('1001', 'Ana', 31, 0, '')
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+import albergue
+from albergue import suscripciones
+
+from conftest import persona
+
+
+def _dia(dias_atras):
+    return (date.today() - timedelta(days=dias_atras)).isoformat()
+
+
+def test_cada_envio_solo_lleva_los_movimientos_nuevos(base):
+    albergue.guardar_persona(persona('1001', 'A', fecha_ingreso=f"{_dia(3)} 10:00:00"))
+    albergue.guardar_persona(persona('1002', 'B', fecha_ingreso=f"{_dia(2)} 10:00:00",
+                                     fecha_salida=f"{_dia(1)} 09:00:00", motivo_salida='Traslado'))
+    lista = ['ana@example.org', ' Beto@example.org']
+
+    primero = suscripciones.preparar(lista)
+    assert primero.desde == suscripciones.INICIO and primero.cerrado == _dia(1)
+    assert len(primero.diario) == 3
+    assert suscripciones.suscripcion(lista) is None
+    suscripciones.registrar(primero)
+
+    albergue.guardar_persona(persona('1003', 'C', fecha_ingreso=f"{_dia(0)} 08:00:00"))
+    # La misma lista, escrita de otra forma
+    segundo = suscripciones.preparar(['beto@example.org', 'ANA@example.org'])
+    assert segundo.desde == _dia(0)
+    assert [d.isoformat() for d in segundo.diario.index] == [_dia(0)]
+    assert list(segundo.mensual.index) == [_dia(0)[:7]]
+    assert segundo.resumen['Altas del periodo'] == 1 and segundo.resumen['Altas acumuladas'] == 3
+    assert segundo.resumen['Bajas del periodo'] == 0 and segundo.resumen['Bajas acumuladas'] == 1
+    assert segundo.resumen['Personas activas'] == 2
+    assert suscripciones.pdf(segundo).startswith(b'%PDF')
+    suscripciones.registrar(segundo)
+    assert suscripciones.suscripcion(lista)['envios'] == 2
+
+    # Sin movimientos nuevos después del día en curso, salvo el propio día (no se da por cerrado)
+    assert [d.isoformat() for d in suscripciones.preparar(lista).diario.index] == [_dia(0)]
+    # Otra lista, o un envío completo, llevan todo el historial
+    assert len(suscripciones.preparar(['otra@example.org']).diario) == 4
+    assert suscripciones.preparar(lista, completo=True).desde == suscripciones.INICIO